@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""Compressed, deduplicated archive of .polyend banks.
+
+An archive is one SQLite file. Every distinct slot is stored once, keyed by
+the SHA-1 of its samples, delta-coded and compressed with whichever of zlib
+or lzma gives the smaller result. A bank is a row listing its 64 slot hashes;
+headers and footer are only stored when they differ from what
+recompile_wavetable writes, so the usual case costs nothing. Banks are rebuilt
+byte for byte and checked against the SHA-256 of the original file.
+"""
+
+import os
+import lzma
+import zlib
+import sqlite3
+import hashlib
+
+import numpy as np
+
+from medusa_core import NUM_WAVETABLES, DATA_OFFSET, FOOTER_DATA
+from medusa_bank import Bank, SAMPLE_DTYPE, canonical_headers
+
+# A slot is under 16KB, so a small dictionary compresses as well as the
+# preset's 64MB one and is several times faster to set up
+LZMA_FILTERS = [{'id': lzma.FILTER_LZMA2, 'preset': 9, 'dict_size': 1 << 16}]
+CODECS = {
+    'zlib': (lambda raw: zlib.compress(raw, 9), zlib.decompress),
+    'lzma': (lambda raw: lzma.compress(raw, format=lzma.FORMAT_RAW, filters=LZMA_FILTERS),
+             lambda payload: lzma.decompress(payload, format=lzma.FORMAT_RAW, filters=LZMA_FILTERS)),
+}
+HASH_SIZE = 20  # Bytes per SHA-1 slot hash
+
+
+def _split_hashes(blob):
+    return [blob[i:i + HASH_SIZE] for i in range(0, len(blob), HASH_SIZE)]
+
+
+def delta_encode(samples):
+    """Return the int16 first differences of samples, wrapping on overflow."""
+    return np.diff(samples, prepend=np.zeros(1, dtype=samples.dtype)).astype(SAMPLE_DTYPE)
+
+
+def delta_decode(deltas):
+    """Undo delta_encode."""
+    return np.cumsum(deltas, dtype=SAMPLE_DTYPE)
+
+
+def compress_slot(samples):
+    """Return (codec, payload) with the smallest compressed delta-coded slot."""
+    raw = delta_encode(samples).tobytes()
+    return min(((name, compress(raw)) for name, (compress, _) in CODECS.items()),
+               key=lambda item: len(item[1]))
+
+
+def decompress_slot(codec, payload):
+    """Return the int16 samples of a stored slot."""
+    return delta_decode(np.frombuffer(CODECS[codec][1](payload), dtype=SAMPLE_DTYPE))
+
+
+class Archive:
+    """A content-addressed store of banks in a SQLite file."""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS slots (
+                hash BLOB PRIMARY KEY,
+                codec TEXT,
+                payload BLOB
+            );
+            CREATE TABLE IF NOT EXISTS banks (
+                name TEXT PRIMARY KEY,
+                sha256 TEXT,
+                slots BLOB,
+                headers BLOB,
+                footer BLOB
+            );
+        ''')
+        self._canonical_headers = canonical_headers().tobytes()
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def add(self, path, name=None, replace=False):
+        """Store the bank at path under name (its file name by default).
+
+        A different bank already stored under name is an error unless replace
+        is set; slots of the replaced bank that no other bank uses are then
+        deleted. Returns the number of slots that weren't already in the archive.
+        """
+        name = name or os.path.basename(path)
+        with open(path, 'rb') as f:
+            buffer = f.read()
+        bank = Bank.from_bytes(buffer)
+        sha256 = hashlib.sha256(buffer).hexdigest()
+        existing = self.conn.execute('SELECT sha256, slots FROM banks WHERE name = ?', (name,)).fetchone()
+        if existing is not None and existing[0] != sha256 and not replace:
+            raise Exception(f"A different bank named {name} is already in the archive")
+
+        hashes = [hashlib.sha1(row.tobytes()).digest() for row in bank.data]
+        known = {row[0] for row in self.conn.execute(
+            f'SELECT hash FROM slots WHERE hash IN ({",".join("?" * len(hashes))})', hashes)}
+        new_slots = {}
+        for digest, row in zip(hashes, bank.data):
+            if digest not in known and digest not in new_slots:
+                new_slots[digest] = compress_slot(row)
+
+        headers = bank.headers.tobytes()
+        with self.conn:
+            self.conn.executemany('INSERT INTO slots VALUES (?, ?, ?)',
+                                  [(digest, codec, payload) for digest, (codec, payload) in new_slots.items()])
+            self.conn.execute('INSERT OR REPLACE INTO banks VALUES (?, ?, ?, ?, ?)', (
+                name,
+                sha256,
+                b''.join(hashes),
+                None if headers == self._canonical_headers else zlib.compress(headers),
+                None if bank.footer == FOOTER_DATA else bank.footer,
+            ))
+            if existing is not None:
+                self._delete_unused(set(_split_hashes(existing[1])) - set(hashes))
+        return len(new_slots)
+
+    def _delete_unused(self, hashes):
+        """Delete those of hashes that no bank refers to any more."""
+        if not hashes:
+            return
+        for (slots,) in self.conn.execute('SELECT slots FROM banks'):
+            hashes.difference_update(_split_hashes(slots))
+        self.conn.executemany('DELETE FROM slots WHERE hash = ?', [(digest,) for digest in hashes])
+
+    def names(self):
+        """Return the names of all archived banks."""
+        return [name for (name,) in self.conn.execute('SELECT name FROM banks ORDER BY name')]
+
+    def get(self, name):
+        """Rebuild the named bank, checking it against the original file's hash."""
+        row = self.conn.execute('SELECT sha256, slots, headers, footer FROM banks WHERE name = ?',
+                                (name,)).fetchone()
+        if row is None:
+            raise Exception(f"No bank named {name} in archive")
+        sha256, slot_hashes, headers, footer = row
+
+        hashes = _split_hashes(slot_hashes)
+        stored = {digest: (codec, payload) for digest, codec, payload in self.conn.execute(
+            f'SELECT hash, codec, payload FROM slots WHERE hash IN ({",".join("?" * len(set(hashes)))})',
+            list(set(hashes)))}
+        data = np.stack([decompress_slot(*stored[digest]) for digest in hashes])
+        if headers is not None:
+            headers = np.frombuffer(zlib.decompress(headers), dtype=np.uint8).reshape(NUM_WAVETABLES, DATA_OFFSET)
+        bank = Bank(data, headers, FOOTER_DATA if footer is None else footer)
+
+        if hashlib.sha256(bank.to_bytes()).hexdigest() != sha256:
+            raise Exception(f"Rebuilt bank {name} does not match the archived checksum")
+        return bank
+
+    def stats(self):
+        """Return counts and sizes describing the archive's deduplication."""
+        banks, = self.conn.execute('SELECT COUNT(*) FROM banks').fetchone()
+        slots, stored_bytes = self.conn.execute('SELECT COUNT(*), COALESCE(SUM(LENGTH(payload)), 0) '
+                                                'FROM slots').fetchone()
+        return {
+            'num_banks': banks,
+            'unique_slots': slots,
+            'slot_references': banks * NUM_WAVETABLES,
+            'stored_bytes': stored_bytes
+        }
+
+
+def archive_banks(archive_path, input_files, replace=False):
+    """Add .polyend files to an archive, creating it if needed.
+
+    Banks are stored under their file names, so two input files with the same
+    name are refused. replace lets a bank overwrite a different one already
+    archived under its name.
+    """
+    try:
+        paths = {}
+        for path in input_files:
+            paths.setdefault(os.path.basename(path), set()).add(os.path.realpath(path))
+        clashes = sorted(name for name, sources in paths.items() if len(sources) > 1)
+        if clashes:
+            raise Exception(f"Several input files are named {', '.join(clashes)}; archive them separately")
+
+        with Archive(archive_path) as archive:
+            new_slots = sum(archive.add(path, replace=replace) for path in input_files)
+            stats = archive.stats()
+        return {
+            'success': True,
+            'archive': archive_path,
+            'num_added': len(input_files),
+            'new_slots': new_slots,
+            **stats
+        }
+
+    except Exception as e:
+        return {
+            'success': False,
+            'error': str(e)
+        }
+
+
+def extract_banks(archive_path, output_dir, names=None):
+    """Rebuild archived banks (all of them by default) into output_dir."""
+    try:
+        os.makedirs(output_dir, exist_ok=True)
+        files = []
+        with Archive(archive_path) as archive:
+            for name in names or archive.names():
+                output_file = os.path.join(output_dir, name)
+                archive.get(name).save(output_file)
+                files.append(output_file)
+        return {
+            'success': True,
+            'output_dir': output_dir,
+            'files': files
+        }
+
+    except Exception as e:
+        return {
+            'success': False,
+            'error': str(e)
+        }
@@ -0,0 +1,589 @@
+#!/usr/bin/env python3
+"""In-memory wavetable banks for Medusa Wavetable Utility.
+
+A Bank holds all 64 slots of a .polyend file as one contiguous (64, 7936)
+int16 NumPy array plus the per-slot headers and the footer. Loading and saving
+are single buffer operations, and transforms work on every selected slot in
+one vectorized call instead of a decompile/edit/recompile round trip.
+"""
+
+import os
+import wave
+import struct
+import hashlib
+import threading
+import contextlib
+from collections import OrderedDict
+import numpy as np
+
+from medusa_core import (
+    WAVETABLE_SIZE, HEADER_MARKER, FIRST_HEADER_MARKER, SUBHEADER_MARKER,
+    DATA_OFFSET, NUM_WAVETABLES, WAVETABLE_IDENTIFIERS, FOOTER_DATA, TOTAL_FILE_SIZE,
+    FFMPEG_TIMEOUT, decode_audio, decode_audio_stream,
+)
+
+SAMPLE_DTYPE = np.dtype('<i2')  # 16-bit little-endian PCM
+SLOT_SAMPLES = (WAVETABLE_SIZE - DATA_OFFSET) // SAMPLE_DTYPE.itemsize  # 7936 samples per slot
+BANK_SIZE = NUM_WAVETABLES * WAVETABLE_SIZE  # Bytes before the footer
+
+
+def canonical_headers():
+    """Return the (64, DATA_OFFSET) uint8 slot headers recompile_wavetable writes."""
+    headers = np.zeros((NUM_WAVETABLES, DATA_OFFSET), dtype=np.uint8)
+    for i in range(NUM_WAVETABLES):
+        header = FIRST_HEADER_MARKER if i == 0 else HEADER_MARKER
+        headers[i, 0:4] = np.frombuffer(header, dtype=np.uint8)
+        headers[i, 4:8] = np.frombuffer(WAVETABLE_IDENTIFIERS[i], dtype=np.uint8)
+        headers[i, 0x40:0x44] = np.frombuffer(SUBHEADER_MARKER, dtype=np.uint8)
+        headers[i, 0x44:0x46] = (4, 0)  # Size
+        headers[i, 0x46:0x48] = (i & 0xFF, i >> 8)  # Index
+    return headers
+
+
+# Header fields checked by validate_bank: (name, start, end)
+HEADER_FIELDS = (
+    ('header_marker', 0, 4),
+    ('identifier', 4, 8),
+    ('subheader_marker', 0x40, 0x44),
+    ('subheader_size', 0x44, 0x46),
+    ('subheader_index', 0x46, 0x48),
+)
+
+
+def validate_bank(buffer):
+    """Check the structure of .polyend file contents.
+
+    Returns a list of problems, each a dict with a 'check' name and either the
+    'slots' that failed it or details of the mismatch. An empty list means
+    the file is valid. All slot headers are checked in one vectorized
+    comparison against the headers recompile_wavetable writes.
+    """
+    problems = []
+    raw = np.frombuffer(buffer, dtype=np.uint8)
+    if raw.size != TOTAL_FILE_SIZE:
+        problems.append({'check': 'size', 'expected': TOTAL_FILE_SIZE, 'actual': int(raw.size)})
+
+    n_slots = min(raw.size // WAVETABLE_SIZE, NUM_WAVETABLES)
+    if n_slots < NUM_WAVETABLES:
+        problems.append({'check': 'truncated', 'complete_slots': int(n_slots)})
+    headers = raw[:n_slots * WAVETABLE_SIZE].reshape(n_slots, WAVETABLE_SIZE)[:, :DATA_OFFSET]
+    expected = canonical_headers()[:n_slots]
+    for name, start, end in HEADER_FIELDS:
+        bad = np.flatnonzero((headers[:, start:end] != expected[:, start:end]).any(axis=1))
+        if bad.size:
+            problems.append({'check': name, 'slots': bad.tolist()})
+
+    if n_slots == NUM_WAVETABLES and raw[BANK_SIZE:].tobytes() != FOOTER_DATA:
+        problems.append({'check': 'footer'})
+    return problems
+
+
+def find_banks(inputs):
+    """Expand files and directories into a sorted list of .polyend files."""
+    banks = []
+    for path in inputs:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                banks.extend(os.path.join(root, name) for name in sorted(files)
+                             if name.lower().endswith('.polyend') and not name.startswith('.'))
+        else:
+            banks.append(path)
+    return banks
+
+
+class _Handle:
+    __slots__ = ('fd', 'ino', 'mtime', 'readers', 'retired')
+
+    def __init__(self, fd, ino, mtime):
+        self.fd, self.ino, self.mtime = fd, ino, mtime
+        self.readers = 0
+        self.retired = False
+
+
+class FileHandleCache:
+    """LRU cache of read-only file descriptors for repeated slot reads.
+
+    A cached descriptor is reused only while the file's inode and mtime are
+    unchanged, so replacing a bank on disk is picked up on the next read.
+    Descriptors are leased: one evicted or replaced while another thread is
+    reading from it stays open until that read is done, so its number can't
+    be reused underneath the reader.
+    """
+
+    def __init__(self, max_open=32):
+        self.max_open = max_open
+        self._handles = OrderedDict()
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def lease(self, path):
+        """Context manager giving a descriptor for path that stays open until it exits."""
+        handle = self._acquire(path)
+        try:
+            yield handle.fd
+        finally:
+            with self._lock:
+                handle.readers -= 1
+                if handle.retired and not handle.readers:
+                    os.close(handle.fd)
+
+    def _acquire(self, path):
+        st = os.stat(path)
+        with self._lock:
+            handle = self._handles.get(path)
+            if handle is not None and (handle.ino, handle.mtime) == (st.st_ino, st.st_mtime_ns):
+                self._handles.move_to_end(path)
+            else:
+                if handle is not None:
+                    self._retire(self._handles.pop(path))
+                fd = os.open(path, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+                handle = self._handles[path] = _Handle(fd, st.st_ino, st.st_mtime_ns)
+                while len(self._handles) > self.max_open:
+                    self._retire(self._handles.popitem(last=False)[1])
+            handle.readers += 1
+            return handle
+
+    def _retire(self, handle):
+        # Called with the lock held; the last reader closes a handle still in use
+        handle.retired = True
+        if not handle.readers:
+            os.close(handle.fd)
+
+    def close(self):
+        with self._lock:
+            for handle in self._handles.values():
+                self._retire(handle)
+            self._handles.clear()
+
+
+@contextlib.contextmanager
+def _open_slots(path, cache=None):
+    """Yield a read-only descriptor for path, leased from cache if given."""
+    if cache is not None:
+        with cache.lease(path) as fd:
+            yield fd
+        return
+    fd = os.open(path, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+    try:
+        yield fd
+    finally:
+        os.close(fd)
+
+
+def _pread(fd, size, offset):
+    if hasattr(os, 'pread'):
+        return os.pread(fd, size, offset)
+    os.lseek(fd, offset, os.SEEK_SET)  # Windows has no pread
+    return os.read(fd, size)
+
+
+def wav_header(num_samples, sample_rate=44100):
+    """Return the 44-byte header of a 16-bit mono PCM WAV holding num_samples samples."""
+    data_size = num_samples * SAMPLE_DTYPE.itemsize
+    return struct.pack('<4sI4s4sIHHIIHH4sI', b'RIFF', 36 + data_size, b'WAVE', b'fmt ', 16, 1, 1,
+                       sample_rate, sample_rate * SAMPLE_DTYPE.itemsize, SAMPLE_DTYPE.itemsize, 16,
+                       b'data', data_size)
+
+
+def read_slot_bytes(path, index, start=0, stop=None, cache=None):
+    """Read bytes start:stop of one slot's PCM data with a single positioned read."""
+    if not 0 <= index < NUM_WAVETABLES:
+        raise ValueError(f"Slot index must be between 0 and {NUM_WAVETABLES - 1}, got {index}")
+    size = SLOT_SAMPLES * SAMPLE_DTYPE.itemsize
+    stop = size if stop is None else min(stop, size)
+    if start >= stop:
+        return b''
+    with _open_slots(path, cache) as fd:
+        chunk = _pread(fd, stop - start, index * WAVETABLE_SIZE + DATA_OFFSET + start)
+    if len(chunk) != stop - start:
+        raise Exception(f"File is truncated: slot {index} is incomplete")
+    return chunk
+
+
+def read_slots(path, indices, cache=None):
+    """Read the samples of some slots of a .polyend file without parsing the rest.
+
+    Each slot is one positioned read at index * WAVETABLE_SIZE + DATA_OFFSET.
+    Pass a FileHandleCache to reuse the open file across calls. Returns an
+    (len(indices), SLOT_SAMPLES) int16 array.
+    """
+    indices = [int(index) for index in indices]
+    for index in indices:
+        if not 0 <= index < NUM_WAVETABLES:
+            raise ValueError(f"Slot index must be between 0 and {NUM_WAVETABLES - 1}, got {index}")
+    size = SLOT_SAMPLES * SAMPLE_DTYPE.itemsize
+    out = np.empty((len(indices), SLOT_SAMPLES), dtype=SAMPLE_DTYPE)
+    with _open_slots(path, cache) as fd:
+        for row, index in enumerate(indices):
+            chunk = _pread(fd, size, index * WAVETABLE_SIZE + DATA_OFFSET)
+            if len(chunk) != size:
+                raise Exception(f"File is truncated: slot {index} is incomplete")
+            out[row] = np.frombuffer(chunk, dtype=SAMPLE_DTYPE)
+    return out
+
+
+def read_slot(path, index, cache=None):
+    """Read the samples of one slot as a SLOT_SAMPLES int16 array."""
+    return read_slots(path, [index], cache)[0]
+
+
+def load_audio_stream(stream, max_samples=SLOT_SAMPLES, cancel=None, timeout=FFMPEG_TIMEOUT):
+    """Return up to max_samples of a binary audio stream, such as an archive member, as int16 samples.
+
+    The stream is always decoded with FFmpeg; cancel and timeout are as for load_audio().
+    """
+    pcm = decode_audio_stream(stream, max_seconds=max_samples / 44100 + 0.01, cancel=cancel, timeout=timeout)
+    return np.frombuffer(pcm, dtype=SAMPLE_DTYPE)[:max_samples]
+
+
+def load_audio(path, max_samples=SLOT_SAMPLES, cancel=None, timeout=FFMPEG_TIMEOUT):
+    """Return up to max_samples of an audio file as 44.1kHz mono int16 samples.
+
+    16-bit mono WAVs are read directly; anything else is decoded with FFmpeg.
+    cancel is an optional CancelToken for the FFmpeg run, which is killed
+    after timeout seconds.
+    """
+    try:
+        with wave.open(str(path), 'rb') as wav:
+            if wav.getnchannels() == 1 and wav.getsampwidth() == 2 and wav.getframerate() == 44100:
+                return np.frombuffer(wav.readframes(max_samples), dtype=SAMPLE_DTYPE)
+    except (wave.Error, EOFError):
+        pass
+    pcm = decode_audio(str(path), max_seconds=max_samples / 44100 + 0.01, cancel=cancel, timeout=timeout)
+    return np.frombuffer(pcm, dtype=SAMPLE_DTYPE)[:max_samples]
+
+
+def pad_slots(samples):
+    """Truncate or zero-pad a (n, samples) array to (n, SLOT_SAMPLES) like recompile does."""
+    out = np.zeros((len(samples), SLOT_SAMPLES), dtype=SAMPLE_DTYPE)
+    for i, row in enumerate(samples):
+        row = row[:SLOT_SAMPLES]
+        out[i, :len(row)] = row
+    return out
+
+
+# Transform kernels. Each works in place on a float32 (n, SLOT_SAMPLES) buffer
+# in int16 units; Bank.apply handles conversion to and from int16.
+
+def _normalize(buf, peak=1.0):
+    """Scale each slot so its loudest sample reaches peak (1.0 = full scale)."""
+    peaks = np.abs(buf).max(axis=1, keepdims=True)
+    scale = np.ones_like(peaks)
+    np.divide(np.float32(peak * 32767.0), peaks, out=scale, where=peaks > 0)
+    buf *= scale
+
+
+def _remove_dc(buf):
+    """Subtract each slot's mean."""
+    buf -= buf.mean(axis=1, keepdims=True)
+
+
+def _reverse(buf):
+    """Play each slot backwards."""
+    buf[:] = buf[:, ::-1]
+
+
+def _phase_align(buf):
+    """Rotate each slot so it starts at its first rising zero crossing."""
+    rising = (buf[:, :-1] < 0) & (buf[:, 1:] >= 0)
+    start = np.where(rising.any(axis=1), rising.argmax(axis=1) + 1, 0)
+    index = (start[:, None] + np.arange(buf.shape[1])) % buf.shape[1]
+    buf[:] = np.take_along_axis(buf, index, axis=1)
+
+
+def _gain(buf, db=0.0):
+    """Apply a gain in decibels."""
+    buf *= np.float32(10.0 ** (db / 20.0))
+
+
+def _fade_in(buf, samples=64):
+    """Fade each slot in linearly over its first samples."""
+    samples = min(int(samples), buf.shape[1])
+    buf[:, :samples] *= np.linspace(0.0, 1.0, samples, endpoint=False, dtype=np.float32)
+
+
+def _fade_out(buf, samples=64):
+    """Fade each slot out linearly over its last samples."""
+    samples = min(int(samples), buf.shape[1])
+    if samples:
+        buf[:, -samples:] *= np.linspace(1.0, 0.0, samples, dtype=np.float32)
+
+
+def _crossfade_loop(buf, samples=256):
+    """Crossfade each slot's tail into its head so the loop point is seamless."""
+    samples = min(int(samples), buf.shape[1] // 2)
+    if samples:
+        # The head mirrored about its first sample stands in for the audio that would
+        # lead into it; the tail blends fully into that by its last sample, which then
+        # steps into head[0] as smoothly as the head itself begins
+        lead_in = 2.0 * buf[:, :1] - buf[:, samples:0:-1]
+        ramp = np.linspace(0.0, 1.0, samples, dtype=np.float32)
+        buf[:, -samples:] = buf[:, -samples:] * (1.0 - ramp) + lead_in * ramp
+
+
+TRANSFORMS = {
+    'normalize': _normalize,
+    'remove_dc': _remove_dc,
+    'reverse': _reverse,
+    'phase_align': _phase_align,
+    'gain': _gain,
+    'fade_in': _fade_in,
+    'fade_out': _fade_out,
+    'crossfade_loop': _crossfade_loop,
+}
+
+
+def quantize(buf):
+    """Round a float buffer in int16 units back to clipped int16 samples."""
+    return np.clip(np.rint(buf), -32768, 32767).astype(SAMPLE_DTYPE)
+
+
+def select_rows(slots):
+    """Turn a slot selection (None, an int, or a sequence of ints) into an index."""
+    if slots is None:
+        return slice(None)
+    if isinstance(slots, (int, np.integer)):
+        return [int(slots)]
+    return list(slots)
+
+
+class Bank:
+    """A 64-slot wavetable bank held in memory.
+
+    data is a contiguous (64, 7936) int16 array, headers a (64, 128) uint8
+    array of raw slot headers and footer the bytes after the last slot.
+    """
+
+    def __init__(self, data=None, headers=None, footer=FOOTER_DATA):
+        if data is None:
+            data = np.zeros((NUM_WAVETABLES, SLOT_SAMPLES), dtype=SAMPLE_DTYPE)
+        data = np.ascontiguousarray(data, dtype=SAMPLE_DTYPE)
+        if data.shape != (NUM_WAVETABLES, SLOT_SAMPLES):
+            raise ValueError(f"Bank data must have shape ({NUM_WAVETABLES}, {SLOT_SAMPLES}), got {data.shape}")
+        self.data = data
+        self.headers = canonical_headers() if headers is None else np.array(headers, dtype=np.uint8)
+        self.footer = bytes(footer)
+
+    @classmethod
+    def from_bytes(cls, buffer):
+        """Parse a bank from the contents of a .polyend file."""
+        raw = np.frombuffer(buffer, dtype=np.uint8)
+        if raw.size < BANK_SIZE:
+            raise ValueError(f"File is truncated: {raw.size} bytes, expected {TOTAL_FILE_SIZE}")
+        slots = raw[:BANK_SIZE].reshape(NUM_WAVETABLES, WAVETABLE_SIZE)
+        return cls(
+            data=slots[:, DATA_OFFSET:].copy().view(SAMPLE_DTYPE),
+            headers=slots[:, :DATA_OFFSET].copy(),
+            footer=raw[BANK_SIZE:].tobytes(),
+        )
+
+    @classmethod
+    def load(cls, path):
+        """Load a bank from a .polyend file with a single read."""
+        with open(path, 'rb') as f:
+            return cls.from_bytes(f.read())
+
+    @classmethod
+    def from_wav_dir(cls, input_dir):
+        """Load a bank from wavetable_00.wav through wavetable_63.wav in input_dir."""
+        data = np.zeros((NUM_WAVETABLES, SLOT_SAMPLES), dtype=SAMPLE_DTYPE)
+        for i in range(NUM_WAVETABLES):
+            wav_file = os.path.join(input_dir, f'wavetable_{i:02d}.wav')
+            if not os.path.exists(wav_file):
+                raise Exception(f"Missing wavetable_{i:02d}.wav")
+            with wave.open(wav_file, 'rb') as wav:
+                if wav.getnchannels() != 1 or wav.getsampwidth() != 2:
+                    raise Exception(f"Invalid format in {wav_file}")
+                samples = np.frombuffer(wav.readframes(SLOT_SAMPLES), dtype=SAMPLE_DTYPE)
+            data[i, :samples.size] = samples
+        return cls(data)
+
+    def to_bytes(self):
+        """Return the complete .polyend file contents."""
+        buffer = np.empty(BANK_SIZE + len(self.footer), dtype=np.uint8)
+        slots = buffer[:BANK_SIZE].reshape(NUM_WAVETABLES, WAVETABLE_SIZE)
+        slots[:, :DATA_OFFSET] = self.headers
+        slots[:, DATA_OFFSET:] = self.data.view(np.uint8)
+        buffer[BANK_SIZE:] = np.frombuffer(self.footer, dtype=np.uint8)
+        return buffer.tobytes()
+
+    def save(self, path):
+        """Write the bank to a .polyend file with a single write."""
+        with open(path, 'wb') as f:
+            f.write(self.to_bytes())
+
+    def to_wav_dir(self, output_dir):
+        """Write each slot to wavetable_NN.wav in output_dir and return the paths."""
+        os.makedirs(output_dir, exist_ok=True)
+        files = []
+        for i in range(NUM_WAVETABLES):
+            wav_file = os.path.join(output_dir, f'wavetable_{i:02d}.wav')
+            with wave.open(wav_file, 'wb') as wav:
+                wav.setnchannels(1)
+                wav.setsampwidth(2)
+                wav.setframerate(44100)
+                wav.writeframes(self.data[i].tobytes())
+            files.append(wav_file)
+        return files
+
+    def to_strip(self, path):
+        """Write all 64 slots back to back as one WAV, or raw PCM if path ends in .pcm."""
+        samples = self.data.tobytes()
+        if path.lower().endswith('.pcm'):
+            with open(path, 'wb') as f:
+                f.write(samples)
+            return
+        with wave.open(path, 'wb') as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(44100)
+            wav.writeframes(samples)
+
+    @classmethod
+    def from_strip(cls, path, frame_size=None):
+        """Load a bank from a strip of concatenated frames.
+
+        A .pcm file is raw 16-bit little-endian mono; anything else must be a
+        16-bit mono WAV. By default the strip holds 64 frames of 7936 samples
+        and is copied straight into the slots. With another frame_size (e.g.
+        2048 from other synths) each frame is treated as one cycle and
+        resampled to fill a slot, and 64 frames are picked evenly across the
+        strip if it holds more or fewer.
+        """
+        if path.lower().endswith('.pcm'):
+            with open(path, 'rb') as f:
+                samples = np.frombuffer(f.read(), dtype=SAMPLE_DTYPE)
+        else:
+            with wave.open(path, 'rb') as wav:
+                if wav.getnchannels() != 1 or wav.getsampwidth() != 2:
+                    raise Exception(f"Invalid format in {path}: strips must be 16-bit mono")
+                samples = np.frombuffer(wav.readframes(wav.getnframes()), dtype=SAMPLE_DTYPE)
+
+        frame_size = frame_size or SLOT_SAMPLES
+        n_frames = samples.size // frame_size
+        if n_frames == 0:
+            raise Exception(f"Strip holds {samples.size} samples, less than one {frame_size}-sample frame")
+        frames = samples[:n_frames * frame_size].reshape(n_frames, frame_size)
+        if frame_size == SLOT_SAMPLES and n_frames == NUM_WAVETABLES:
+            return cls(frames)
+
+        picks = np.rint(np.linspace(0, n_frames - 1, NUM_WAVETABLES)).astype(int)
+        frames = frames[picks].astype(np.float32)
+        if frame_size == SLOT_SAMPLES:
+            return cls(quantize(frames))
+        # Periodic linear interpolation of every frame at once
+        position = np.arange(SLOT_SAMPLES) * (frame_size / SLOT_SAMPLES)
+        left = position.astype(int)
+        frac = (position - left).astype(np.float32)
+        right = (left + 1) % frame_size
+        return cls(quantize(frames[:, left] * (1.0 - frac) + frames[:, right] * frac))
+
+    def copy(self):
+        return Bank(self.data.copy(), self.headers.copy(), self.footer)
+
+    def reorder(self, order):
+        """Rearrange slots so slot i takes the data of slot order[i]. Headers stay in place."""
+        order = np.asarray(order)
+        if sorted(order.tolist()) != list(range(NUM_WAVETABLES)):
+            raise ValueError(f"Order must be a permutation of 0..{NUM_WAVETABLES - 1}")
+        self.data = np.ascontiguousarray(self.data[order])
+        return self
+
+    def content_hash(self):
+        """Return a hex digest of the sample data."""
+        return hashlib.sha1(self.data.tobytes()).hexdigest()
+
+    def apply(self, name, slots=None, **params):
+        """Apply the named transform to the selected slots (all by default), in place."""
+        if name not in TRANSFORMS:
+            raise ValueError(f"Unknown transform: {name}")
+        rows = select_rows(slots)
+        buf = self.data[rows].astype(np.float32)
+        TRANSFORMS[name](buf, **params)
+        self.data[rows] = quantize(buf)
+        return self
+
+    def normalize(self, peak=1.0, slots=None):
+        return self.apply('normalize', slots, peak=peak)
+
+    def remove_dc(self, slots=None):
+        return self.apply('remove_dc', slots)
+
+    def reverse(self, slots=None):
+        return self.apply('reverse', slots)
+
+    def phase_align(self, slots=None):
+        return self.apply('phase_align', slots)
+
+    def gain(self, db, slots=None):
+        return self.apply('gain', slots, db=db)
+
+    def fade_in(self, samples=64, slots=None):
+        return self.apply('fade_in', slots, samples=samples)
+
+    def fade_out(self, samples=64, slots=None):
+        return self.apply('fade_out', slots, samples=samples)
+
+    def crossfade_loop(self, samples=256, slots=None):
+        return self.apply('crossfade_loop', slots, samples=samples)
+
+
+def extract_slot(input_file, index, output_file):
+    """Write one slot of a .polyend file to a WAV, or raw PCM if output_file ends in .pcm."""
+    try:
+        samples = read_slot(input_file, index).tobytes()
+        if output_file.lower().endswith('.pcm'):
+            with open(output_file, 'wb') as f:
+                f.write(samples)
+        else:
+            with wave.open(output_file, 'wb') as wav:
+                wav.setnchannels(1)
+                wav.setsampwidth(2)
+                wav.setframerate(44100)
+                wav.writeframes(samples)
+        return {
+            'success': True,
+            'slot': index,
+            'output_file': output_file
+        }
+
+    except Exception as e:
+        return {
+            'success': False,
+            'error': str(e)
+        }
+
+
+def export_strip(input_file, output_file):
+    """Write the slots of a .polyend file to a single strip WAV or .pcm file."""
+    try:
+        Bank.load(input_file).to_strip(output_file)
+        return {
+            'success': True,
+            'num_wavetables': NUM_WAVETABLES,
+            'output_file': output_file
+        }
+
+    except Exception as e:
+        return {
+            'success': False,
+            'error': str(e)
+        }
+
+
+def import_strip(input_file, output_file, frame_size=None):
+    """Create a .polyend file from a strip WAV or .pcm file."""
+    try:
+        Bank.from_strip(input_file, frame_size).save(output_file)
+        return {
+            'success': True,
+            'num_wavetables': NUM_WAVETABLES,
+            'output_file': output_file
+        }
+
+    except Exception as e:
+        return {
+            'success': False,
+            'error': str(e)
+        }
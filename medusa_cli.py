@@ -1,12 +1,22 @@
 #!/usr/bin/env python3
 """Command line interface for Medusa Wavetable Utility."""
 
+import os
 import sys
+import json
+import signal
 import argparse
-from medusa_core import decompile_wavetable, recompile_wavetable, process_wavs, create_wavetable_bank
+import medusa_daemon
+from medusa_core import ORDER_MODES, FAMILIES, DEFAULT_HARMONICS
+from medusa_sources import SELECTION_MODES, PARTITION_MODES
 from version import __version__, __app_name__
 from tools.version_manager import check_for_updates, bump_version, generate_release_notes
 
+def print_progress(current, total):
+    """Print a single-line progress counter to stderr."""
+    end = '\n' if current == total else ''
+    print(f"\r[{current}/{total}]", end=end, file=sys.stderr, flush=True)
+
 def main():
     """Main CLI entry point."""
     parser = argparse.ArgumentParser(
@@ -21,38 +31,97 @@ def main():
     
     subparsers = parser.add_subparsers(dest='command', help='Commands')
     
+    # Options shared by commands that can be forwarded to a running daemon
+    daemon_options = argparse.ArgumentParser(add_help=False)
+    daemon_options.add_argument(
+        '--socket',
+        default=None,
+        help='Daemon socket path (default: $MEDUSA_SOCKET or a per-user temp path)'
+    )
+    daemon_options.add_argument(
+        '--no-daemon',
+        action='store_true',
+        help='Always run in-process, even if a daemon is listening'
+    )
+    daemon_options.add_argument(
+        '--progress',
+        action='store_true',
+        help='Print progress to stderr'
+    )
+    
     # Decompile command
     decompile_parser = subparsers.add_parser(
         'decompile',
+        parents=[daemon_options],
         help='Extract wavetables from a .polyend file'
     )
     decompile_parser.add_argument(
         'input_file',
         help='Input .polyend file'
     )
+    decompile_parser.add_argument(
+        '--strip',
+        metavar='OUTPUT_FILE',
+        default=None,
+        help='Write all 64 slots to one strip .wav (or raw .pcm) file instead of 64 WAVs'
+    )
+    
+    # Extract command
+    extract_parser = subparsers.add_parser(
+        'extract',
+        help='Extract a single wavetable slot from a .polyend file'
+    )
+    extract_parser.add_argument(
+        'input_file',
+        help='Input .polyend file'
+    )
+    extract_parser.add_argument(
+        '--slot',
+        type=int,
+        required=True,
+        help='Slot to extract (0-63)'
+    )
+    extract_parser.add_argument(
+        '--output',
+        default=None,
+        help='Output .wav (or raw .pcm) file (default: wavetable_NN.wav)'
+    )
     
     # Recompile command
     recompile_parser = subparsers.add_parser(
         'recompile',
+        parents=[daemon_options],
         help='Create .polyend file from processed WAV files'
     )
     recompile_parser.add_argument(
         'input_dir',
-        help='Directory containing WAV files'
+        help='Directory or ZIP/tar archive containing WAV files (or a strip file with --strip)'
     )
     recompile_parser.add_argument(
         'output_file',
         help='Output .polyend file'
     )
+    recompile_parser.add_argument(
+        '--strip',
+        action='store_true',
+        help='Read the slots from one strip .wav or .pcm file instead of a directory'
+    )
+    recompile_parser.add_argument(
+        '--frame-size',
+        type=int,
+        default=None,
+        help='Samples per frame in the strip; frames are resampled to fill each slot (default: 7936)'
+    )
     
     # Create command
     create_parser = subparsers.add_parser(
         'create',
+        parents=[daemon_options],
         help='Create wavetable bank from audio files'
     )
     create_parser.add_argument(
         'input_dir',
-        help='Directory containing audio files'
+        help='Directory or ZIP/tar archive containing audio files'
     )
     create_parser.add_argument(
         'output_file',
@@ -63,6 +132,293 @@ def main():
         action='store_true',
         help='Use random file selection (default: alphabetical)'
     )
+    create_parser.add_argument(
+        '--select',
+        choices=SELECTION_MODES,
+        default=None,
+        help='How to pick 64 sources from a larger library (default: alphabetical, or random with --random)'
+    )
+    create_parser.add_argument(
+        '--seed',
+        type=int,
+        default=None,
+        help='Random seed for reproducible selection'
+    )
+    create_parser.add_argument(
+        '--order',
+        choices=ORDER_MODES,
+        default='filename',
+        help='Slot order: as selected, or smooth so neighbouring slots sound alike (default: filename)'
+    )
+    create_parser.add_argument(
+        '--index',
+        default=None,
+        help='Persistent source index file; later builds only re-scan changed directories'
+    )
+    create_parser.add_argument(
+        '--workers',
+        type=int,
+        default=None,
+        help='Decode sources on this many processes through shared memory instead of one at a time'
+    )
+    
+    # Create banks command
+    create_banks_parser = subparsers.add_parser(
+        'create-banks',
+        parents=[daemon_options],
+        help='Divide a whole library into as many wavetable banks as it needs'
+    )
+    create_banks_parser.add_argument(
+        'input_dir',
+        help='Directory or ZIP/tar archive containing audio files'
+    )
+    create_banks_parser.add_argument(
+        'output_dir',
+        help='Directory to write the .polyend files to'
+    )
+    create_banks_parser.add_argument(
+        '--partition',
+        choices=PARTITION_MODES,
+        default='sorted',
+        help='How to divide files between banks: by file name, shuffled, keeping folders together, '
+             'or grouping files that sound alike (default: sorted)'
+    )
+    create_banks_parser.add_argument(
+        '--seed',
+        type=int,
+        default=None,
+        help='Random seed for a reproducible shuffle'
+    )
+    create_banks_parser.add_argument(
+        '--order',
+        choices=ORDER_MODES,
+        default='filename',
+        help='Slot order within each bank (default: filename)'
+    )
+    create_banks_parser.add_argument(
+        '--index',
+        default=None,
+        help='Persistent source index file; later builds only re-scan changed directories'
+    )
+    create_banks_parser.add_argument(
+        '--prefix',
+        default='bank',
+        help='Output file name prefix; banks are written as PREFIX_000.polyend, ... (default: bank)'
+    )
+    create_banks_parser.add_argument(
+        '--workers',
+        type=int,
+        default=None,
+        help='Number of files to decode and banks to write in parallel'
+    )
+    
+    # Reorder command
+    reorder_parser = subparsers.add_parser(
+        'reorder',
+        help='Reorder the slots of a .polyend file so neighbouring slots sound alike'
+    )
+    reorder_parser.add_argument(
+        'input_file',
+        help='Input .polyend file'
+    )
+    reorder_parser.add_argument(
+        'output_file',
+        help='Output .polyend file'
+    )
+    
+    # Apply command
+    apply_parser = subparsers.add_parser(
+        'apply',
+        help='Apply a JSON transform recipe to one or more .polyend files'
+    )
+    apply_parser.add_argument(
+        'recipe',
+        help='JSON recipe file'
+    )
+    apply_parser.add_argument(
+        'input_files',
+        nargs='+',
+        help='Input .polyend files'
+    )
+    apply_output = apply_parser.add_mutually_exclusive_group(required=True)
+    apply_output.add_argument(
+        '--output',
+        help='Output .polyend file (single input only)'
+    )
+    apply_output.add_argument(
+        '--output-dir',
+        help='Directory to write transformed banks to, keeping their file names'
+    )
+    apply_parser.add_argument(
+        '--workers',
+        type=int,
+        default=None,
+        help='Number of banks to process in parallel'
+    )
+    
+    # Export dataset command
+    export_parser = subparsers.add_parser(
+        'export-dataset',
+        help='Export many .polyend files into one memory-mappable .npy dataset'
+    )
+    export_parser.add_argument(
+        'inputs',
+        nargs='+',
+        help='Input .polyend files or directories containing them'
+    )
+    export_parser.add_argument(
+        'output_file',
+        help='Output .npy file (a .json index is written next to it)'
+    )
+    export_parser.add_argument(
+        '--workers',
+        type=int,
+        default=None,
+        help='Number of banks to parse in parallel'
+    )
+    
+    # Scan command
+    scan_parser = subparsers.add_parser(
+        'scan',
+        help='Check the structure of many .polyend files'
+    )
+    scan_parser.add_argument(
+        'inputs',
+        nargs='+',
+        help='Input .polyend files or directories containing them'
+    )
+    scan_parser.add_argument(
+        '--report',
+        default=None,
+        help='Write the JSON report to this file instead of stdout'
+    )
+    scan_parser.add_argument(
+        '--workers',
+        type=int,
+        default=None,
+        help='Number of files to check in parallel'
+    )
+    
+    # Archive command
+    archive_parser = subparsers.add_parser(
+        'archive',
+        help='Store banks in a compressed, deduplicated archive'
+    )
+    archive_subparsers = archive_parser.add_subparsers(dest='archive_command', help='Archive commands')
+    
+    archive_add_parser = archive_subparsers.add_parser(
+        'add',
+        help='Add .polyend files to an archive'
+    )
+    archive_add_parser.add_argument(
+        'archive',
+        help='Archive file (created if missing)'
+    )
+    archive_add_parser.add_argument(
+        'input_files',
+        nargs='+',
+        help='Input .polyend files'
+    )
+    archive_add_parser.add_argument(
+        '--replace',
+        action='store_true',
+        help='Overwrite archived banks that have the same name but different contents'
+    )
+    
+    archive_extract_parser = archive_subparsers.add_parser(
+        'extract',
+        help='Rebuild banks from an archive'
+    )
+    archive_extract_parser.add_argument(
+        'archive',
+        help='Archive file'
+    )
+    archive_extract_parser.add_argument(
+        'output_dir',
+        help='Directory to write the banks to'
+    )
+    archive_extract_parser.add_argument(
+        'names',
+        nargs='*',
+        help='Banks to extract (default: all)'
+    )
+    
+    archive_list_parser = archive_subparsers.add_parser(
+        'list',
+        help='List the banks in an archive'
+    )
+    archive_list_parser.add_argument(
+        'archive',
+        help='Archive file'
+    )
+    
+    # Synthesize command
+    synthesize_parser = subparsers.add_parser(
+        'synthesize',
+        help='Generate a wavetable bank from harmonic specs, without source audio'
+    )
+    synthesize_parser.add_argument(
+        'output_file',
+        help='Output .polyend file'
+    )
+    synthesize_source = synthesize_parser.add_mutually_exclusive_group(required=True)
+    synthesize_source.add_argument(
+        '--family',
+        choices=FAMILIES,
+        help='Parametric family to sweep across the 64 slots'
+    )
+    synthesize_source.add_argument(
+        '--spec',
+        help='JSON file with "amplitudes" and optional "phases" per harmonic'
+    )
+    synthesize_parser.add_argument(
+        '--harmonics',
+        type=int,
+        default=DEFAULT_HARMONICS,
+        help=f'Number of harmonics for --family (default: {DEFAULT_HARMONICS})'
+    )
+    synthesize_parser.add_argument(
+        '--cycles',
+        type=int,
+        default=1,
+        help='Waveform cycles per slot (default: 1)'
+    )
+    
+    # Morph command
+    morph_parser = subparsers.add_parser(
+        'morph',
+        help='Generate a bank that morphs smoothly between anchor waveforms'
+    )
+    morph_parser.add_argument(
+        'output_file',
+        help='Output .polyend file'
+    )
+    morph_source = morph_parser.add_mutually_exclusive_group(required=True)
+    morph_source.add_argument(
+        '--bank',
+        help='Take anchors from slots of this .polyend file'
+    )
+    morph_source.add_argument(
+        '--files',
+        nargs='+',
+        help='Take anchors from these audio files, in order'
+    )
+    morph_parser.add_argument(
+        '--slots',
+        default='0,63',
+        help='Comma-separated anchor slots for --bank (default: 0,63)'
+    )
+    
+    # Serve command
+    serve_parser = subparsers.add_parser(
+        'serve',
+        help='Run a warm background daemon that other invocations forward to'
+    )
+    serve_parser.add_argument(
+        '--socket',
+        default=None,
+        help='Socket path to listen on (default: $MEDUSA_SOCKET or a per-user temp path)'
+    )
     
     # Version management commands
     version_parser = subparsers.add_parser(
@@ -104,17 +460,55 @@ def main():
         parser.print_help()
         return 1
     
+    def run(command, *paths, **kwargs):
+        # The daemon has its own working directory, so always send absolute paths
+        paths = [os.path.abspath(path) for path in paths]
+        progress = print_progress if args.progress else None
+        if args.no_daemon:
+            return medusa_daemon.COMMANDS[command](*paths, progress=progress, **kwargs)
+        return medusa_daemon.run(command, *paths, socket_path=args.socket, progress=progress, **kwargs)
+    
     try:
-        if args.command == 'decompile':
-            result = decompile_wavetable(args.input_file)
+        if args.command == 'decompile' and args.strip:
+            from medusa_bank import export_strip
+            result = export_strip(args.input_file, args.strip)
+            if result['success']:
+                print(f"Extracted {result['num_wavetables']} wavetables to {result['output_file']}")
+            else:
+                print(f"Error: {result['error']}", file=sys.stderr)
+                return 1
+                
+        elif args.command == 'decompile':
+            result = run('decompile', args.input_file)
             if result['success']:
+                if result.get('fallback'):
+                    print(f"Note: could not write next to {args.input_file}; used {result['output_dir']} instead")
                 print(f"Extracted {result['num_wavetables']} wavetables to {result['output_dir']}")
             else:
                 print(f"Error: {result['error']}", file=sys.stderr)
                 return 1
                 
+        elif args.command == 'extract':
+            from medusa_bank import extract_slot
+            output_file = args.output or f'wavetable_{args.slot:02d}.wav'
+            result = extract_slot(args.input_file, args.slot, output_file)
+            if result['success']:
+                print(f"Extracted wavetable {result['slot']} to {result['output_file']}")
+            else:
+                print(f"Error: {result['error']}", file=sys.stderr)
+                return 1
+                
+        elif args.command == 'recompile' and args.strip:
+            from medusa_bank import import_strip
+            result = import_strip(args.input_dir, args.output_file, args.frame_size)
+            if result['success']:
+                print(f"Successfully recompiled {result['num_wavetables']} wavetables to {result['output_file']}")
+            else:
+                print(f"Error: {result['error']}", file=sys.stderr)
+                return 1
+                
         elif args.command == 'recompile':
-            result = recompile_wavetable(args.input_dir, args.output_file)
+            result = run('recompile', args.input_dir, args.output_file)
             if result['success']:
                 print(f"Successfully recompiled {result['num_wavetables']} wavetables to {result['output_file']}")
             else:
@@ -122,10 +516,16 @@ def main():
                 return 1
                 
         elif args.command == 'create':
-            result = create_wavetable_bank(
+            result = run(
+                'create',
                 args.input_dir,
                 args.output_file,
-                random_order=args.random
+                random_order=args.random,
+                index_path=os.path.abspath(args.index) if args.index else None,
+                selection=args.select,
+                seed=args.seed,
+                order=args.order,
+                workers=args.workers
             )
             if result['success']:
                 print(f"Successfully created wavetable bank:")
@@ -136,6 +536,130 @@ def main():
                 print(f"Error: {result['error']}", file=sys.stderr)
                 return 1
                 
+        elif args.command == 'create-banks':
+            result = run(
+                'create-banks',
+                args.input_dir,
+                args.output_dir,
+                partition=args.partition,
+                seed=args.seed,
+                order=args.order,
+                index_path=os.path.abspath(args.index) if args.index else None,
+                prefix=args.prefix,
+                workers=args.workers
+            )
+            if result['success']:
+                print(f"Created {result['num_banks']} wavetable banks in {result['output_dir']}")
+                for bank in result['banks']:
+                    print(f"- {os.path.basename(bank['output_file'])}: {len(bank['source_files'])} sources")
+                if result['skipped']:
+                    print(f"Skipped {len(result['skipped'])} files that could not be decoded")
+            else:
+                print(f"Error: {result['error']}", file=sys.stderr)
+                return 1
+                
+        elif args.command == 'reorder':
+            from medusa_features import reorder_wavetable
+            result = reorder_wavetable(args.input_file, args.output_file)
+            if result['success']:
+                print(f"Reordered {result['num_wavetables']} wavetables to {result['output_file']}")
+                print(f"New order: {' '.join(str(slot) for slot in result['order'])}")
+            else:
+                print(f"Error: {result['error']}", file=sys.stderr)
+                return 1
+                
+        elif args.command == 'apply':
+            from medusa_pipeline import apply_recipe
+            result = apply_recipe(args.recipe, args.input_files, args.output, args.output_dir, args.workers)
+            if result['success']:
+                print(f"Applied {result['num_steps']} fused steps to {result['num_banks']} banks")
+            else:
+                print(f"Error: {result['error']}", file=sys.stderr)
+                return 1
+                
+        elif args.command == 'export-dataset':
+            from medusa_dataset import export_dataset
+            result = export_dataset(args.inputs, args.output_file, args.workers)
+            if result['success']:
+                print(f"Exported {result['num_banks']} banks to {result['output_file']}")
+                print(f"Index written to {result['index_file']}")
+            else:
+                print(f"Error: {result['error']}", file=sys.stderr)
+                return 1
+                
+        elif args.command == 'scan':
+            from medusa_scan import scan_banks
+            result = scan_banks(args.inputs, args.report, args.workers)
+            if not result['success']:
+                print(f"Error: {result['error']}", file=sys.stderr)
+                return 1
+            report = result['report']
+            if args.report:
+                print(f"Scanned {report['num_files']} files: {report['num_valid']} valid, "
+                      f"{report['num_invalid']} invalid")
+            else:
+                json.dump(report, sys.stdout, indent=1)
+                print()
+            if report['num_invalid']:
+                return 1
+                
+        elif args.command == 'archive':
+            from medusa_archive import Archive, archive_banks, extract_banks
+            if args.archive_command == 'add':
+                result = archive_banks(args.archive, args.input_files, args.replace)
+                if result['success']:
+                    print(f"Added {result['num_added']} banks ({result['new_slots']} new slots)")
+                    print(f"Archive holds {result['num_banks']} banks in {result['unique_slots']} unique slots, "
+                          f"{result['stored_bytes']} bytes")
+                else:
+                    print(f"Error: {result['error']}", file=sys.stderr)
+                    return 1
+            elif args.archive_command == 'extract':
+                result = extract_banks(args.archive, args.output_dir, args.names)
+                if result['success']:
+                    print(f"Extracted {len(result['files'])} banks to {result['output_dir']}")
+                else:
+                    print(f"Error: {result['error']}", file=sys.stderr)
+                    return 1
+            elif args.archive_command == 'list':
+                with Archive(args.archive) as archive:
+                    for name in archive.names():
+                        print(name)
+            else:
+                archive_parser.print_help()
+                return 1
+                
+        elif args.command == 'synthesize':
+            from medusa_synth import synthesize_wavetable
+            result = synthesize_wavetable(args.output_file, args.family, args.spec, args.harmonics, args.cycles)
+            if result['success']:
+                print(f"Synthesized {result['num_wavetables']} wavetables "
+                      f"({result['num_harmonics']} harmonics) to {result['output_file']}")
+            else:
+                print(f"Error: {result['error']}", file=sys.stderr)
+                return 1
+                
+        elif args.command == 'morph':
+            from medusa_synth import morph_wavetable
+            slots = [int(slot) for slot in args.slots.split(',')]
+            result = morph_wavetable(args.output_file, args.bank, slots, args.files)
+            if result['success']:
+                print(f"Morphed {result['num_anchors']} anchors into {result['num_wavetables']} "
+                      f"wavetables at {result['output_file']}")
+            else:
+                print(f"Error: {result['error']}", file=sys.stderr)
+                return 1
+                
+        elif args.command == 'serve':
+            socket_path = args.socket or medusa_daemon.default_socket_path()
+            print(f"Listening on {socket_path} (Ctrl+C to stop)")
+            # Treat SIGTERM like Ctrl+C so the socket file is removed on shutdown
+            signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+            try:
+                medusa_daemon.serve(socket_path)
+            except KeyboardInterrupt:
+                pass
+                
         elif args.command == 'version':
             if not args.version_command:
                 version_parser.print_help()
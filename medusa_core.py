@@ -1,11 +1,17 @@
 #!/usr/bin/env python3
 
+import io
 import os
 import wave
+import time
+import random
 import struct
 import shutil
+import logging
+import threading
 import subprocess
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 
 # Constants
 WAVETABLE_SIZE = 16000  # 0x3E80 bytes per wavetable
@@ -16,6 +22,11 @@ DATA_OFFSET = 0x80  # Fixed offset where waveform data starts
 NUM_WAVETABLES = 64  # Fixed number of wavetables
 IDENTIFIER_SIZE = 4  # Size of identifier bytes after header
 TOTAL_FILE_SIZE = 1024128  # Exact size of the file
+ORDER_MODES = ('filename', 'smooth')  # How create_wavetable_bank arranges slots
+FAMILIES = ('saw_square', 'pwm', 'formant')  # Spectral families medusa_synth can generate
+DEFAULT_HARMONICS = 256  # Harmonics per slot when synthesizing a family
+FFMPEG_TIMEOUT = float(os.environ.get('MEDUSA_FFMPEG_TIMEOUT', 120))  # Seconds allowed per FFmpeg run
+CANCEL_POLL_INTERVAL = 0.1  # Seconds between cancellation checks while FFmpeg runs
 
 # Fixed identifiers for each wavetable position
 WAVETABLE_IDENTIFIERS = [
@@ -97,36 +108,85 @@ FOOTER_DATA = (
     b'\x00' * (TOTAL_FILE_SIZE - (NUM_WAVETABLES * WAVETABLE_SIZE) - 0x44)
 )
 
-def decompile_wavetable(input_file, output_dir=None):
-    """Extract wavetables from .polyend file to WAV files."""
+class Cancelled(Exception):
+    """Raised inside an operation whose CancelToken was cancelled or ran past its deadline."""
+
+
+class CancelToken:
+    """Lets a caller stop a running operation, either on demand or at a deadline.
+
+    Operations taking cancel= call check() between units of work and while
+    waiting on FFmpeg, which is killed as soon as the token fires.
+    """
+
+    def __init__(self, timeout=None):
+        self.deadline = time.monotonic() + timeout if timeout is not None else None
+        self.reason = None
+        self._event = threading.Event()
+
+    def cancel(self, reason="Cancelled"):
+        self.reason = self.reason or reason
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        if not self._event.is_set() and self.deadline is not None and time.monotonic() >= self.deadline:
+            self.cancel("Deadline exceeded")
+        return self._event.is_set()
+
+    def remaining(self):
+        """Return the seconds left before the deadline, or None if there is none."""
+        return None if self.deadline is None else max(0.0, self.deadline - time.monotonic())
+
+    def check(self):
+        """Raise Cancelled if the token has fired."""
+        if self.cancelled:
+            raise Cancelled(self.reason)
+
+def decompile_wavetable(input_file, output_dir=None, progress=None, cancel=None, context=None):
+    """Extract wavetables from .polyend file to WAV files.
+
+    If given, progress(current, total) is called after each wavetable is written.
+    cancel is an optional CancelToken.
+
+    Without output_dir, the WAVs go to a waves directory next to the input.
+    If that can't be created, they go to the context's fallback_dir instead
+    (if it has one); the result then has fallback set and a warning is logged.
+    """
+    context = context or default_context
     try:
         # Use waves directory next to input file if no output dir specified
+        default_dir = os.path.join(os.path.dirname(input_file), 'waves')
         if output_dir is None:
-            output_dir = os.path.join(os.path.dirname(input_file), 'waves')
+            output_dir = default_dir
             
         # Try to create the output directory, with fallback for permission issues
+        fallback = False
         try:
             os.makedirs(output_dir, exist_ok=True)
-        except (PermissionError, OSError):
-            # If we can't write to the requested location, use a safe fallback
-            if output_dir == os.path.join(os.path.dirname(input_file), 'waves'):
-                # Only use fallback if this was the default location
-                fallback_dir = os.path.join(os.path.expanduser("~/Documents"), 'medusa_waves')
-                os.makedirs(fallback_dir, exist_ok=True)
-                output_dir = fallback_dir
-            else:
-                # Re-raise the error if user specifically chose this location
+        except OSError as e:
+            # Only fall back from the default location, never from one the caller chose
+            if output_dir != default_dir or context.fallback_dir is None:
                 raise
+            context.warn(f"Cannot write to {output_dir} ({e}); extracting to {context.fallback_dir} instead")
+            os.makedirs(context.fallback_dir, exist_ok=True)
+            output_dir = context.fallback_dir
+            fallback = True
         
         # Read the polyend file
         with open(input_file, 'rb') as f:
             data = f.read()
         
+        if len(data) < NUM_WAVETABLES * WAVETABLE_SIZE:
+            raise Exception(f"File is truncated: {len(data)} bytes, expected {TOTAL_FILE_SIZE}")
+        
         # Extract wavetables
-        num_wavetables = len(data) // WAVETABLE_SIZE
+        num_wavetables = NUM_WAVETABLES
         extracted_files = []
         
         for i in range(num_wavetables):
+            if cancel:
+                cancel.check()
             # Extract wavetable data
             start = i * WAVETABLE_SIZE
             end = start + WAVETABLE_SIZE
@@ -144,11 +204,14 @@ def decompile_wavetable(input_file, output_dir=None):
                 wav.writeframes(waveform_data)
             
             extracted_files.append(wav_file)
+            if progress:
+                progress(i + 1, num_wavetables)
         
         return {
             'success': True,
             'num_wavetables': num_wavetables,
             'output_dir': output_dir,
+            'fallback': fallback,
             'files': extracted_files
         }
         
@@ -158,19 +221,42 @@ def decompile_wavetable(input_file, output_dir=None):
             'error': str(e)
         }
 
-def recompile_wavetable(input_dir, output_file):
-    """Create .polyend file from WAV files."""
+def recompile_wavetable(input_dir, output_file, progress=None, cancel=None):
+    """Create .polyend file from WAV files.
+
+    If given, progress(current, total) is called after each wavetable is packed.
+    cancel is an optional CancelToken.
+    """
     try:
         wavetables = []
         processed_files = []
         
+        # A ZIP or tar of WAVs, such as a decompiled bank, is read in place
+        if is_archive(input_dir):
+            members = {os.path.basename(name): name for name in archive_members(input_dir, ('.wav',))}
+            # Read the whole bank's members in one pass rather than re-opening the archive per slot
+            wanted = [members[f'wavetable_{i:02d}.wav'] for i in range(NUM_WAVETABLES)
+                      if f'wavetable_{i:02d}.wav' in members]
+            contents = {name: member.read() for name, member in iter_archive_members(input_dir, wanted)}
+        else:
+            members = None
+        
         for i in range(NUM_WAVETABLES):
-            wav_file = os.path.join(input_dir, f'wavetable_{i:02d}.wav')
+            if cancel:
+                cancel.check()
+            name = f'wavetable_{i:02d}.wav'
+            if members is None:
+                wav_file = os.path.join(input_dir, name)
+                exists = os.path.exists(wav_file)
+            else:
+                wav_file = os.path.join(input_dir, members.get(name, name))
+                exists = name in members
             
-            if not os.path.exists(wav_file):
+            if not exists:
                 raise Exception(f"Missing wavetable_{i:02d}.wav")
             
-            with wave.open(wav_file, 'rb') as wav:
+            source = open(wav_file, 'rb') if members is None else io.BytesIO(contents[members[name]])
+            with source as f, wave.open(f, 'rb') as wav:
                 if wav.getnchannels() != 1 or wav.getsampwidth() != 2:
                     raise Exception(f"Invalid format in {wav_file}")
                 waveform_data = wav.readframes(wav.getnframes())
@@ -198,6 +284,8 @@ def recompile_wavetable(input_dir, output_file):
             
             wavetables.append(result)
             processed_files.append(wav_file)
+            if progress:
+                progress(i + 1, NUM_WAVETABLES)
         
         # Write all wavetables and footer
         with open(output_file, 'wb') as f:
@@ -219,25 +307,110 @@ def recompile_wavetable(input_dir, output_file):
         }
 
 import subprocess
-import random
-import glob
 import tempfile
 import sys
+import functools
+from medusa_sources import (
+    SourceIndex, SELECTION_MODES, walk_directories, select_sources, is_archive, archive_members,
+    archive_directories, iter_archive_members
+)
 
-def get_temp_dir():
-    """Get a sandbox-compatible temporary directory."""
+def default_temp_root():
+    """Return a sandbox-compatible root for temporary directories."""
     if getattr(sys, 'frozen', False):
         # When running as app bundle, use app container temp directory
         app_path = os.path.dirname(os.path.dirname(sys.executable))
-        temp_base = os.path.join(app_path, 'Contents', 'Resources', 'temp')
-        os.makedirs(temp_base, exist_ok=True)
-        return tempfile.mkdtemp(dir=temp_base, prefix='medusa_')
-    else:
-        # In development, use system temp directory
-        return tempfile.mkdtemp(prefix='medusa_')
+        return os.path.join(app_path, 'Contents', 'Resources', 'temp')
+    # In development, use system temp directory
+    return tempfile.gettempdir()
+
+
+class MedusaContext:
+    """Settings and shared resources for core operations, passed as context=.
 
+    Operations reach process-wide state only through their context, so builds
+    can run concurrently in threads of one process, with separate contexts
+    or a shared one, without interfering. decompile_wavetable,
+    create_wavetable_bank and create_wavetable_banks take one;
+    recompile_wavetable, build_wavetable_bank and process_wav_files use none
+    of this state and take no context:
+
+    - temp_root: where work directories are created (default_temp_root() if None)
+    - logger: receives warnings such as files that failed to convert
+    - seed: if given, each build that isn't passed its own seed draws the
+      next one from this, so a whole session is reproducible
+    - decode_workers: size of the shared decoder thread pool, started on first use
+    - ffmpeg_timeout: seconds one FFmpeg run may take
+    - conversion_slot: optional callable returning a context manager held
+      around each FFmpeg run, for limits shared beyond this context
+    - fallback_dir: where decompile writes if the default output directory,
+      next to the input, can't be created; None makes that an error
+    """
+
+    def __init__(self, temp_root=None, logger=None, seed=None, decode_workers=None,
+                 ffmpeg_timeout=FFMPEG_TIMEOUT, conversion_slot=None, fallback_dir=None):
+        self.temp_root = temp_root or default_temp_root()
+        self.logger = logger or logging.getLogger('medusa')
+        self.decode_workers = decode_workers
+        self.ffmpeg_timeout = ffmpeg_timeout
+        self.conversion_slot = conversion_slot
+        self.fallback_dir = fallback_dir
+        self._seeds = random.Random(seed) if seed is not None else None
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def mkdtemp(self, prefix='medusa_'):
+        """Create a new work directory under temp_root."""
+        os.makedirs(self.temp_root, exist_ok=True)
+        return tempfile.mkdtemp(dir=self.temp_root, prefix=prefix)
+
+    def seed_for(self, seed=None):
+        """Return seed, or the session's next seed if it is None and the context is seeded."""
+        if seed is not None or self._seeds is None:
+            return seed
+        with self._lock:
+            return self._seeds.getrandbits(64)
+
+    def warn(self, message):
+        self.logger.warning(message)
+
+    @property
+    def pool(self):
+        """The shared decoder thread pool."""
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.decode_workers, thread_name_prefix='medusa-decode')
+            return self._pool
+
+    def close(self):
+        """Shut down the decoder pool, if it was started."""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# Used by operations called without a context: desktop behaviour, where an
+# unwritable default decompile location falls back to the Documents folder
+default_context = MedusaContext(fallback_dir=os.path.join(os.path.expanduser('~/Documents'), 'medusa_waves'))
+
+
+def get_temp_dir():
+    """Get a sandbox-compatible temporary directory."""
+    return default_context.mkdtemp()
+
+@functools.lru_cache(maxsize=None)
 def get_ffmpeg_path():
-    """Get the path to the FFmpeg executable, handling both development and bundled environments."""
+    """Get the path to the FFmpeg executable, handling both development and bundled environments.
+
+    The lookup is cached so long-running processes only pay for it once.
+    """
     if getattr(sys, 'frozen', False):
         # When running as app bundle
         app_path = os.path.dirname(os.path.dirname(sys.executable))
@@ -269,76 +442,305 @@ def get_ffmpeg_path():
                 return path
         raise Exception("FFmpeg not found. Please install FFmpeg or ensure it's in your system PATH.")
 
-def create_wavetable_bank(input_dir, output_file, random_order=False):
-    """Create a wavetable bank from a directory of audio files."""
+def _feed(source, pipe):
+    try:
+        shutil.copyfileobj(source, pipe, 64 * 1024)
+    except (BrokenPipeError, OSError, ValueError):
+        pass  # FFmpeg stopped reading or was killed; its exit status says why
+    finally:
+        try:
+            pipe.close()
+        except OSError:
+            pass
+
+def run_ffmpeg(args, stdin=None, capture_output=False, cancel=None, timeout=FFMPEG_TIMEOUT):
+    """Run FFmpeg with args, killing it after timeout seconds or as soon as cancel fires.
+
+    stdin may be a binary file object; it is fed from a thread, so an FFmpeg
+    that stops reading can't block the caller. Returns FFmpeg's stdout if
+    capture_output is set. Raises subprocess.CalledProcessError if FFmpeg
+    fails, subprocess.TimeoutExpired if it runs too long, and Cancelled.
+    """
+    command = [get_ffmpeg_path()] + args
+    deadline = time.monotonic() + timeout if timeout else None
+    # Output goes to files so a chatty FFmpeg can't fill a pipe and stall
+    with tempfile.TemporaryFile() as stdout, tempfile.TemporaryFile() as stderr:
+        process = subprocess.Popen(command,
+                                   stdin=subprocess.DEVNULL if stdin is None else subprocess.PIPE,
+                                   stdout=stdout if capture_output else subprocess.DEVNULL,
+                                   stderr=stderr)
+        feeder = None
+        if stdin is not None:
+            feeder = threading.Thread(target=_feed, args=(stdin, process.stdin), daemon=True)
+            feeder.start()
+        try:
+            while True:
+                try:
+                    returncode = process.wait(timeout=CANCEL_POLL_INTERVAL)
+                    break
+                except subprocess.TimeoutExpired:
+                    if cancel:
+                        cancel.check()
+                    if deadline is not None and time.monotonic() >= deadline:
+                        raise subprocess.TimeoutExpired(command, timeout)
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            if feeder:
+                # A source that blocks on read can't be interrupted; the daemon thread is left to it
+                feeder.join(CANCEL_POLL_INTERVAL)
+        stderr.seek(0)
+        if returncode != 0:
+            raise subprocess.CalledProcessError(returncode, command, stderr=stderr.read())
+        if capture_output:
+            stdout.seek(0)
+            return stdout.read()
+
+def decode_audio(audio_file, max_seconds=None, cancel=None, timeout=FFMPEG_TIMEOUT):
+    """Decode any FFmpeg-readable file to 44.1kHz 16-bit mono PCM bytes, without temp files."""
+    args = ['-v', 'error', '-i', audio_file]
+    if max_seconds is not None:
+        args += ['-t', str(max_seconds)]
+    args += ['-f', 's16le', '-ar', '44100', '-ac', '1', '-acodec', 'pcm_s16le', 'pipe:1']
+    try:
+        return run_ffmpeg(args, capture_output=True, cancel=cancel, timeout=timeout)
+    except subprocess.CalledProcessError as e:
+        message = e.stderr.decode('utf-8', 'replace').strip().splitlines()
+        raise Exception(f"Failed to decode {audio_file}: {message[-1] if message else e.returncode}")
+    except subprocess.TimeoutExpired:
+        raise Exception(f"Failed to decode {audio_file}: timed out after {timeout:g} seconds")
+
+def decode_audio_stream(stream, max_seconds=None, cancel=None, timeout=FFMPEG_TIMEOUT):
+    """Like decode_audio, but feed FFmpeg from a binary file object such as an archive member."""
+    args = ['-v', 'error', '-i', 'pipe:0']
+    if max_seconds is not None:
+        args += ['-t', str(max_seconds)]
+    args += ['-f', 's16le', '-ar', '44100', '-ac', '1', '-acodec', 'pcm_s16le', 'pipe:1']
+    try:
+        return run_ffmpeg(args, stdin=stream, capture_output=True, cancel=cancel, timeout=timeout)
+    except subprocess.CalledProcessError as e:
+        message = e.stderr.decode('utf-8', 'replace').strip().splitlines()
+        raise Exception(f"Failed to decode stream: {message[-1] if message else e.returncode}")
+    except subprocess.TimeoutExpired:
+        raise Exception(f"Failed to decode stream: timed out after {timeout:g} seconds")
+
+def convert_audio(audio_file, output_wav, cancel=None, timeout=FFMPEG_TIMEOUT):
+    """Convert any audio file FFmpeg can read to a 44.1kHz 16-bit mono WAV.
+
+    Returns output_wav. Raises subprocess.CalledProcessError if FFmpeg fails,
+    subprocess.TimeoutExpired if it takes longer than timeout seconds, and
+    Cancelled if cancel fires first.
+    """
+    run_ffmpeg(['-y', '-i', audio_file, '-ar', '44100', '-ac', '1', '-acodec', 'pcm_s16le', output_wav],
+               cancel=cancel, timeout=timeout)
+    return output_wav
+
+def convert_audio_stream(stream, output_wav, cancel=None, timeout=FFMPEG_TIMEOUT):
+    """Like convert_audio, but feed FFmpeg from a binary file object through its stdin.
+
+    Used for archive members, which are converted without being extracted.
+    """
+    run_ffmpeg(['-y', '-i', 'pipe:0', '-ar', '44100', '-ac', '1', '-acodec', 'pcm_s16le', output_wav],
+               stdin=stream, cancel=cancel, timeout=timeout)
+    return output_wav
+
+def build_wavetable_bank(wav_files, output_file, processed_dir, cancel=None):
+    """Process converted WAVs, in slot order, into processed_dir and recompile them to output_file."""
+    process_result = process_wav_files(wav_files, processed_dir, cancel)
+    if not process_result['success']:
+        return {
+            'success': False,
+            'error': f"Failed to process WAVs: {process_result['error']}"
+        }
+    return recompile_wavetable(processed_dir, output_file, cancel=cancel)
+
+def _limited(convert, conversion_slot):
+    """Wrap convert so each call holds conversion_slot() while it runs, if given."""
+    if conversion_slot is None:
+        return convert
+
+    def limited(*args):
+        with conversion_slot():
+            return convert(*args)
+    return limited
+
+def _select_archive_sources(archive_path, selection, seed, cancel=None, context=None, conversion_slot=None):
+    """Select members of a ZIP or tar archive as sources, returning their names.
+
+    For 'diverse' selection only a short window of each member is decoded to
+    compare them; the chosen members are converted later like any others.
+    """
+    directories = archive_directories(archive_path)
+    if selection != 'diverse':
+        return select_sources(directories, NUM_WAVETABLES, selection, seed)
+
+    # Imported here so plain builds don't need NumPy
+    from medusa_features import extract_archive_features, select_diverse
+    names = [name for _, names in directories for name in names]
+    features = extract_archive_features(archive_path, names, cancel, context.ffmpeg_timeout, conversion_slot)
+    return select_diverse(names, NUM_WAVETABLES, random.Random(seed) if seed is not None else None,
+                          features=features)
+
+def _smooth_order(data):
+    """Return the smooth slot order for an (n, SLOT_SAMPLES) array as a list of ints."""
+    # Imported here so plain builds don't need NumPy
+    from medusa_features import smooth_order
+    return [int(slot) for slot in smooth_order(data)]
+
+def _convert_and_build(audio_files, convert, output_file, temp_dir, progress=None, cancel=None, context=None,
+                       archive=None, order='filename'):
+    """Convert sources to temp WAVs one by one, then process and pack them into output_file.
+
+    If archive is given, audio_files are members of it, read in a single pass
+    and handed to convert as file objects. With order 'smooth' the converted
+    WAVs are rearranged before packing and the result includes their 'order'.
+    """
+    if archive is None:
+        sources = ((i, audio_file, audio_file) for i, audio_file in enumerate(audio_files))
+    else:
+        slots = {name: i for i, name in enumerate(audio_files)}
+        sources = ((slots[name], name, member) for name, member in iter_archive_members(archive, audio_files))
+    converted = {}
+    for done, (i, audio_file, source) in enumerate(sources, 1):
+        if cancel:
+            cancel.check()
+        output_wav = os.path.join(temp_dir, f'temp_{i:02d}.wav')
+        try:
+            convert(source, output_wav)
+            converted[i] = output_wav
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
+            context.warn(f"Failed to convert {audio_file}: {e}")
+            continue
+        finally:
+            if progress:
+                progress(done, len(audio_files))
+    # Slots stay in selection order whatever order an archive yields them in
+    converted_files = [converted[i] for i in sorted(converted)]
+    
+    if not converted_files:
+        raise Exception("No files were successfully converted")
+
+    slot_order = None
+    if order == 'smooth':
+        from medusa_bank import load_audio, pad_slots
+        slot_order = _smooth_order(pad_slots([load_audio(path) for path in converted_files]))
+        converted_files = [converted_files[slot] for slot in slot_order]
+        
+    # Process the converted files and create the final wavetable bank
+    result = build_wavetable_bank(converted_files, output_file, os.path.join(temp_dir, 'processed'), cancel)
+    if result['success'] and slot_order is not None:
+        result['order'] = slot_order
+    return result
+
+def create_wavetable_bank(input_dir, output_file, random_order=False, progress=None, index_path=None,
+                          selection=None, seed=None, order='filename', conversion_slot=None, cancel=None,
+                          workers=None, context=None):
+    """Create a wavetable bank from a directory, ZIP or tar archive of audio files.
+
+    If given, progress(current, total) is called after each source file is converted.
+    If index_path is given, a persistent SourceIndex at that path is used so
+    unchanged directories are not re-scanned on later builds.
+
+    selection is one of medusa_sources.SELECTION_MODES and defaults to
+    'random' if random_order is set, else 'alphabetical'. seed makes random
+    selections reproducible.
+
+    order is one of ORDER_MODES: 'filename' keeps slots in selection order,
+    'smooth' rearranges them so neighbouring slots sound alike.
+
+    conversion_slot, if given, returns a context manager held around each
+    FFmpeg run; the web app uses it to share a host-wide limit on conversions.
+
+    cancel is an optional CancelToken. Each FFmpeg run is also killed after
+    FFMPEG_TIMEOUT seconds, and that source skipped like an unreadable one.
+
+    workers, if given, decodes sources on that many processes straight into
+    a shared-memory slot buffer (see medusa_shm) instead of converting them
+    one by one through temp WAVs; conversion_slot isn't used then.
+
+    context is a MedusaContext supplying the temp root, logger, session seed,
+    FFmpeg timeout and default conversion_slot (default_context if None).
+    """
+    context = context or default_context
     temp_dir = None
     try:
+        if selection is None:
+            selection = 'random' if random_order else 'alphabetical'
+        if selection not in SELECTION_MODES:
+            raise ValueError(f"Unknown selection mode: {selection}")
+        if order not in ORDER_MODES:
+            raise ValueError(f"Unknown order: {order}")
+
         # Create temp directory using sandbox-compatible method
-        temp_dir = get_temp_dir()
+        temp_dir = context.mkdtemp()
         
-        # Find all audio files (wav, aif, aiff, etc.)
-        audio_files = []
-        for ext in ['*.wav', '*.aif', '*.aiff', '*.mp3', '*.ogg']:
-            audio_files.extend(glob.glob(os.path.join(input_dir, '**', ext), recursive=True))
+        # Find and select audio files (wav, aif, aiff, etc.) in a single streaming pass
+        seed = context.seed_for(seed)
+        conversion_slot = conversion_slot or context.conversion_slot
+        convert = _limited(functools.partial(convert_audio, cancel=cancel, timeout=context.ffmpeg_timeout),
+                           conversion_slot)
+        archive = input_dir if is_archive(input_dir) else None
+        if archive:
+            audio_files = _select_archive_sources(archive, selection, seed, cancel, context, conversion_slot)
+            convert = _limited(functools.partial(convert_audio_stream, cancel=cancel,
+                                                 timeout=context.ffmpeg_timeout), conversion_slot)
+        elif index_path:
+            with SourceIndex(index_path) as index:
+                directories = (
+                    (directory, [source.path for source in files])
+                    for directory, files in index.walk(input_dir)
+                )
+                audio_files = select_sources(directories, NUM_WAVETABLES, selection, seed, index, cancel,
+                                             conversion_slot)
+        else:
+            audio_files = select_sources(walk_directories(input_dir), NUM_WAVETABLES, selection, seed,
+                                         cancel=cancel, conversion_slot=conversion_slot)
         
         if not audio_files:
             raise Exception("No audio files found in input directory")
-            
-        # Select files
-        if len(audio_files) > NUM_WAVETABLES:
-            if random_order:
-                audio_files = random.sample(audio_files, NUM_WAVETABLES)
-            else:
-                audio_files = sorted(audio_files)[:NUM_WAVETABLES]
-        
-        # Get FFmpeg path
-        ffmpeg_path = get_ffmpeg_path()
-        
-        # Convert files to WAV format
-        converted_files = []
-        for i, audio_file in enumerate(audio_files):
-            output_wav = os.path.join(temp_dir, f'temp_{i:02d}.wav')
-            try:
-                subprocess.run([
-                    ffmpeg_path, '-y',
-                    '-i', audio_file,
-                    '-ar', '44100',
-                    '-ac', '1',
-                    '-acodec', 'pcm_s16le',
-                    output_wav
-                ], check=True, capture_output=True)
-                converted_files.append(output_wav)
-            except subprocess.CalledProcessError as e:
-                print(f"Warning: Failed to convert {audio_file}: {e}")
-                continue
         
-        if not converted_files:
-            raise Exception("No files were successfully converted")
-            
-        # Process the converted files
-        process_result = process_wavs(temp_dir, os.path.join(temp_dir, 'processed'))
-        if not process_result['success']:
-            raise Exception(f"Failed to process WAVs: {process_result['error']}")
-            
-        # Create the final wavetable bank
-        recompile_result = recompile_wavetable(
-            os.path.join(temp_dir, 'processed'),
-            output_file
-        )
+        if workers:
+            # Imported here so plain builds don't need NumPy
+            from medusa_shm import SharedSlots, decode_to_slots, pack_bank
+            with SharedSlots() as slots:
+                decoded, failed = decode_to_slots(slots, audio_files, archive, workers, progress, cancel,
+                                                  context.ffmpeg_timeout)
+                for audio_file, error in failed.items():
+                    context.warn(f"Failed to convert {audio_file}: {error}")
+                if not decoded:
+                    raise Exception("No files were successfully converted")
+                if len(decoded) < NUM_WAVETABLES:
+                    raise Exception(f"Only {len(decoded)} of {NUM_WAVETABLES} sources could be converted")
+                recompile_result = {'success': True, 'num_wavetables': NUM_WAVETABLES}
+                if order == 'smooth':
+                    recompile_result['order'] = _smooth_order(slots.data)
+                    pack_bank(slots.data[recompile_result['order']], output_file)
+                else:
+                    pack_bank(slots.data, output_file)
+        else:
+            recompile_result = _convert_and_build(audio_files, convert, output_file, temp_dir, progress, cancel,
+                                                  context, archive, order)
         
         # Clean up temp files
         shutil.rmtree(temp_dir, ignore_errors=True)
         
         if not recompile_result['success']:
             raise Exception(f"Failed to create wavetable bank: {recompile_result['error']}")
-            
-        return {
+        
+        result = {
             'success': True,
             'output_file': output_file,
             'num_wavetables': recompile_result['num_wavetables'],
-            'source_files': audio_files
+            'source_files': ([os.path.join(input_dir, name) for name in audio_files] if is_archive(input_dir)
+                             else audio_files)
         }
         
+        if 'order' in recompile_result:
+            result['order'] = recompile_result['order']
+            
+        return result
+        
     except Exception as e:
         # Clean up temp files on error
         if temp_dir and os.path.exists(temp_dir):
@@ -350,16 +752,27 @@ def create_wavetable_bank(input_dir, output_file, random_order=False):
 
 def process_wavs(input_dir, output_dir):
     """Convert WAV files to Medusa-compatible format."""
+    # Get all WAV files from input directory
+    wav_files = sorted(Path(input_dir).glob('*.wav'))[:NUM_WAVETABLES]  # Limit to 64 files
+    if not wav_files:
+        return {
+            'success': False,
+            'error': "No WAV files found in input directory"
+        }
+    return process_wav_files(wav_files, output_dir)
+
+def process_wav_files(wav_files, output_dir, cancel=None):
+    """Convert WAV files, in slot order, to wavetable_NN.wav files in output_dir."""
     try:
         os.makedirs(output_dir, exist_ok=True)
         processed_files = []
-        
-        # Get all WAV files from input directory
-        wav_files = sorted(Path(input_dir).glob('*.wav'))[:NUM_WAVETABLES]  # Limit to 64 files
+        wav_files = list(wav_files)[:NUM_WAVETABLES]
         if not wav_files:
-            raise Exception("No WAV files found in input directory")
+            raise Exception("No WAV files to process")
         
         for i, wav_path in enumerate(wav_files):
+            if cancel:
+                cancel.check()
             output_wav = os.path.join(output_dir, f'wavetable_{i:02d}.wav')
             
             # Process WAV file
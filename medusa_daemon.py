@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""Warm background daemon for Medusa Wavetable Utility.
+
+The daemon keeps imports, the FFmpeg lookup and any caches alive between
+invocations. Clients talk to it over a Unix socket using one JSON object per
+line: the client sends a single request and the daemon streams back
+``progress`` events followed by one ``result`` event.
+"""
+
+import os
+import sys
+import json
+import socket
+import tempfile
+import socketserver
+
+import medusa_core
+
+
+def _create_wavetable_banks(*args, **kwargs):
+    # Imported on first use so CLI clients don't load NumPy just to reach the daemon
+    from medusa_partition import create_wavetable_banks
+    return create_wavetable_banks(*args, **kwargs)
+
+
+# Commands the daemon is allowed to run, mapped to their core functions
+COMMANDS = {
+    'decompile': medusa_core.decompile_wavetable,
+    'recompile': medusa_core.recompile_wavetable,
+    'create': medusa_core.create_wavetable_bank,
+    'create-banks': _create_wavetable_banks,
+}
+
+CONNECT_TIMEOUT = 0.5  # Seconds to wait for a daemon before running in-process
+
+
+class DaemonUnavailable(Exception):
+    """Raised when no daemon is listening on the requested socket."""
+
+
+def default_socket_path():
+    """Return the per-user default socket path."""
+    return os.environ.get('MEDUSA_SOCKET') or os.path.join(
+        tempfile.gettempdir(), f'medusa-{os.getuid()}.sock'
+    )
+
+
+def _send(wfile, message):
+    wfile.write(json.dumps(message).encode('utf-8') + b'\n')
+    wfile.flush()
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline())
+            command = request['command']
+            if command == 'ping':
+                _send(self.wfile, {'event': 'result', 'result': {'success': True, 'pid': os.getpid()}})
+                return
+            if command not in COMMANDS:
+                raise ValueError(f"Unknown command: {command}")
+
+            def progress(current, total):
+                _send(self.wfile, {'event': 'progress', 'current': current, 'total': total})
+
+            result = COMMANDS[command](*request.get('args', []), **request.get('kwargs', {}), progress=progress)
+        except (BrokenPipeError, ConnectionResetError):
+            # Client went away mid-request; nothing left to report to
+            return
+        except Exception as e:
+            result = {'success': False, 'error': str(e)}
+        try:
+            _send(self.wfile, {'event': 'result', 'result': result})
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve(socket_path=None):
+    """Run the daemon in the foreground until interrupted."""
+    socket_path = socket_path or default_socket_path()
+
+    # Remove a stale socket left behind by a daemon that died
+    if os.path.exists(socket_path):
+        try:
+            call(socket_path, 'ping')
+        except DaemonUnavailable:
+            os.unlink(socket_path)
+        else:
+            raise Exception(f"A daemon is already listening on {socket_path}")
+
+    # Warm up the FFmpeg lookup and the NumPy-backed modules so the first request doesn't pay for them
+    import medusa_partition
+    try:
+        medusa_core.get_ffmpeg_path()
+    except Exception as e:
+        print(f"Warning: {e}", file=sys.stderr)
+
+    server = _Server(socket_path, _RequestHandler)
+    os.chmod(socket_path, 0o600)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+def call(socket_path, command, *args, progress=None, **kwargs):
+    """Run a command on the daemon and return its result dict.
+
+    Raises DaemonUnavailable if nothing is listening on socket_path.
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(CONNECT_TIMEOUT)
+        try:
+            sock.connect(socket_path)
+        except (FileNotFoundError, ConnectionRefusedError, socket.timeout) as e:
+            raise DaemonUnavailable(str(e))
+        sock.settimeout(None)
+
+        with sock.makefile('rwb') as stream:
+            _send(stream, {'command': command, 'args': list(args), 'kwargs': kwargs})
+            for line in stream:
+                message = json.loads(line)
+                if message['event'] == 'progress':
+                    if progress:
+                        progress(message['current'], message['total'])
+                elif message['event'] == 'result':
+                    return message['result']
+        raise Exception("Daemon closed the connection without a result")
+    finally:
+        sock.close()
+
+
+def run(command, *args, socket_path=None, progress=None, **kwargs):
+    """Run a command on the daemon if one is listening, otherwise in-process."""
+    try:
+        return call(socket_path or default_socket_path(), command, *args, progress=progress, **kwargs)
+    except DaemonUnavailable:
+        return COMMANDS[command](*args, progress=progress, **kwargs)
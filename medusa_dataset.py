@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""Export many .polyend banks into one memory-mappable dataset.
+
+Instead of 64 WAV files per bank, every bank goes into a single .npy array of
+shape (n_banks, 64, 7936) int16 that NumPy can map without reading it all.
+A sidecar JSON index next to it records where each bank came from:
+
+    {"shape": [n_banks, 64, 7936],
+     "banks": [{"path": ..., "sha256": ..., "identifiers": [...64 hex...]}]}
+
+Banks are parsed in parallel straight into the mapped array, using the same
+slot layout as the rest of the tools (DATA_OFFSET bytes of header, then
+samples, in slots of WAVETABLE_SIZE bytes).
+"""
+
+import os
+import json
+import hashlib
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from medusa_core import WAVETABLE_SIZE, DATA_OFFSET, NUM_WAVETABLES, TOTAL_FILE_SIZE
+from medusa_bank import SAMPLE_DTYPE, SLOT_SAMPLES, BANK_SIZE, find_banks
+
+
+def index_path(dataset_file):
+    """Return the sidecar index path for a dataset file."""
+    return os.path.splitext(dataset_file)[0] + '.json'
+
+
+def _export_bank(out, i, path):
+    """Parse one bank into row i of out and return its index entry."""
+    with open(path, 'rb') as f:
+        buffer = f.read()
+    if len(buffer) < BANK_SIZE:
+        raise Exception(f"{path} is truncated: {len(buffer)} bytes, expected {TOTAL_FILE_SIZE}")
+    slots = np.frombuffer(buffer, dtype=np.uint8, count=BANK_SIZE).reshape(NUM_WAVETABLES, WAVETABLE_SIZE)
+    out[i] = slots[:, DATA_OFFSET:].view(SAMPLE_DTYPE)
+    return {
+        'path': os.path.abspath(path),
+        'sha256': hashlib.sha256(buffer).hexdigest(),
+        'identifiers': [slots[slot, 4:8].tobytes().hex() for slot in range(NUM_WAVETABLES)]
+    }
+
+
+def export_dataset(inputs, output_file, workers=None):
+    """Export .polyend files (or directories of them) into one .npy dataset plus a JSON index.
+
+    Both files are written under temporary names and only moved into place
+    once every bank has been exported, so a failure leaves nothing behind.
+    """
+    partial_files = []
+    try:
+        banks = find_banks(inputs)
+        if not banks:
+            raise Exception("No .polyend files found")
+
+        partial_data, partial_index = partial_files = [output_file + '.partial', index_path(output_file) + '.partial']
+
+        out = np.lib.format.open_memmap(partial_data, mode='w+', dtype=SAMPLE_DTYPE,
+                                        shape=(len(banks), NUM_WAVETABLES, SLOT_SAMPLES))
+        try:
+            # Reads and copies release the GIL, so threads keep the disk busy
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                entries = list(pool.map(functools.partial(_export_bank, out), range(len(banks)), banks))
+            out.flush()
+        finally:
+            # Unmap before the file is moved or removed
+            del out
+
+        with open(partial_index, 'w') as f:
+            json.dump({'shape': [len(banks), NUM_WAVETABLES, SLOT_SAMPLES], 'banks': entries}, f, indent=1)
+        os.replace(partial_data, output_file)
+        os.replace(partial_index, index_path(output_file))
+        partial_files = []
+
+        return {
+            'success': True,
+            'output_file': output_file,
+            'index_file': index_path(output_file),
+            'num_banks': len(banks)
+        }
+
+    except Exception as e:
+        return {
+            'success': False,
+            'error': str(e)
+        }
+    finally:
+        for path in partial_files:
+            if os.path.exists(path):
+                os.remove(path)
+
+
+class Dataset:
+    """A read-only, memory-mapped view of an exported dataset.
+
+    data is the (n_banks, 64, 7936) int16 memmap and banks the index entries.
+    Indexing returns views, so nothing is read until samples are touched.
+    """
+
+    def __init__(self, dataset_file):
+        self.data = np.load(dataset_file, mmap_mode='r')
+        with open(index_path(dataset_file)) as f:
+            self.banks = json.load(f)['banks']
+        if len(self.banks) != len(self.data):
+            raise ValueError(f"Index lists {len(self.banks)} banks but the dataset holds {len(self.data)}")
+        self._by_path = {entry['path']: i for i, entry in enumerate(self.banks)}
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, i):
+        """Return the (64, 7936) slots of bank i as a lazy view."""
+        return self.data[i]
+
+    def slot(self, i, slot):
+        """Return slot `slot` of bank i as a lazy view."""
+        return self.data[i, slot]
+
+    def find(self, path):
+        """Return the position of the bank exported from path, or None."""
+        return self._by_path.get(os.path.abspath(path))
+
+
+def load_dataset(dataset_file):
+    """Open an exported dataset for lazy reading."""
+    return Dataset(dataset_file)
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""Cheap spectral features for choosing and ordering bank sources.
+
+For source selection only a short window at the start of each candidate is
+decoded, in parallel, and the whole batch goes through one FFT. Features can
+be cached in a SourceIndex so repeat builds over the same library skip
+decoding entirely. For slot ordering, all 64 slots of a bank are analysed in
+one FFT and arranged so neighbouring slots sound alike.
+"""
+
+import contextlib
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from medusa_core import NUM_WAVETABLES, FFMPEG_TIMEOUT, Cancelled
+from medusa_bank import Bank, load_audio, load_audio_stream
+from medusa_sources import iter_archive_members
+
+FEATURE_WINDOW = 4096  # Samples decoded per candidate (~93ms at 44.1kHz)
+FEATURE_BANDS = 32  # Log-spaced spectral bands per feature vector
+FEATURE_BATCH = 1024  # Candidates decoded and transformed per batch
+FEATURE_DTYPE = np.dtype('<f4')
+
+
+def _band_edges():
+    # Low bands would be narrower than one FFT bin, so duplicates are merged
+    return np.unique(np.geomspace(1, FEATURE_WINDOW // 2 + 1, FEATURE_BANDS + 1).astype(int))
+
+
+def compute_features(windows):
+    """Turn an (n, FEATURE_WINDOW) int16 matrix into (n, FEATURE_BANDS + 1) features.
+
+    Each row is the log energy in log-spaced bands with overall level removed,
+    so it describes timbre, plus the log RMS level as the last column.
+    """
+    signal = windows.astype(np.float32) / 32768.0
+    signal *= np.hanning(FEATURE_WINDOW).astype(np.float32)
+    power = np.abs(np.fft.rfft(signal, axis=1)) ** 2
+
+    edges = _band_edges()
+    bands = np.add.reduceat(power, edges[:-1], axis=1)
+    log_bands = np.log10(bands + 1e-10)
+    log_bands -= log_bands.mean(axis=1, keepdims=True)
+
+    level = 0.5 * np.log10(np.mean(signal ** 2, axis=1, keepdims=True) + 1e-10)
+    features = np.zeros((len(windows), FEATURE_BANDS + 1), dtype=FEATURE_DTYPE)
+    features[:, :log_bands.shape[1]] = log_bands
+    features[:, -1:] = level
+    return features
+
+
+def _window(samples):
+    window = np.zeros(FEATURE_WINDOW, dtype=np.int16)
+    window[:len(samples)] = samples
+    return window
+
+
+def _decode_window(path, cancel=None, conversion_slot=None):
+    if cancel:
+        cancel.check()
+    try:
+        with conversion_slot() if conversion_slot else contextlib.nullcontext():
+            return _window(load_audio(path, FEATURE_WINDOW, cancel))
+    except Cancelled:
+        raise
+    except Exception:
+        return None
+
+
+def extract_features(paths, index=None, workers=None, cancel=None, conversion_slot=None):
+    """Return {path: feature vector} for every path that could be decoded.
+
+    Vectors cached in index (a SourceIndex) are reused; new ones are stored.
+    cancel is an optional CancelToken, and conversion_slot, if given, is held
+    around each decode as in create_wavetable_bank.
+    """
+    decode = functools.partial(_decode_window, cancel=cancel, conversion_slot=conversion_slot)
+    cached = index.get_features(paths) if index is not None else []
+    features = {path: np.frombuffer(blob, dtype=FEATURE_DTYPE) for path, blob in cached}
+    missing = [path for path in paths if path not in features]
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for start in range(0, len(missing), FEATURE_BATCH):
+            batch = missing[start:start + FEATURE_BATCH]
+            decoded = [(path, window) for path, window in zip(batch, pool.map(decode, batch))
+                       if window is not None]
+            if not decoded:
+                continue
+            vectors = compute_features(np.stack([window for _, window in decoded]))
+            new = {path: vector for (path, _), vector in zip(decoded, vectors)}
+            features.update(new)
+            if index is not None:
+                index.put_features((path, vector.tobytes()) for path, vector in new.items())
+    return features
+
+
+def extract_archive_features(archive, names, cancel=None, timeout=FFMPEG_TIMEOUT, conversion_slot=None):
+    """Return {member name: feature vector} for every member of archive that could be decoded.
+
+    Only a short window at the start of each member is decoded, and the
+    archive is read in one pass (see medusa_sources.iter_archive_members).
+    conversion_slot, if given, is held around each decode.
+    """
+    features = {}
+    batch = []
+
+    def flush():
+        if batch:
+            vectors = compute_features(np.stack([window for _, window in batch]))
+            features.update((name, vector) for (name, _), vector in zip(batch, vectors))
+            batch.clear()
+
+    for name, member in iter_archive_members(archive, names):
+        try:
+            with conversion_slot() if conversion_slot else contextlib.nullcontext():
+                batch.append((name, _window(load_audio_stream(member, FEATURE_WINDOW, cancel, timeout))))
+        except Cancelled:
+            raise
+        except Exception:
+            continue
+        if len(batch) >= FEATURE_BATCH:
+            flush()
+    flush()
+    return features
+
+
+def farthest_point_sample(features, k, rng=None):
+    """Return indices of k rows of features that are spread as far apart as possible.
+
+    Starts from the row farthest from the centroid (or a random row if rng is
+    given), then repeatedly adds the row farthest from everything chosen.
+    """
+    n = len(features)
+    if n <= k:
+        return list(range(n))
+    features = np.asarray(features, dtype=np.float32)
+    if rng is None:
+        first = int(np.argmax(((features - features.mean(axis=0)) ** 2).sum(axis=1)))
+    else:
+        first = rng.randrange(n)
+    chosen = [first]
+    distance = ((features - features[first]) ** 2).sum(axis=1)
+    # Chosen rows are never picked again, even once only exact duplicates are left
+    distance[first] = -np.inf
+    for _ in range(k - 1):
+        next_index = int(np.argmax(distance))
+        chosen.append(next_index)
+        np.minimum(distance, ((features - features[next_index]) ** 2).sum(axis=1), out=distance)
+        distance[next_index] = -np.inf
+    return chosen
+
+
+def select_diverse(paths, k, rng=None, index=None, workers=None, features=None, cancel=None,
+                   conversion_slot=None):
+    """Pick k of paths whose opening spectra are as different from each other as possible.
+
+    features, if given, maps paths to precomputed vectors (as from
+    extract_archive_features) and nothing is decoded.
+    """
+    paths = list(paths)
+    if features is None:
+        features = extract_features(paths, index, workers, cancel, conversion_slot)
+    candidates = [path for path in paths if path in features]
+    if not candidates:
+        return []
+    # Scale each feature so bands with large spread don't dominate the distance
+    matrix = np.stack([features[path] for path in candidates])
+    matrix = (matrix - matrix.mean(axis=0)) / (matrix.std(axis=0) + 1e-6)
+    return [candidates[i] for i in farthest_point_sample(matrix, k, rng)]
+
+
+def slot_distances(data):
+    """Return a (64, 64) matrix of perceptual distances between slots.
+
+    Combines spectral centroid, brightness (share of energy above 2kHz) and
+    harmonic similarity (cosine distance between magnitude spectra), all from
+    one batched FFT over the bank.
+    """
+    signal = data.astype(np.float32)
+    magnitude = np.abs(np.fft.rfft(signal - signal.mean(axis=1, keepdims=True), axis=1))
+    bins = np.arange(magnitude.shape[1], dtype=np.float32)
+    total = magnitude.sum(axis=1) + 1e-9
+
+    centroid = (magnitude * bins).sum(axis=1) / total / magnitude.shape[1]
+    bright_bin = int(2000 * data.shape[1] / 44100)
+    brightness = magnitude[:, bright_bin:].sum(axis=1) / total
+
+    shape = np.sqrt(magnitude)
+    shape /= np.linalg.norm(shape, axis=1, keepdims=True) + 1e-9
+    harmonic = 1.0 - shape @ shape.T
+
+    return (np.abs(centroid[:, None] - centroid[None, :]) * 4.0
+            + np.abs(brightness[:, None] - brightness[None, :])
+            + np.clip(harmonic, 0.0, 2.0))
+
+
+def smooth_order(data, max_passes=50):
+    """Return a slot order that keeps adjacent slots spectrally close.
+
+    Builds an open travelling-salesman path over the slot distances: greedy
+    nearest neighbour from the darkest slot, then 2-opt segment reversals
+    until no reversal shortens the path.
+    """
+    distances = slot_distances(data)
+    n = len(distances)
+
+    # Start from the slot with the least high-frequency content
+    magnitude = np.abs(np.fft.rfft(data.astype(np.float32), axis=1))
+    centroid = (magnitude * np.arange(magnitude.shape[1])).sum(axis=1) / (magnitude.sum(axis=1) + 1e-9)
+    order = [int(np.argmin(centroid))]
+    remaining = np.ones(n, dtype=bool)
+    remaining[order[0]] = False
+    for _ in range(n - 1):
+        candidates = np.where(remaining, distances[order[-1]], np.inf)
+        order.append(int(np.argmin(candidates)))
+        remaining[order[-1]] = False
+    order = np.array(order)
+
+    for _ in range(max_passes):
+        improved = False
+        for i in range(1, n - 1):
+            a, b = order[i - 1], order[i]
+            # Gain from reversing order[i:j + 1] for every j at once
+            c = order[i + 1:]
+            d = np.append(order[i + 2:], -1)
+            before = distances[a, b] + np.where(d >= 0, distances[c, d], 0.0)
+            after = distances[a, c] + np.where(d >= 0, distances[b, d], 0.0)
+            gain = before - after
+            j = int(np.argmax(gain))
+            if gain[j] > 1e-9:
+                order[i:i + j + 2] = order[i:i + j + 2][::-1]
+                improved = True
+        if not improved:
+            break
+    return order
+
+
+def reorder_wavetable(input_file, output_file):
+    """Reorder the slots of a .polyend file for smooth wavetable scanning."""
+    try:
+        bank = Bank.load(input_file)
+        order = smooth_order(bank.data)
+        bank.reorder(order).save(output_file)
+        return {
+            'success': True,
+            'output_file': output_file,
+            'num_wavetables': NUM_WAVETABLES,
+            'order': [int(slot) for slot in order]
+        }
+
+    except Exception as e:
+        return {
+            'success': False,
+            'error': str(e)
+        }
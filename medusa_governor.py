@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""Admission control for FFmpeg conversions shared by all web workers.
+
+Limits are held as flock()s on small files in a shared directory, so every
+gunicorn worker on the host sees the same counts, and a worker that dies
+releases its locks with its file descriptors. There are three kinds:
+
+- conversion slots bound how many FFmpeg processes run at once, host-wide;
+- request tickets bound how many requests may be converting or waiting to,
+  so excess load is turned away at once with 503 and Retry-After instead of
+  queueing until gunicorn's timeout;
+- client tickets bound how many of those one client may hold, so a single
+  user can't fill the queue. Clients are hashed into a fixed number of
+  buckets, which keeps the directory small.
+
+Where fcntl isn't available (Windows), the same limits apply per process.
+"""
+
+import os
+import math
+import time
+import asyncio
+import hashlib
+import threading
+import contextlib
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from medusa_core import NUM_WAVETABLES
+
+CLIENT_BUCKETS = 4096
+POLL_INTERVAL = 0.02  # Seconds between attempts to take a busy conversion slot
+
+
+class Overloaded(Exception):
+    """Raised when a request can't be admitted; retry_after is a wait estimate in seconds."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class SlotPool:
+    """size slots that any process can take, each an exclusive lock on its own file."""
+
+    _local_locks = {}  # Fallback without fcntl: per-process locks by path
+    _local_guard = threading.Lock()
+
+    def __init__(self, directory, name, size):
+        self.paths = [os.path.join(directory, f'{name}.{i}.lock') for i in range(size)]
+
+    def try_acquire(self):
+        """Take a free slot and return a handle for release(), or None if all are busy."""
+        for path in self.paths:
+            if fcntl is None:
+                with self._local_guard:
+                    lock = self._local_locks.setdefault(path, threading.Lock())
+                if lock.acquire(blocking=False):
+                    return lock
+                continue
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return fd
+            except BlockingIOError:
+                os.close(fd)
+        return None
+
+    def release(self, handle):
+        if fcntl is None:
+            handle.release()
+        else:
+            os.close(handle)  # Closing the descriptor drops its flock
+
+
+class Governor:
+    """Host-wide limits on FFmpeg work, configured per deployment."""
+
+    def __init__(self, state_dir, max_conversions, max_requests, max_per_client):
+        os.makedirs(state_dir, exist_ok=True)
+        self.state_dir = state_dir
+        self.max_conversions = max_conversions
+        self.max_requests = max_requests
+        self.max_per_client = max_per_client
+        self.conversions = SlotPool(state_dir, 'conversion', max_conversions)
+        self.requests = SlotPool(state_dir, 'request', max_requests)
+        self.average_conversion = 1.0  # Seconds, smoothed over this process's conversions
+
+    def retry_after(self, queued):
+        """Estimate how long until queued requests' conversions have been worked through."""
+        seconds = queued * NUM_WAVETABLES * self.average_conversion / self.max_conversions
+        return max(1, min(300, math.ceil(seconds)))
+
+    def _client_pool(self, client):
+        bucket = int.from_bytes(hashlib.sha1(client.encode()).digest()[:4], 'big') % CLIENT_BUCKETS
+        return SlotPool(self.state_dir, f'client_{bucket:04d}', self.max_per_client)
+
+    @contextlib.contextmanager
+    def admit(self, client):
+        """Hold a request ticket (and one of client's) for the duration, or raise Overloaded."""
+        client_pool = self._client_pool(client)
+        client_ticket = client_pool.try_acquire()
+        if client_ticket is None:
+            raise Overloaded("Too many requests from this client in progress", self.retry_after(self.max_per_client))
+        try:
+            ticket = self.requests.try_acquire()
+            if ticket is None:
+                raise Overloaded("Server is busy", self.retry_after(self.max_requests))
+            try:
+                yield
+            finally:
+                self.requests.release(ticket)
+        finally:
+            client_pool.release(client_ticket)
+
+    @contextlib.contextmanager
+    def conversion_slot(self, cancel=None):
+        """Wait for and hold one of the host's conversion slots.
+
+        cancel is an optional CancelToken that abandons the wait.
+        """
+        slot = self.conversions.try_acquire()
+        delay = POLL_INTERVAL
+        while slot is None:
+            if cancel:
+                cancel.check()
+            time.sleep(delay)
+            delay = min(delay * 2, 0.25)
+            slot = self.conversions.try_acquire()
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.conversions.release(slot)
+            self.average_conversion += 0.1 * (time.monotonic() - start - self.average_conversion)
+
+    @contextlib.asynccontextmanager
+    async def async_conversion_slot(self):
+        """Like conversion_slot, but waits without blocking the event loop (cancel the task to give up)."""
+        slot = self.conversions.try_acquire()
+        delay = POLL_INTERVAL
+        while slot is None:
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.25)
+            slot = self.conversions.try_acquire()
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.conversions.release(slot)
+            self.average_conversion += 0.1 * (time.monotonic() - start - self.average_conversion)
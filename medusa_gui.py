@@ -5,10 +5,12 @@ import os
 import resources_rc
 from PySide6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
                               QPushButton, QLabel, QFileDialog, QMessageBox, QButtonGroup,
-                              QRadioButton, QMenuBar, QMenu, QGroupBox, QStatusBar)
+                              QRadioButton, QMenuBar, QMenu, QGroupBox, QStatusBar, QDialog)
 from PySide6.QtCore import Qt, QSize, QUrl
 from PySide6.QtGui import QPixmap, QDesktopServices
 from medusa_core import decompile_wavetable, recompile_wavetable, process_wavs, create_wavetable_bank, is_app_quarantined
+from medusa_bank import Bank
+from medusa_thumbnails import bank_thumbnails
 from version import __version__ as VERSION, __app_name__ as APP_NAME
 from tools.version_manager import check_for_updates
 
@@ -173,7 +175,7 @@ class MedusaApp(QMainWindow):
         layout.addWidget(header_label)
         
         # Set fixed window size
-        self.setFixedSize(450, 200 + scaled_pixmap.height())
+        self.setFixedSize(450, 230 + scaled_pixmap.height())
         
         # Create wavetable group
         create_group = QGroupBox("CREATE WAVETABLE")
@@ -223,6 +225,12 @@ class MedusaApp(QMainWindow):
         recompile_btn.setShortcut("R")
         tools_layout.addWidget(recompile_btn)
         
+        preview_btn = QPushButton("Preview .polyend File")
+        preview_btn.clicked.connect(self.select_preview_input)
+        preview_btn.setToolTip("Show the waveform in each of the 64 slots (P)")
+        preview_btn.setShortcut("P")
+        tools_layout.addWidget(preview_btn)
+        
         layout.addWidget(tools_group)
         
         # Add status bar with link
@@ -384,6 +392,37 @@ class MedusaApp(QMainWindow):
             )
         self.update_status("Ready")
     
+    def select_preview_input(self):
+        self.update_status("Selecting file to preview...")
+        input_file, _ = QFileDialog.getOpenFileName(
+            self,
+            "Select Medusa Wavetable File",
+            "",
+            "Polyend Files (*.polyend)"
+        )
+        
+        if not input_file:
+            self.update_status("Ready")
+            return
+        
+        try:
+            pixmap = QPixmap()
+            pixmap.loadFromData(bank_thumbnails(Bank.load(input_file), 'png'))
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Error previewing wavetable: {e}")
+            self.update_status("Ready")
+            return
+        
+        # 8x8 sprite sheet of all slots, doubled so single cycles are readable
+        dialog = QDialog(self)
+        dialog.setWindowTitle(os.path.basename(input_file))
+        dialog_layout = QVBoxLayout(dialog)
+        image_label = QLabel()
+        image_label.setPixmap(pixmap.scaled(pixmap.width() * 2, pixmap.height() * 2))
+        dialog_layout.addWidget(image_label)
+        dialog.exec()
+        self.update_status("Ready")
+    
     def check_updates(self):
         """Check for available updates and notify user."""
         self.update_status("Checking for updates...")
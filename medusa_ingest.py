@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""Streaming ingestion of multipart uploads.
+
+The request body is read in fixed-size chunks and parsed incrementally, so
+each uploaded file is written to disk exactly once, as it arrives, and handed
+to a decoder pool the moment its part ends. Conversion of earlier files then
+overlaps with the upload of later ones, and memory use stays at a few chunks
+no matter how large the upload is.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.sansio.multipart import MultipartDecoder, Field, File, Data, Epilogue, NeedData
+from werkzeug.utils import secure_filename
+
+from medusa_core import convert_audio, default_context
+
+CHUNK_SIZE = 64 * 1024
+MAX_FIELD_SIZE = 64 * 1024  # Plain form fields are only option values
+DECODE_WORKERS = int(os.environ.get('MEDUSA_DECODE_WORKERS', os.cpu_count() or 4))
+
+
+class UploadedFile:
+    """One uploaded file: where it was saved and the pending conversion, if any."""
+
+    def __init__(self, field, filename, path, context=None):
+        self.field = field
+        self.filename = filename
+        self.path = path
+        self.context = context or default_context
+        self.future = None
+
+    def converted(self):
+        """Wait for and return the converted WAV path, or None if conversion failed."""
+        if self.future is None:
+            return None
+        try:
+            return self.future.result()
+        except Exception as e:
+            self.context.warn(f"Failed to convert {self.filename}: {e}")
+            return None
+
+
+class StreamingIngest:
+    """Parse a multipart body from a stream, converting files while it is read.
+
+    Files whose names pass accept(filename) are saved under input_dir and, if
+    a convert callable is given, submitted to the decoder pool as soon as they
+    are complete; convert(source_path, output_wav) writes the WAV and returns
+    its path, or None to leave the file unconverted. Conversion failures are
+    reported through context, a MedusaContext (default_context if None).
+    """
+
+    def __init__(self, work_dir, accept, convert=convert_audio, workers=DECODE_WORKERS, context=None):
+        self.input_dir = os.path.join(work_dir, 'input')
+        self.converted_dir = os.path.join(work_dir, 'converted')
+        os.makedirs(self.input_dir, exist_ok=True)
+        os.makedirs(self.converted_dir, exist_ok=True)
+        self.accept = accept
+        self.convert = convert
+        self.context = context
+        self.pool = ThreadPoolExecutor(max_workers=workers) if convert else None
+        self.fields = {}
+        self.files = []
+
+    def _convert(self, upload, index):
+        output_wav = os.path.join(self.converted_dir, f'{index:04d}.wav')
+        return self.convert(upload.path, output_wav)
+
+    def _start_file(self, event):
+        filename = secure_filename(event.filename or '')
+        if not filename or not self.accept(filename):
+            return None
+        # Keep names unique so two uploads called the same thing don't collide
+        path = os.path.join(self.input_dir, filename)
+        if os.path.exists(path):
+            stem, ext = os.path.splitext(filename)
+            path = os.path.join(self.input_dir, f'{stem}_{len(self.files)}{ext}')
+        return UploadedFile(event.name, filename, path, self.context), open(path, 'wb')
+
+    def _finish_file(self, upload, handle):
+        handle.close()
+        self.files.append(upload)
+        if self.pool:
+            upload.future = self.pool.submit(self._convert, upload, len(self.files) - 1)
+
+    def start(self, boundary):
+        """Begin parsing a body with the given multipart boundary; then feed() it."""
+        self._decoder = MultipartDecoder(boundary.encode('latin-1'))
+        self._current = None  # (UploadedFile, open handle) or (field name, [chunks]) or None
+        self._is_file = False
+        return self
+
+    def feed(self, data):
+        """Parse the next chunk of the body; None or b'' marks its end.
+
+        Returns True once the whole body has been parsed. The decoder raises
+        ValueError if the body ends early.
+        """
+        decoder = self._decoder
+        decoder.receive_data(data or None)
+        while True:
+            event = decoder.next_event()
+            if isinstance(event, NeedData):
+                return False
+            elif isinstance(event, File):
+                self._current, self._is_file = self._start_file(event), True
+            elif isinstance(event, Field):
+                self._current, self._is_file = (event.name, []), False
+            elif isinstance(event, Data):
+                current = self._current
+                if current is not None:
+                    if self._is_file:
+                        current[1].write(event.data)
+                    else:
+                        current[1].append(event.data)
+                        if sum(len(part) for part in current[1]) > MAX_FIELD_SIZE:
+                            raise Exception(f"Form field {current[0]} is too large")
+                if not event.more_data:
+                    if current is not None:
+                        if self._is_file:
+                            self._finish_file(*current)
+                        else:
+                            self.fields[current[0]] = b''.join(current[1]).decode('utf-8', 'replace')
+                    self._current = None
+            elif isinstance(event, Epilogue):
+                return True
+
+    def abort(self):
+        """Close a file left half-written by a body that ended early."""
+        if getattr(self, '_current', None) is not None and self._is_file:
+            self._current[1].close()
+        self._current = None
+
+    def read(self, stream, boundary):
+        """Consume the whole multipart body from stream."""
+        self.start(boundary)
+        try:
+            while not self.feed(stream.read(CHUNK_SIZE)):
+                pass
+        finally:
+            self.abort()
+        return self
+
+    def close(self, wait=True):
+        """Shut down the decoder pool, cancelling conversions that haven't started unless wait is set."""
+        if self.pool:
+            self.pool.shutdown(wait=wait, cancel_futures=not wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        # Callers wait for the conversions they need; anything else is abandoned
+        self.close(wait=False)
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""Background cleanup of web upload artifacts.
+
+Every temporary directory or stored file the web app creates is recorded in a
+small SQLite index with an expiry time. A background thread deletes expired
+entries and, when the disk holding them passes a high-water mark, evicts the
+oldest evictable entries until usage is back under the low-water mark.
+Request handlers only ever insert or delete index rows for paths they
+created; nothing on the request path lists or stats the upload folder.
+
+Several worker processes can share one upload folder: the index lives in it,
+and deletions are idempotent, so it doesn't matter which worker's janitor
+gets to an entry first.
+"""
+
+import os
+import time
+import shutil
+import sqlite3
+import tempfile
+import threading
+
+INDEX_NAME = '.janitor.db'
+
+
+def path_size(path):
+    """Return the total size in bytes of a file or directory tree (0 if it is gone)."""
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, name))
+            except OSError:
+                pass  # Removed while we were walking
+    return total
+
+
+def remove_path(path):
+    """Delete a file or directory tree, ignoring anything already gone."""
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+class Janitor:
+    """Tracks artifacts under root and deletes them by TTL and disk usage.
+
+    Entries added with evictable=False (work in progress) are only removed by
+    release() or once their TTL passes, never to make room.
+    """
+
+    def __init__(self, root, ttl=3600, high_water=0.9, low_water=0.8, max_bytes=None, interval=60):
+        self.root = root
+        self.ttl = ttl
+        self.high_water = high_water
+        self.low_water = low_water
+        self.max_bytes = max_bytes
+        self.interval = interval
+        os.makedirs(root, exist_ok=True)
+        self._conn = None
+        self._conn_pid = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._stop = threading.Event()
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS artifacts (
+                path TEXT PRIMARY KEY,
+                created REAL,
+                expires REAL,
+                evictable INTEGER
+            );
+            CREATE INDEX IF NOT EXISTS artifacts_expires ON artifacts(expires);
+        ''')
+
+    @property
+    def conn(self):
+        # SQLite connections must not cross a fork, so each process opens its own
+        if self._conn_pid != os.getpid():
+            self._conn = sqlite3.connect(os.path.join(self.root, INDEX_NAME), timeout=30, check_same_thread=False)
+            self._conn_pid = os.getpid()
+        return self._conn
+
+    def close(self):
+        self.stop()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def track(self, path, ttl=None, evictable=False):
+        """Record path for deletion after ttl seconds (the janitor's default if None).
+
+        Tracking a path again refreshes its expiry.
+        """
+        now = time.time()
+        with self._lock, self.conn:
+            self.conn.execute('INSERT OR REPLACE INTO artifacts VALUES (?, ?, ?, ?)',
+                              (os.path.abspath(path), now, now + (self.ttl if ttl is None else ttl), int(evictable)))
+        return path
+
+    def mkdtemp(self, prefix, ttl=None):
+        """Create and track a temporary directory under root."""
+        return self.track(tempfile.mkdtemp(dir=self.root, prefix=prefix), ttl)
+
+    def release(self, path):
+        """Delete a tracked path now, e.g. once its response has been sent.
+
+        If the OS won't delete it yet (open files on Windows), it stays tracked
+        and expires later.
+        """
+        remove_path(path)
+        if os.path.lexists(path):
+            return
+        with self._lock, self.conn:
+            self.conn.execute('DELETE FROM artifacts WHERE path = ?', (os.path.abspath(path),))
+
+    def adopt(self, directory, prefixes=None, ttl=None, evictable=False):
+        """Track untracked entries of directory (those starting with one of prefixes, if given).
+
+        Used once at start-up, so leftovers from before the index existed still
+        expire. Their age counts from their mtime.
+        """
+        with self._lock:
+            known = {path for (path,) in self.conn.execute('SELECT path FROM artifacts')}
+        rows = []
+        try:
+            entries = list(os.scandir(directory))
+        except FileNotFoundError:
+            return 0
+        for entry in entries:
+            path = os.path.abspath(entry.path)
+            if path in known or entry.name.startswith(INDEX_NAME):
+                continue
+            if prefixes and not entry.name.startswith(tuple(prefixes)):
+                continue
+            try:
+                mtime = entry.stat().st_mtime
+            except FileNotFoundError:
+                continue
+            rows.append((path, mtime, mtime + (self.ttl if ttl is None else ttl), int(evictable)))
+        with self._lock, self.conn:
+            self.conn.executemany('INSERT OR IGNORE INTO artifacts VALUES (?, ?, ?, ?)', rows)
+        return len(rows)
+
+    def _delete(self, paths):
+        for path in paths:
+            remove_path(path)
+        with self._lock, self.conn:
+            self.conn.executemany('DELETE FROM artifacts WHERE path = ?',
+                                  [(path,) for path in paths if not os.path.lexists(path)])
+
+    def _over_limit(self, tracked_bytes):
+        if self.max_bytes is not None and tracked_bytes > self.max_bytes:
+            return True
+        usage = shutil.disk_usage(self.root)
+        return usage.used > self.high_water * usage.total
+
+    def _under_target(self, tracked_bytes):
+        if self.max_bytes is not None and tracked_bytes > self.low_water / self.high_water * self.max_bytes:
+            return False
+        usage = shutil.disk_usage(self.root)
+        return usage.used <= self.low_water * usage.total
+
+    def sweep(self, now=None):
+        """Delete expired entries, then evict the oldest if over the high-water mark.
+
+        Returns the number of paths deleted.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            expired = [path for (path,) in self.conn.execute(
+                'SELECT path FROM artifacts WHERE expires <= ?', (now,))]
+        self._delete(expired)
+
+        # Sizes are measured here, off the request path, and only for tracked entries;
+        # without a byte cap the disk's own usage is all that matters
+        with self._lock:
+            rows = self.conn.execute('SELECT path, evictable FROM artifacts ORDER BY created').fetchall()
+        sizes = {path: path_size(path) if self.max_bytes is not None else 0 for path, _ in rows}
+        tracked_bytes = sum(sizes.values())
+
+        evicted = []
+        if self._over_limit(tracked_bytes):
+            for path, evictable in rows:
+                if not evictable:
+                    continue
+                remove_path(path)
+                evicted.append(path)
+                tracked_bytes -= sizes[path]
+                if self._under_target(tracked_bytes):
+                    break
+            self._delete(evicted)
+        return len(expired) + len(evicted)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"Cleanup error: {e}")
+
+    def start(self):
+        """Start the background sweeper, unless it is already running in this process.
+
+        Safe to call on every request: after a fork the thread is restarted in the child.
+        """
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._stop.clear()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='medusa-janitor', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the background sweeper."""
+        self._stop.set()
+        if self._thread is not None and self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
@@ -1,7 +1,9 @@
 #!/usr/bin/env python3
 
+import re
 import sys
 import medusa_core
+from medusa_sources import SELECTION_MODES
 
 DEFAULT_INPUT = "medusa64Wavetables.polyend"
 DEFAULT_WAVES_DIR = "waves"
@@ -15,7 +17,7 @@ Usage:
     medusa_mac.py decompile [input.polyend]
     medusa_mac.py recompile [input_dir] [output.polyend]
     medusa_mac.py process <input_dir> <output_dir>
-    medusa_mac.py create <input_dir> <output.polyend> [--random]
+    medusa_mac.py create <input_dir> <output.polyend> [--random] [--select MODE] [--seed N]
 
 Commands:
     decompile  Extract wavetables from .polyend file to WAV files
@@ -25,8 +27,18 @@ Commands:
     process    Convert WAV files to Medusa-compatible format
     create     Create wavetable bank from a directory of audio files
                Use --random to select files randomly instead of alphabetically
+               Use --select folder to give every folder an equal chance
+               Use --seed N to make random selections reproducible
     """)
 
+def option_value(name):
+    """Return the value following an option like --seed, or None if absent."""
+    if name in sys.argv:
+        index = sys.argv.index(name)
+        if index + 1 < len(sys.argv):
+            return sys.argv[index + 1]
+    return None
+
 def main():
     if len(sys.argv) < 2 or sys.argv[1] in ['-h', '--help']:
         show_help()
@@ -40,6 +52,8 @@ def main():
         
         result = medusa_core.decompile_wavetable(input_file)
         if result['success']:
+            if result['fallback']:
+                print(f"\nCould not write next to {input_file}; using {result['output_dir']} instead")
             print(f"\nDecompiling {result['num_wavetables']} wavetables to {result['output_dir']}...")
             for file in result['files']:
                 print(f"Extracted wavetable to {file}")
@@ -86,11 +100,24 @@ def main():
         input_dir = sys.argv[2]
         output_file = sys.argv[3]
         random_order = '--random' in sys.argv
+        selection = option_value('--select') or ('random' if random_order else 'alphabetical')
+        seed = option_value('--seed')
+        if selection not in SELECTION_MODES:
+            print(f"Error creating wavetable bank: Unknown selection mode: {selection} "
+                  f"(choose from {', '.join(SELECTION_MODES)})")
+            return
+        if seed is not None and not re.fullmatch(r'-?[0-9]+', seed):
+            print("Error creating wavetable bank: Seed must be a whole number")
+            return
+        seed = int(seed) if seed is not None else None
         
         print(f"\nCreating wavetable bank from {input_dir}")
-        print(f"Selection mode: {'random' if random_order else 'alphabetical'}")
+        print(f"Selection mode: {selection}")
+        if seed is not None:
+            print(f"Seed: {seed}")
         
-        result = medusa_core.create_wavetable_bank(input_dir, output_file, random_order)
+        result = medusa_core.create_wavetable_bank(input_dir, output_file, random_order,
+                                                   selection=selection, seed=seed)
         if result['success']:
             print(f"\nSuccessfully created wavetable bank:")
             print(f"- Output file: {result['output_file']}")
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""Build as many banks as a library needs in one pass.
+
+Every source is decoded once, by one shared worker pool, straight into a row
+of a single (n, 7936) int16 array; that array is both the bank data and,
+for clustering, the input to the spectral features. The decoded sources are
+then partitioned into groups of up to 64 and each group is written out as a
+.polyend file, again on the shared pool.
+"""
+
+import io
+import os
+import random
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+
+from medusa_core import NUM_WAVETABLES, ORDER_MODES, FFMPEG_TIMEOUT, default_context
+from medusa_bank import Bank, SAMPLE_DTYPE, SLOT_SAMPLES, load_audio, load_audio_stream
+from medusa_sources import (
+    PARTITION_MODES, SourceIndex, walk_directories, is_archive, archive_directories, submit_sources
+)
+
+
+def _chunks(items, size=NUM_WAVETABLES):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def partition_folders(groups, size=NUM_WAVETABLES):
+    """Split (folder, [items]) groups into banks, keeping each folder's items together.
+
+    A folder fills as many whole banks as it can on its own; what is left of
+    each folder is then packed first-fit, largest first, so small folders
+    share banks without any of them being split.
+    """
+    banks = []
+    remainders = []
+    for _, items in groups:
+        items = list(items)
+        whole = len(items) - len(items) % size
+        banks.extend(_chunks(items[:whole], size))
+        if whole < len(items):
+            remainders.append(items[whole:])
+    packed = []
+    for items in sorted(remainders, key=len, reverse=True):
+        for bank in packed:
+            if len(bank) + len(items) <= size:
+                bank.extend(items)
+                break
+        else:
+            packed.append(list(items))
+    return banks + packed
+
+
+def balanced_clusters(matrix, size=NUM_WAVETABLES):
+    """Split the rows of matrix into groups of up to size rows that lie close together.
+
+    Each set is cut across its principal axis so that one side holds a whole
+    number of groups, and both sides are split again. The partial group, if
+    any, goes to whichever end of the axis leaves the two sides tighter, so
+    every group but one is full. Groups come out ordered along the cuts.
+    """
+    groups = []
+    stack = [np.arange(len(matrix))]
+    while stack:
+        indices = stack.pop()
+        n = len(indices)
+        if n <= size:
+            groups.append(indices)
+            continue
+        points = matrix[indices] - matrix[indices].mean(axis=0)
+        _, _, axes = np.linalg.svd(points, full_matrices=False)
+        projection = points @ axes[0]
+        order = np.argsort(projection, kind='stable')
+        projection = projection[order]
+        whole = (-(-n // size) // 2) * size
+        split = min((whole, n - whole),
+                    key=lambda i: projection[:i].var() * i + projection[i:].var() * (n - i))
+        indices = indices[order]
+        stack.append(indices[split:])
+        stack.append(indices[:split])
+    return groups
+
+
+def partition_sources(directories, mode='sorted', seed=None, samples=None):
+    """Split sources into groups of up to 64, one group per bank.
+
+    directories is a list of (directory, [sources]) pairs. mode is one of
+    PARTITION_MODES; 'cluster' needs samples, a mapping from each source to
+    its decoded int16 samples, and groups sources whose spectra are alike.
+    Returns a list of lists of sources.
+    """
+    if mode not in PARTITION_MODES:
+        raise ValueError(f"Unknown partition mode: {mode}")
+    sources = [source for _, names in directories for source in names]
+    if mode == 'folder':
+        return partition_folders(directories)
+    if mode == 'random':
+        random.Random(seed).shuffle(sources)
+        return _chunks(sources)
+    if mode == 'cluster':
+        # Imported here so the other modes don't pay for it
+        from medusa_features import FEATURE_WINDOW, compute_features
+        if len(sources) <= NUM_WAVETABLES:
+            return [sources] if sources else []
+        features = compute_features(np.stack([samples[source][:FEATURE_WINDOW] for source in sources]))
+        # Scale each feature so bands with large spread don't dominate, as select_diverse does
+        features = (features - features.mean(axis=0)) / (features.std(axis=0) + 1e-6)
+        return [[sources[i] for i in group] for group in balanced_clusters(features)]
+    return _chunks(sorted(sources))
+
+
+def _list_sources(input_dir, index_path=None):
+    """Return [(directory, [sources])] for a directory or archive, using a SourceIndex if given."""
+    if is_archive(input_dir):
+        return [(directory, list(names)) for directory, names in archive_directories(input_dir)]
+    if index_path:
+        with SourceIndex(index_path) as index:
+            return [(directory, [source.path for source in files]) for directory, files in index.walk(input_dir)]
+    return [(directory, list(paths)) for directory, paths in walk_directories(input_dir)]
+
+
+def _decode_source(input_dir, source, cancel=None, timeout=FFMPEG_TIMEOUT, contents=None):
+    """Return the first SLOT_SAMPLES samples of a source file, or of an archive member's contents."""
+    if contents is not None:
+        return load_audio_stream(io.BytesIO(contents), SLOT_SAMPLES, cancel, timeout)
+    return load_audio(source, SLOT_SAMPLES, cancel, timeout)
+
+
+def create_wavetable_banks(input_dir, output_dir, partition='sorted', seed=None, order='filename',
+                           index_path=None, prefix='bank', workers=None, progress=None, cancel=None, context=None):
+    """Partition every audio file in a directory or archive into as many banks as needed.
+
+    Banks are written to output_dir as {prefix}_000.polyend and so on. A bank
+    may hold fewer than 64 sources (the last one in 'sorted' and 'random'
+    mode, any number of them in 'folder' and 'cluster' mode); its sources
+    fill the first slots and the rest are silent. Each bank's source_files
+    are listed in slot order. Sources that can't be decoded are skipped
+    before partitioning, so they don't leave gaps.
+
+    partition is one of PARTITION_MODES: 'sorted' fills banks in file name
+    order, 'random' shuffles first (seed makes it reproducible), 'folder'
+    keeps each folder's files together and 'cluster' groups files that
+    sound alike. order is one of ORDER_MODES, as for create_wavetable_bank.
+
+    progress(current, total) is called after each source is decoded.
+    cancel is an optional CancelToken.
+
+    Decoding and writing run on the context's shared decoder pool, or on a
+    pool of their own if workers is given. context is a MedusaContext
+    (default_context if None).
+    """
+    context = context or default_context
+    try:
+        if partition not in PARTITION_MODES:
+            raise ValueError(f"Unknown partition mode: {partition}")
+        if order not in ORDER_MODES:
+            raise ValueError(f"Unknown order: {order}")
+
+        directories = _list_sources(input_dir, index_path)
+        sources = [source for _, names in directories for source in names]
+        if not sources:
+            raise Exception("No audio files found in input directory")
+        os.makedirs(output_dir, exist_ok=True)
+
+        # One row per source, filled in place by the decoders
+        samples = np.zeros((len(sources), SLOT_SAMPLES), dtype=SAMPLE_DTYPE)
+        decoded = set()
+
+        def decode(row, source, contents=None):
+            data = _decode_source(input_dir, source, cancel, context.ffmpeg_timeout, contents)
+            samples[row, :len(data)] = data
+
+        def write(number, group):
+            data = np.stack([rows[source] for source in group])
+            if order == 'smooth':
+                # Only the filled slots are ordered; any unused ones stay silent at the end
+                from medusa_features import smooth_order
+                slot_order = smooth_order(data)
+                data = data[slot_order]
+                group = [group[i] for i in slot_order]
+            bank = Bank()
+            bank.data[:len(group)] = data
+            output_file = os.path.join(output_dir, f'{prefix}_{number:03d}.polyend')
+            bank.save(output_file)
+            return output_file, group
+
+        own_pool = ThreadPoolExecutor(max_workers=workers) if workers else None
+        pool = own_pool or context.pool
+        futures = {}
+        try:
+            limit = 2 * (workers or context.decode_workers or os.cpu_count() or 1)
+            archive = input_dir if is_archive(input_dir) else None
+            for future, row in submit_sources(pool, decode, sources, archive, limit, cancel):
+                futures[future] = row
+                if cancel:
+                    cancel.check()
+            for done, future in enumerate(as_completed(futures), 1):
+                if cancel:
+                    cancel.check()
+                row = futures[future]
+                try:
+                    future.result()
+                    decoded.add(row)
+                except Exception as e:
+                    context.warn(f"Failed to convert {sources[row]}: {e}")
+                if progress:
+                    progress(done, len(sources))
+
+            if not decoded:
+                raise Exception("No files were successfully converted")
+            rows = {source: samples[row] for row, source in enumerate(sources) if row in decoded}
+            groups = partition_sources(
+                [(directory, [source for source in names if source in rows]) for directory, names in directories],
+                partition, context.seed_for(seed), rows
+            )
+            futures = {pool.submit(write, number, group): number for number, group in enumerate(groups)}
+            written = [future.result() for future in futures]
+        except BaseException:
+            # Leave the shared pool to other builds: drop only this build's queued work
+            for future in futures:
+                future.cancel()
+            raise
+        finally:
+            if own_pool:
+                own_pool.shutdown(wait=True, cancel_futures=True)
+
+        label = (lambda source: os.path.join(input_dir, source)) if is_archive(input_dir) else str
+        return {
+            'success': True,
+            'output_dir': output_dir,
+            'num_banks': len(written),
+            'banks': [
+                {'output_file': output_file, 'source_files': [label(source) for source in group]}
+                for output_file, group in written
+            ],
+            'skipped': [label(source) for row, source in enumerate(sources) if row not in decoded]
+        }
+
+    except Exception as e:
+        return {
+            'success': False,
+            'error': str(e)
+        }
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""Lazy transform pipelines over wavetable banks.
+
+A Pipeline records bank transforms without running them. When it is run,
+adjacent steps that can be combined are fused, the bank is converted to
+floating point once, the steps run one after another on that one buffer, and
+the result is quantized back to int16 once. Each step is still its own pass
+over the buffer. With a cache, the buffer after every step is memoised by the
+hash of the bank and of the steps that produced it, so recipes sharing a
+prefix don't repeat work.
+
+Recipes are JSON, either a list of steps or an object with a "steps" list:
+
+    {"steps": [
+        {"op": "normalize", "peak": 0.9},
+        {"op": "remove_dc"},
+        {"op": "crossfade_loop", "samples": 256},
+        {"op": "reverse", "slots": [0, 1, 2]}
+    ]}
+"""
+
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from medusa_bank import Bank, TRANSFORMS, quantize, select_rows
+
+
+def _step(name, slots=None, **params):
+    if name not in TRANSFORMS:
+        raise ValueError(f"Unknown transform: {name}")
+    if slots is not None:
+        slots = (int(slots),) if isinstance(slots, int) else tuple(int(slot) for slot in slots)
+    return (name, slots, tuple(sorted(params.items())))
+
+
+def fuse(steps):
+    """Return an equivalent, shorter list of steps.
+
+    Adjacent gains on the same slots are summed, a gain straight after a
+    normalize is folded into its target peak, and back-to-back reverses of the
+    same slots cancel out.
+    """
+    fused = []
+    for step in steps:
+        name, slots, params = step
+        if fused:
+            prev_name, prev_slots, prev_params = fused[-1]
+            if slots == prev_slots:
+                if name == 'gain' and prev_name == 'gain':
+                    db = dict(prev_params).get('db', 0.0) + dict(params).get('db', 0.0)
+                    fused[-1] = _step('gain', slots, db=db)
+                    continue
+                if name == 'gain' and prev_name == 'normalize':
+                    peak = dict(prev_params).get('peak', 1.0) * 10.0 ** (dict(params).get('db', 0.0) / 20.0)
+                    fused[-1] = _step('normalize', slots, peak=peak)
+                    continue
+                if name == 'reverse' and prev_name == 'reverse':
+                    fused.pop()
+                    continue
+        fused.append(step)
+    return fused
+
+
+def _steps_key(steps):
+    """Hash a list of steps into a stable key."""
+    encoded = json.dumps([[name, slots, params] for name, slots, params in steps], sort_keys=True)
+    return hashlib.sha1(encoded.encode('utf-8')).hexdigest()
+
+
+class PipelineCache:
+    """LRU cache of intermediate float buffers keyed by bank and step hashes."""
+
+    def __init__(self, max_entries=32):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            buf = self._entries.get(key)
+            if buf is not None:
+                self._entries.move_to_end(key)
+            return buf
+
+    def put(self, key, buf):
+        with self._lock:
+            self._entries[key] = buf
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class Pipeline:
+    """An immutable, lazily evaluated sequence of bank transforms."""
+
+    def __init__(self, steps=()):
+        self.steps = tuple(steps)
+
+    def then(self, name, slots=None, **params):
+        """Return a new pipeline with one more step."""
+        return Pipeline(self.steps + (_step(name, slots, **params),))
+
+    @classmethod
+    def from_recipe(cls, recipe):
+        """Build a pipeline from a parsed JSON recipe."""
+        if isinstance(recipe, dict):
+            recipe = recipe.get('steps', [])
+        pipeline = cls()
+        for entry in recipe:
+            entry = dict(entry)
+            if 'op' not in entry:
+                raise ValueError(f"Recipe step is missing 'op': {entry}")
+            pipeline = pipeline.then(entry.pop('op'), entry.pop('slots', None), **entry)
+        return pipeline
+
+    @classmethod
+    def load(cls, path):
+        """Load a pipeline from a JSON recipe file."""
+        with open(path) as f:
+            return cls.from_recipe(json.load(f))
+
+    def key(self):
+        """Return a hash identifying what this pipeline computes."""
+        return _steps_key(fuse(self.steps))
+
+    def run(self, bank, cache=None):
+        """Run the fused pipeline over bank and return a new Bank."""
+        steps = fuse(self.steps)
+        bank_hash = bank.content_hash() if cache is not None else None
+
+        # Resume from the longest prefix already in the cache
+        start = 0
+        buf = None
+        if cache is not None:
+            for end in range(len(steps), 0, -1):
+                cached = cache.get((bank_hash, _steps_key(steps[:end])))
+                if cached is not None:
+                    buf = cached.copy()
+                    start = end
+                    break
+        if buf is None:
+            buf = bank.data.astype(np.float32)
+
+        for end in range(start + 1, len(steps) + 1):
+            name, slots, params = steps[end - 1]
+            rows = select_rows(slots)
+            if slots is None:
+                TRANSFORMS[name](buf, **dict(params))
+            else:
+                selected = buf[rows]
+                TRANSFORMS[name](selected, **dict(params))
+                buf[rows] = selected
+            if cache is not None:
+                cache.put((bank_hash, _steps_key(steps[:end])), buf.copy())
+        return Bank(quantize(buf), bank.headers.copy(), bank.footer)
+
+
+def apply_recipe(recipe_file, input_files, output_file=None, output_dir=None, workers=None):
+    """Apply a JSON recipe to one or more .polyend files.
+
+    With a single input, output_file names the result; otherwise each result is
+    written to output_dir under its input's file name, which must be unique.
+    """
+    try:
+        pipeline = Pipeline.load(recipe_file)
+        if output_file:
+            if len(input_files) != 1:
+                raise Exception("--output only works with a single input; use --output-dir")
+            outputs = [output_file]
+        elif output_dir:
+            sources = {}
+            for path in input_files:
+                sources.setdefault(os.path.basename(path), set()).add(os.path.realpath(path))
+            clashes = sorted(name for name, paths in sources.items() if len(paths) > 1)
+            if clashes:
+                raise Exception(f"Several input files are named {', '.join(clashes)}; "
+                                f"apply the recipe to them separately")
+            # The same file given twice would have two threads writing one output
+            input_files = list(dict.fromkeys(input_files))
+            os.makedirs(output_dir, exist_ok=True)
+            outputs = [os.path.join(output_dir, os.path.basename(path)) for path in input_files]
+        else:
+            raise Exception("An output file or output directory is required")
+
+        cache = PipelineCache()
+
+        def run_one(paths):
+            input_file, result_file = paths
+            pipeline.run(Bank.load(input_file), cache).save(result_file)
+            return result_file
+
+        # NumPy releases the GIL for the heavy lifting, so threads scale here
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            files = list(pool.map(run_one, zip(input_files, outputs)))
+
+        return {
+            'success': True,
+            'num_banks': len(files),
+            'num_steps': len(fuse(pipeline.steps)),
+            'files': files
+        }
+
+    except Exception as e:
+        return {
+            'success': False,
+            'error': str(e)
+        }
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""Shared-memory PCM handoff between decoder processes.
+
+The parent allocates one (64, 7936) int16 buffer in shared memory; worker
+processes attach to it by name and decode each source straight into its
+slot row, so nothing is pickled back and no temp WAVs are written. The
+parent then packs the bank with one gathered write of the slot headers and
+the shared rows themselves.
+
+The parent owns the segment: it is unlinked when the SharedSlots context
+exits, whether the build succeeded, failed or was cancelled. Workers only
+ever attach and close.
+"""
+
+import io
+import os
+import functools
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from medusa_core import NUM_WAVETABLES, FOOTER_DATA, FFMPEG_TIMEOUT, CANCEL_POLL_INTERVAL
+from medusa_bank import SAMPLE_DTYPE, SLOT_SAMPLES, canonical_headers, load_audio, load_audio_stream
+from medusa_sources import submit_sources
+
+
+class SharedSlots:
+    """A (rows, SLOT_SAMPLES) int16 array in a named shared memory segment.
+
+    Create one in the parent with SharedSlots(rows); workers open the same
+    memory with SharedSlots.attach(name, rows). data is the NumPy view.
+    """
+
+    def __init__(self, rows=NUM_WAVETABLES, name=None):
+        self.rows = rows
+        self.owner = name is None
+        size = rows * SLOT_SAMPLES * SAMPLE_DTYPE.itemsize
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.shm = _attach(name)
+        self.data = np.ndarray((rows, SLOT_SAMPLES), dtype=SAMPLE_DTYPE, buffer=self.shm.buf)
+        if self.owner:
+            self.data.fill(0)
+
+    @classmethod
+    def attach(cls, name, rows=NUM_WAVETABLES):
+        return cls(rows, name)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def close(self):
+        """Unmap the segment, and delete it if this process created it."""
+        if self.shm is None:
+            return
+        self.data = None
+        try:
+            self.shm.close()
+        except BufferError:
+            pass  # A caller still holds a view; the mapping goes when that does
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+        self.shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _attach(name):
+    """Open an existing segment without making this process responsible for it."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Before Python 3.13 attaching always registers the segment, but pool
+        # workers share the parent's resource tracker, so that is a no-op and
+        # the segment is only ever unlinked by the parent
+        return shared_memory.SharedMemory(name=name)
+
+
+def _decode_into(name, rows, row, source, contents=None, timeout=FFMPEG_TIMEOUT):
+    """Worker: decode source, or an archive member's contents, into row of the named SharedSlots."""
+    with SharedSlots.attach(name, rows) as slots:
+        if contents is not None:
+            samples = load_audio_stream(io.BytesIO(contents), SLOT_SAMPLES, timeout=timeout)
+        else:
+            samples = load_audio(source, SLOT_SAMPLES, timeout=timeout)
+        slots.data[row, :len(samples)] = samples
+        slots.data[row, len(samples):] = 0
+
+
+def pack_bank(data, output_file, headers=None):
+    """Write a (64, SLOT_SAMPLES) int16 array as a .polyend file without copying the samples.
+
+    The slot headers and the rows of data (which may live in shared memory)
+    are handed to the OS as one gathered write.
+    """
+    headers = canonical_headers() if headers is None else headers
+    pieces = []
+    for i in range(NUM_WAVETABLES):
+        pieces.append(memoryview(headers[i]))
+        pieces.append(memoryview(data[i]).cast('B'))
+    pieces.append(memoryview(FOOTER_DATA))
+    with open(output_file, 'wb') as f:
+        if hasattr(os, 'writev'):
+            f.flush()
+            written = os.writev(f.fileno(), pieces)
+            # A short write is unusual for regular files, but finish the rest if it happens
+            for piece in pieces:
+                if written >= len(piece):
+                    written -= len(piece)
+                    continue
+                f.write(piece[written:])
+                written = 0
+        else:
+            for piece in pieces:
+                f.write(piece)
+    return output_file
+
+
+def _terminate(pool):
+    """Shut a process pool down without waiting: queued work is dropped and busy workers killed."""
+    processes = list((pool._processes or {}).values())
+    pool.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+
+
+def decode_to_slots(slots, sources, archive=None, workers=None, progress=None, cancel=None,
+                    timeout=FFMPEG_TIMEOUT):
+    """Decode sources into consecutive rows of slots on a process pool.
+
+    Sources that fail are skipped and later ones move up, so the decoded
+    sources fill rows 0..n-1 in order and the rest are zeroed. Returns
+    (decoded sources, {failed source: error message}). Members of an archive
+    are read by the parent in one pass and handed to the workers.
+
+    cancel is checked every CANCEL_POLL_INTERVAL seconds; when it fires, or
+    anything else goes wrong, the workers are terminated rather than joined,
+    so the caller doesn't wait for decodes already running.
+    """
+    failed = {}
+    ok = []
+    decode = functools.partial(_decode_into, slots.name, slots.rows, timeout=timeout)
+    pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        futures = {}
+        limit = 2 * (workers or os.cpu_count() or 1)
+        for future, row in submit_sources(pool, decode, sources[:slots.rows], archive, limit, cancel):
+            futures[future] = row
+            if cancel:
+                cancel.check()
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=CANCEL_POLL_INTERVAL, return_when=FIRST_COMPLETED)
+            if cancel:
+                cancel.check()
+            for future in done:
+                row = futures[future]
+                try:
+                    future.result()
+                    ok.append(row)
+                except Exception as e:
+                    failed[sources[row]] = str(e)
+                if progress:
+                    progress(len(futures) - len(pending), len(futures))
+    except BaseException:
+        _terminate(pool)
+        raise
+    pool.shutdown()
+    ok.sort()
+    if len(ok) < slots.rows:
+        # Close the gaps left by failures, in place in shared memory
+        slots.data[:len(ok)] = slots.data[ok]
+        slots.data[len(ok):] = 0
+    return [sources[row] for row in ok], failed
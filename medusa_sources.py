@@ -0,0 +1,476 @@
+#!/usr/bin/env python3
+"""Source file discovery for Medusa Wavetable Utility.
+
+Walks a directory tree once with os.scandir, matching audio extensions
+case-insensitively, and optionally keeps a persistent SQLite index of what it
+found so later builds only re-scan directories that changed. Selection
+strategies consume the walk as a stream, so picking a bank's sources needs
+memory proportional to the bank, not to the library.
+"""
+
+import os
+import wave
+import heapq
+import random
+import struct
+import sqlite3
+import tarfile
+import zipfile
+import contextlib
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, wait
+
+# Extensions accepted as source audio (compared case-insensitively)
+AUDIO_EXTENSIONS = ('.wav', '.aif', '.aiff', '.mp3', '.ogg')
+
+# Archives whose audio members can be used as sources without extracting them
+ARCHIVE_EXTENSIONS = ('.zip', '.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz')
+
+# Ways of choosing a bank's sources from a larger library
+SELECTION_MODES = ('alphabetical', 'random', 'folder', 'diverse')
+
+# Ways of dividing a library between banks
+PARTITION_MODES = ('sorted', 'random', 'folder', 'cluster')
+
+SourceFile = namedtuple('SourceFile', ['path', 'size', 'mtime', 'format', 'duration'])
+
+
+def _scan_directory(path, extensions):
+    """Return (audio entries, subdirectory paths) for a single directory."""
+    files = []
+    subdirs = []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                # Like glob, skip hidden entries (this also drops macOS ._ files)
+                if entry.name.startswith('.'):
+                    continue
+                try:
+                    if entry.is_dir():
+                        subdirs.append(entry.path)
+                    elif entry.is_file() and entry.name.lower().endswith(extensions):
+                        files.append(entry)
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    # Sort so walks are deterministic whether or not they come from an index
+    files.sort(key=lambda entry: entry.name)
+    subdirs.sort()
+    return files, subdirs
+
+
+def _dir_key(path):
+    st = os.stat(path)
+    return (st.st_dev, st.st_ino)
+
+
+def walk_directories(root, extensions=AUDIO_EXTENSIONS):
+    """Yield (directory, [audio file paths]) for root and every directory below it.
+
+    The tree is walked in a single pass; symlinked directories are followed
+    once, so link cycles cannot cause infinite recursion.
+    """
+    extensions = tuple(ext.lower() for ext in extensions)
+    stack = [root]
+    seen = set()
+    while stack:
+        directory = stack.pop()
+        try:
+            key = _dir_key(directory)
+        except OSError:
+            continue
+        if key in seen:
+            continue
+        seen.add(key)
+
+        files, subdirs = _scan_directory(directory, extensions)
+        yield directory, [entry.path for entry in files]
+        stack.extend(reversed(subdirs))
+
+
+def iter_audio_files(root, extensions=AUDIO_EXTENSIONS):
+    """Yield the path of every audio file under root."""
+    for _, files in walk_directories(root, extensions):
+        yield from files
+
+
+def is_archive(path):
+    """Return True if path is a ZIP or tar file we can read sources from."""
+    return os.path.isfile(path) and path.lower().endswith(ARCHIVE_EXTENSIONS)
+
+
+def archive_members(path, extensions=AUDIO_EXTENSIONS):
+    """Return the sorted names of audio files inside a ZIP or tar archive.
+
+    Hidden entries and macOS resource forks (__MACOSX) are skipped, as in
+    walk_directories().
+    """
+    extensions = tuple(ext.lower() for ext in extensions)
+    if path.lower().endswith('.zip'):
+        with zipfile.ZipFile(path) as archive:
+            names = [info.filename for info in archive.infolist() if not info.is_dir()]
+    else:
+        with tarfile.open(path) as archive:
+            # tar archives made from '.' store names like ./a.wav
+            names = [member.name[2:] if member.name.startswith('./') else member.name
+                     for member in archive.getmembers() if member.isfile()]
+    return sorted(name for name in names
+                  if name.lower().endswith(extensions)
+                  and not any(part.startswith('.') or part == '__MACOSX' for part in name.split('/')))
+
+
+def archive_directories(path, extensions=AUDIO_EXTENSIONS):
+    """Return [(folder, [member names])] for an archive, like walk_directories() does for a tree."""
+    folders = {}
+    for name in archive_members(path, extensions):
+        folders.setdefault(os.path.dirname(name), []).append(name)
+    return sorted(folders.items())
+
+
+def iter_archive_members(path, names):
+    """Yield (name, file object) for each of names found in a ZIP or tar archive.
+
+    A tar archive is read front to back exactly once, so a compressed one is
+    only decompressed once, and members come out in archive order as they
+    stream past. ZIP members are opened directly, in the order given. Each
+    file object is only readable until the next one is yielded.
+    """
+    if path.lower().endswith('.zip'):
+        with zipfile.ZipFile(path) as archive:
+            for name in names:
+                with archive.open(name) as member:
+                    yield name, member
+        return
+    wanted = set(names)
+    with tarfile.open(path, 'r|*') as archive:
+        for info in archive:
+            if not wanted:
+                break
+            name = info.name[2:] if info.name.startswith('./') else info.name
+            if name not in wanted or not info.isfile():
+                continue
+            wanted.discard(name)
+            with archive.extractfile(info) as member:
+                yield name, member
+
+
+def submit_sources(pool, fn, sources, archive=None, limit=8, cancel=None):
+    """Submit fn(i, source, contents) to pool for each source, yielding (future, i) as each is queued.
+
+    contents is None for files. For members of an archive it is the member's
+    bytes, read in one pass with iter_archive_members(); at most limit of
+    them wait in memory for a worker at once, and cancel (a CancelToken) is
+    checked while waiting.
+    """
+    # Imported here: medusa_core imports this module
+    from medusa_core import CANCEL_POLL_INTERVAL
+    if archive is None:
+        for i, source in enumerate(sources):
+            yield pool.submit(fn, i, source, None), i
+        return
+    rows = {source: i for i, source in enumerate(sources)}
+    pending = set()
+    for name, member in iter_archive_members(archive, sources):
+        while len(pending) >= limit:
+            _, pending = wait(pending, timeout=CANCEL_POLL_INTERVAL, return_when=FIRST_COMPLETED)
+            if cancel:
+                cancel.check()
+        future = pool.submit(fn, rows[name], name, member.read())
+        pending.add(future)
+        yield future, rows[name]
+
+
+@contextlib.contextmanager
+def open_archive_member(path, name):
+    """Open one archive member for streaming reads, without extracting it.
+
+    Each call re-opens the archive, which for a compressed tar means
+    decompressing it up to the member; use iter_archive_members() to read
+    several members.
+    """
+    if path.lower().endswith('.zip'):
+        with zipfile.ZipFile(path) as archive, archive.open(name) as member:
+            yield member
+    else:
+        with tarfile.open(path) as archive:
+            try:
+                member = archive.extractfile(name)
+            except KeyError:
+                member = archive.extractfile('./' + name)
+            if member is None:
+                raise Exception(f"{name} is not a regular file in {path}")
+            with member:
+                yield member
+
+
+def select_alphabetical(paths, k):
+    """Return the first k paths in sorted order, keeping only k in memory."""
+    return heapq.nsmallest(k, paths)
+
+
+def reservoir_sample(paths, k, rng):
+    """Return k paths sampled uniformly from a stream, in random order."""
+    reservoir = []
+    for i, path in enumerate(paths):
+        if i < k:
+            reservoir.append(path)
+        else:
+            j = rng.randrange(i + 1)
+            if j < k:
+                reservoir[j] = path
+    rng.shuffle(reservoir)
+    return reservoir
+
+
+def folder_weighted_sample(directories, k, rng, folder_weights=None):
+    """Sample k paths so every folder is equally likely to contribute, in random order.
+
+    directories is a stream of (directory, [paths]) pairs such as the one
+    produced by walk_directories(). Each file is weighted by its folder's
+    weight (default 1) divided by the number of files in that folder, so a
+    folder with 5,000 files doesn't crowd out one with 50. Uses weighted
+    reservoir sampling (Efraimidis-Spirakis), keeping only k candidates.
+    """
+    heap = []
+    for directory, paths in directories:
+        if not paths:
+            continue
+        weight = (folder_weights or {}).get(directory, 1.0) / len(paths)
+        if weight <= 0:
+            continue
+        for path in paths:
+            key = rng.random() ** (1.0 / weight)
+            if len(heap) < k:
+                heapq.heappush(heap, (key, path))
+            elif key > heap[0][0]:
+                heapq.heapreplace(heap, (key, path))
+    selected = [path for _, path in heap]
+    rng.shuffle(selected)
+    return selected
+
+
+def select_sources(directories, k, mode='alphabetical', seed=None, index=None, cancel=None, conversion_slot=None):
+    """Pick up to k source paths from a stream of (directory, [paths]) pairs.
+
+    mode is one of SELECTION_MODES. Passing the same seed over an unchanged
+    library reproduces the same selection. The 'diverse' mode decodes a short
+    window of every candidate, so unlike the others it needs memory
+    proportional to the library; its features are cached in index if given,
+    and cancel and conversion_slot apply to its decodes (see extract_features).
+    """
+    if mode not in SELECTION_MODES:
+        raise ValueError(f"Unknown selection mode: {mode}")
+    rng = random.Random(seed)
+    if mode == 'folder':
+        return folder_weighted_sample(directories, k, rng)
+    paths = (path for _, dir_paths in directories for path in dir_paths)
+    if mode == 'diverse':
+        # Imported here so the streaming modes don't need NumPy
+        from medusa_features import select_diverse
+        return select_diverse(paths, k, rng if seed is not None else None, index,
+                              cancel=cancel, conversion_slot=conversion_slot)
+    if mode == 'random':
+        return reservoir_sample(paths, k, rng)
+    return select_alphabetical(paths, k)
+
+
+def detect_format(path):
+    """Detect an audio container from its magic bytes, or return None."""
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(12)
+    except OSError:
+        return None
+    if head[0:4] == b'RIFF' and head[8:12] == b'WAVE':
+        return 'wav'
+    if head[0:4] == b'FORM' and head[8:12] in (b'AIFF', b'AIFC'):
+        return 'aiff'
+    if head[0:4] == b'OggS':
+        return 'ogg'
+    if head[0:3] == b'ID3' or (len(head) >= 2 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0):
+        return 'mp3'
+    return None
+
+
+def _extended_to_float(data):
+    """Decode an 80-bit IEEE 754 extended float (used for AIFF sample rates)."""
+    exponent, mantissa = struct.unpack('>HQ', data)
+    sign = -1 if exponent & 0x8000 else 1
+    exponent &= 0x7FFF
+    if exponent == 0 and mantissa == 0:
+        return 0.0
+    return sign * mantissa * 2.0 ** (exponent - 16383 - 63)
+
+
+def _aiff_duration(path):
+    with open(path, 'rb') as f:
+        f.seek(12)
+        while True:
+            chunk = f.read(8)
+            if len(chunk) < 8:
+                return None
+            chunk_id, chunk_size = struct.unpack('>4sI', chunk)
+            if chunk_id == b'COMM':
+                comm = f.read(18)
+                _, num_frames, _ = struct.unpack('>hIh', comm[:8])
+                sample_rate = _extended_to_float(comm[8:18])
+                return num_frames / sample_rate if sample_rate else None
+            f.seek(chunk_size + (chunk_size & 1), os.SEEK_CUR)
+
+
+def probe_duration(path, fmt):
+    """Return the duration in seconds for formats that can be read cheaply, else None."""
+    try:
+        if fmt == 'wav':
+            with wave.open(path, 'rb') as wav:
+                return wav.getnframes() / wav.getframerate()
+        if fmt == 'aiff':
+            return _aiff_duration(path)
+    except Exception:
+        pass
+    return None
+
+
+class SourceIndex:
+    """Persistent index of audio files under one or more source directories.
+
+    Each directory's mtime is recorded; on later scans, directories whose mtime
+    is unchanged are served from the index without being listed or having
+    their files stat()ed. Files edited in place don't change their directory's
+    mtime, so pass full=True to scan() to force a complete re-scan.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS dirs (
+                path TEXT PRIMARY KEY,
+                parent TEXT,
+                mtime_ns INTEGER
+            );
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                dir TEXT,
+                size INTEGER,
+                mtime_ns INTEGER,
+                format TEXT,
+                duration REAL
+            );
+            CREATE TABLE IF NOT EXISTS features (
+                path TEXT PRIMARY KEY,
+                size INTEGER,
+                mtime_ns INTEGER,
+                vector BLOB
+            );
+            CREATE INDEX IF NOT EXISTS files_dir ON files(dir);
+            CREATE INDEX IF NOT EXISTS dirs_parent ON dirs(parent);
+        ''')
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _cached_dir(self, directory, mtime_ns):
+        row = self.conn.execute('SELECT mtime_ns FROM dirs WHERE path = ?', (directory,)).fetchone()
+        if row is None or row[0] != mtime_ns:
+            return None
+        files = [SourceFile(path, size, mtime_ns / 1e9, fmt, duration) for path, size, mtime_ns, fmt, duration
+                 in self.conn.execute('SELECT path, size, mtime_ns, format, duration FROM files '
+                                      'WHERE dir = ? ORDER BY path', (directory,))]
+        subdirs = [path for (path,) in self.conn.execute('SELECT path FROM dirs WHERE parent = ? ORDER BY path',
+                                                         (directory,))]
+        return files, subdirs
+
+    def _rescan_dir(self, directory, parent, mtime_ns, extensions):
+        known = {row[0]: row[1:] for row in self.conn.execute(
+            'SELECT path, size, mtime_ns, format, duration FROM files WHERE dir = ?', (directory,))}
+        entries, subdirs = _scan_directory(directory, extensions)
+
+        files = []
+        for entry in entries:
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            previous = known.get(entry.path)
+            if previous and previous[0] == st.st_size and previous[1] == st.st_mtime_ns:
+                fmt, duration = previous[2], previous[3]
+            else:
+                fmt = detect_format(entry.path)
+                duration = probe_duration(entry.path, fmt)
+            files.append((entry.path, directory, st.st_size, st.st_mtime_ns, fmt, duration))
+
+        self.conn.execute('DELETE FROM files WHERE dir = ?', (directory,))
+        self.conn.executemany('INSERT INTO files VALUES (?, ?, ?, ?, ?, ?)', files)
+        self.conn.execute('INSERT OR REPLACE INTO dirs VALUES (?, ?, ?)', (directory, parent, mtime_ns))
+        return [SourceFile(path, size, mtime_ns / 1e9, fmt, duration)
+                for path, _, size, mtime_ns, fmt, duration in files], subdirs
+
+    def walk(self, root, extensions=AUDIO_EXTENSIONS, full=False):
+        """Yield (directory, [SourceFile]) for root and every directory below it.
+
+        Works like walk_directories() but reads unchanged directories from the index.
+        """
+        extensions = tuple(ext.lower() for ext in extensions)
+        root = os.path.abspath(root)
+        visited = set()
+        seen = set()
+        stack = [(root, None)]
+        try:
+            while stack:
+                directory, parent = stack.pop()
+                try:
+                    st = os.stat(directory)
+                except OSError:
+                    continue
+                if (st.st_dev, st.st_ino) in seen:
+                    continue
+                seen.add((st.st_dev, st.st_ino))
+                visited.add(directory)
+
+                cached = None if full else self._cached_dir(directory, st.st_mtime_ns)
+                if cached is None:
+                    cached = self._rescan_dir(directory, parent, st.st_mtime_ns, extensions)
+                files, subdirs = cached
+                yield directory, files
+                stack.extend((subdir, directory) for subdir in reversed(subdirs))
+
+            # Forget directories under root that no longer exist
+            prefix = root.rstrip(os.sep) + os.sep
+            stale = [path for (path,) in self.conn.execute('SELECT path FROM dirs')
+                     if (path == root or path.startswith(prefix)) and path not in visited]
+            self.conn.executemany('DELETE FROM dirs WHERE path = ?', [(path,) for path in stale])
+            self.conn.executemany('DELETE FROM files WHERE dir = ?', [(path,) for path in stale])
+        finally:
+            self.conn.commit()
+
+    def get_features(self, paths):
+        """Yield (path, feature bytes) for paths whose cached features are still current."""
+        paths = list(paths)
+        for start in range(0, len(paths), 500):
+            chunk = paths[start:start + 500]
+            yield from self.conn.execute(
+                'SELECT f.path, f.vector FROM features f JOIN files s '
+                'ON f.path = s.path AND f.size = s.size AND f.mtime_ns = s.mtime_ns '
+                f'WHERE f.path IN ({",".join("?" * len(chunk))})', chunk)
+
+    def put_features(self, items):
+        """Cache feature bytes for indexed paths from an iterable of (path, feature bytes)."""
+        self.conn.executemany(
+            'INSERT OR REPLACE INTO features SELECT path, size, mtime_ns, ? FROM files WHERE path = ?',
+            ((vector, path) for path, vector in items))
+        self.conn.commit()
+
+    def scan(self, root, extensions=AUDIO_EXTENSIONS, full=False):
+        """Return a list of SourceFile records for every audio file under root."""
+        files = []
+        for _, dir_files in self.walk(root, extensions, full):
+            files.extend(dir_files)
+        return files
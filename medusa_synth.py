@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""Procedural wavetable generation for Medusa Wavetable Utility.
+
+Banks are built from per-slot harmonic amplitudes and phases with one batched
+inverse real FFT over a (..., 64, n_harmonics) matrix, or by morphing between
+anchor waveforms in the frequency domain, then packed straight into the
+.polyend layout without any intermediate audio files.
+"""
+
+import json
+import numpy as np
+
+from medusa_core import NUM_WAVETABLES, FAMILIES, DEFAULT_HARMONICS
+from medusa_bank import Bank, SLOT_SAMPLES, quantize, load_audio, pad_slots
+
+MAX_HARMONICS = SLOT_SAMPLES // 2 - 1  # Highest harmonic below Nyquist at one cycle per slot
+
+
+def render_harmonics(amplitudes, phases=None, cycles=1, peak=0.9):
+    """Render harmonic specs to int16 slots.
+
+    amplitudes has shape (..., 64, n_harmonics); column h holds the level of
+    harmonic h + 1 as a sine at phase 0. phases, in radians, broadcasts
+    against amplitudes. Each slot holds `cycles` periods of the fundamental
+    and is normalized to peak. Any leading batch dimensions are rendered in
+    the same FFT, so many banks can be generated at once.
+    """
+    amplitudes = np.asarray(amplitudes, dtype=np.float64)
+    n_harmonics = amplitudes.shape[-1]
+    if n_harmonics * cycles > MAX_HARMONICS:
+        raise ValueError(f"{n_harmonics} harmonics at {cycles} cycles per slot exceed Nyquist")
+
+    coefficients = amplitudes.astype(np.complex128)
+    if phases is not None:
+        coefficients = coefficients * np.exp(1j * np.asarray(phases, dtype=np.float64))
+    # A sine at phase 0 is -j in the cosine-based real FFT convention
+    coefficients = coefficients * (-0.5j * SLOT_SAMPLES)
+
+    spectrum = np.zeros(amplitudes.shape[:-1] + (SLOT_SAMPLES // 2 + 1,), dtype=np.complex128)
+    spectrum[..., cycles:(n_harmonics + 1) * cycles:cycles] = coefficients
+    waves = np.fft.irfft(spectrum, n=SLOT_SAMPLES, axis=-1)
+
+    peaks = np.abs(waves).max(axis=-1, keepdims=True)
+    waves *= np.divide(peak * 32767.0, peaks, out=np.zeros_like(peaks), where=peaks > 0)
+    return quantize(waves)
+
+
+def family_harmonics(family, n_harmonics=DEFAULT_HARMONICS):
+    """Return (amplitudes, phases) of shape (64, n_harmonics) for a parametric family.
+
+    saw_square morphs from a sawtooth to a square wave, pwm sweeps a pulse
+    from 50% down to 5% duty cycle, and formant sweeps a resonant peak up
+    through a sawtooth-like harmonic series.
+    """
+    h = np.arange(1, n_harmonics + 1, dtype=np.float64)
+    position = np.linspace(0.0, 1.0, NUM_WAVETABLES)[:, None]
+    phases = np.zeros((NUM_WAVETABLES, n_harmonics))
+
+    if family == 'saw_square':
+        saw = 1.0 / h
+        square = np.where(h % 2 == 1, 1.0 / h, 0.0)
+        amplitudes = (1.0 - position) * saw + position * square
+    elif family == 'pwm':
+        duty = 0.5 - 0.45 * position
+        amplitudes = 2.0 / (np.pi * h) * np.sin(np.pi * h * duty)
+        phases[:] = np.pi / 2  # Pulse trains are cosine series
+    elif family == 'formant':
+        center = np.geomspace(2.0, max(n_harmonics / 4.0, 3.0), NUM_WAVETABLES)[:, None]
+        width = 0.15 * center + 1.0
+        amplitudes = (0.1 + np.exp(-0.5 * ((h - center) / width) ** 2)) / np.sqrt(h)
+    else:
+        raise ValueError(f"Unknown family: {family}")
+    return amplitudes, phases
+
+
+def load_spec(spec_file):
+    """Load (amplitudes, phases) from a JSON spec.
+
+    The spec is an object with "amplitudes" and optional "phases", each either
+    one list of per-harmonic values shared by every slot or a list of 64 lists.
+    """
+    with open(spec_file) as f:
+        spec = json.load(f)
+    amplitudes = np.asarray(spec['amplitudes'], dtype=np.float64)
+    if amplitudes.ndim == 1:
+        amplitudes = np.broadcast_to(amplitudes, (NUM_WAVETABLES, amplitudes.size))
+    if amplitudes.shape[0] != NUM_WAVETABLES:
+        raise ValueError(f"Spec must give 1 or {NUM_WAVETABLES} rows of amplitudes, got {amplitudes.shape[0]}")
+    phases = spec.get('phases')
+    if phases is not None:
+        phases = np.broadcast_to(np.asarray(phases, dtype=np.float64), amplitudes.shape)
+    return amplitudes, phases
+
+
+def synthesize_wavetable(output_file, family=None, spec_file=None, n_harmonics=DEFAULT_HARMONICS, cycles=1):
+    """Create a .polyend file from a parametric family or a JSON harmonic spec."""
+    try:
+        if spec_file:
+            amplitudes, phases = load_spec(spec_file)
+        elif family:
+            amplitudes, phases = family_harmonics(family, n_harmonics)
+        else:
+            raise Exception("Either a family or a spec file is required")
+
+        Bank(render_harmonics(amplitudes, phases, cycles)).save(output_file)
+        return {
+            'success': True,
+            'output_file': output_file,
+            'num_wavetables': NUM_WAVETABLES,
+            'num_harmonics': amplitudes.shape[-1]
+        }
+
+    except Exception as e:
+        return {
+            'success': False,
+            'error': str(e)
+        }
+
+
+def morph_frames(anchors, frames=NUM_WAVETABLES):
+    """Interpolate frames waveforms between 2 or more anchor waveforms.
+
+    anchors has shape (k, SLOT_SAMPLES) and is spread evenly across the
+    frames, with anchor 0 on the first frame and anchor k-1 on the last.
+    Magnitudes and unwrapped phases are interpolated per frequency bin, so
+    harmonics glide between anchors instead of cross-fading. All frames come
+    out of one matrix product and one batched inverse FFT.
+    """
+    anchors = np.asarray(anchors, dtype=np.float64)
+    if anchors.ndim != 2 or len(anchors) < 2:
+        raise ValueError("At least two anchor waveforms are required")
+    spectra = np.fft.rfft(anchors, axis=1)
+    magnitudes = np.abs(spectra)
+    # Unwrap across anchors so each bin's phase takes the shortest path
+    phases = np.unwrap(np.angle(spectra), axis=0)
+
+    # (frames, k) piecewise-linear weights: each row blends its two nearest anchors
+    position = np.linspace(0.0, len(anchors) - 1, frames)
+    weights = np.maximum(0.0, 1.0 - np.abs(position[:, None] - np.arange(len(anchors))[None, :]))
+
+    spectrum = (weights @ magnitudes) * np.exp(1j * (weights @ phases))
+    return quantize(np.fft.irfft(spectrum, n=anchors.shape[1], axis=1))
+
+
+def morph_wavetable(output_file, bank_file=None, slots=None, audio_files=None):
+    """Create a .polyend file that morphs between anchor waveforms.
+
+    Anchors are either slots of an existing bank or the first SLOT_SAMPLES
+    samples of audio files.
+    """
+    try:
+        if bank_file:
+            anchors = Bank.load(bank_file).data[list(slots or [0, NUM_WAVETABLES - 1])]
+        elif audio_files:
+            anchors = pad_slots([load_audio(path) for path in audio_files])
+        else:
+            raise Exception("Either a bank or audio files are required for anchors")
+        if not 2 <= len(anchors) <= NUM_WAVETABLES:
+            raise Exception(f"Between 2 and {NUM_WAVETABLES} anchors are required, got {len(anchors)}")
+
+        Bank(morph_frames(anchors)).save(output_file)
+        return {
+            'success': True,
+            'output_file': output_file,
+            'num_wavetables': NUM_WAVETABLES,
+            'num_anchors': len(anchors)
+        }
+
+    except Exception as e:
+        return {
+            'success': False,
+            'error': str(e)
+        }
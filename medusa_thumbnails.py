@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""Waveform thumbnails for wavetable banks.
+
+The min/max envelope of every slot is computed in one vectorized pass over
+the (64, 7936) sample array, then drawn as PNG (encoded with zlib and struct,
+no imaging library needed) or SVG, either one image per slot or an 8x8 sprite
+sheet of the whole bank. Rendered images are cached by bank content hash.
+"""
+
+import zlib
+import struct
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from medusa_core import NUM_WAVETABLES
+
+THUMBNAIL_WIDTH = 64  # Pixels (envelope columns) per slot
+THUMBNAIL_HEIGHT = 32
+SPRITE_COLUMNS = 8
+FOREGROUND = (0x00, 0x00, 0x80)  # Navy, as used for titles in the web UI
+BACKGROUND = (0xFF, 0xFF, 0xFF)
+FORMATS = ('png', 'svg')
+
+
+def envelopes(data, width=THUMBNAIL_WIDTH):
+    """Return (mins, maxs), each (n_slots, width), scaled to -1..1."""
+    edges = np.linspace(0, data.shape[1], width + 1).astype(int)[:-1]
+    mins = np.minimum.reduceat(data, edges, axis=1) / 32768.0
+    maxs = np.maximum.reduceat(data, edges, axis=1) / 32768.0
+    return mins, maxs
+
+
+def _masks(data, width, height):
+    """Return an (n_slots, height, width) boolean image of each slot's envelope."""
+    mins, maxs = envelopes(data, width)
+    # Row 0 is the top of the image, i.e. full positive scale
+    top = np.floor((1.0 - maxs) * 0.5 * (height - 1)).astype(int)
+    bottom = np.ceil((1.0 - mins) * 0.5 * (height - 1)).astype(int)
+    rows = np.arange(height)[None, :, None]
+    return (rows >= top[:, None, :]) & (rows <= bottom[:, None, :])
+
+
+def _sprite(images, columns=SPRITE_COLUMNS):
+    """Tile (n, h, w, ...) images into one (rows * h, columns * w, ...) sheet."""
+    n, h, w = images.shape[:3]
+    rows = -(-n // columns)
+    padded = np.zeros((rows * columns,) + images.shape[1:], dtype=images.dtype)
+    padded[:n] = images
+    grid = padded.reshape((rows, columns, h, w) + images.shape[3:])
+    return grid.swapaxes(1, 2).reshape((rows * h, columns * w) + images.shape[3:])
+
+
+def encode_png(mask, foreground=FOREGROUND, background=BACKGROUND):
+    """Encode a 2-D boolean mask as a 1-bit, two-colour palette PNG."""
+    height, width = mask.shape
+    # Each scanline starts with filter type 0 (none), then 8 pixels per byte
+    packed = np.packbits(mask, axis=1)
+    raw = np.zeros((height, packed.shape[1] + 1), dtype=np.uint8)
+    raw[:, 1:] = packed
+
+    def chunk(kind, payload):
+        return (struct.pack('>I', len(payload)) + kind + payload
+                + struct.pack('>I', zlib.crc32(kind + payload) & 0xFFFFFFFF))
+
+    return (b'\x89PNG\r\n\x1a\n'
+            + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 1, 3, 0, 0, 0))
+            + chunk(b'PLTE', bytes(background) + bytes(foreground))
+            + chunk(b'IDAT', zlib.compress(raw.tobytes(), 6))
+            + chunk(b'IEND', b''))
+
+
+def _svg_path(mins, maxs, x0, y0, width, height):
+    x = x0 + np.arange(len(maxs)) * (width / len(maxs))
+    upper = y0 + (1.0 - maxs) * 0.5 * height
+    lower = y0 + (1.0 - mins) * 0.5 * height
+    points = np.concatenate([np.stack([x, upper], axis=1), np.stack([x, lower], axis=1)[::-1]])
+    # Whole tenths of a pixel are plenty, and integer formatting is much faster than floats
+    tenths = np.rint(points * 10).astype(int)
+    return 'M' + 'L'.join(f'{px // 10}.{px % 10},{py // 10}.{py % 10}' for px, py in tenths.tolist()) + 'Z'
+
+
+def encode_svg(data, width=THUMBNAIL_WIDTH, height=THUMBNAIL_HEIGHT, columns=None, foreground=FOREGROUND):
+    """Draw each row of data as a filled envelope; tile them if columns is given."""
+    mins, maxs = envelopes(data, width)
+    columns = columns or 1
+    rows = -(-len(data) // columns)
+    color = '#%02x%02x%02x' % foreground
+    paths = [f'<path d="{_svg_path(mins[i], maxs[i], (i % columns) * width, (i // columns) * height, width, height)}"/>'
+             for i in range(len(data))]
+    return (f'<svg xmlns="http://www.w3.org/2000/svg" width="{columns * width}" height="{rows * height}" '
+            f'viewBox="0 0 {columns * width} {rows * height}"><g fill="{color}">{"".join(paths)}</g></svg>').encode()
+
+
+def render_thumbnails(data, fmt='png', width=THUMBNAIL_WIDTH, height=THUMBNAIL_HEIGHT):
+    """Render a sprite sheet of every row of data (8 per row) as PNG or SVG bytes.
+
+    A single slot is rendered on its own by passing data[i:i + 1].
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown thumbnail format: {fmt}")
+    columns = SPRITE_COLUMNS if len(data) > 1 else 1
+    if fmt == 'svg':
+        return encode_svg(data, width, height, columns)
+    return encode_png(_sprite(_masks(data, width, height), columns))
+
+
+class ThumbnailCache:
+    """LRU cache of rendered thumbnails keyed by bank content hash and options."""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, render):
+        """Return the cached image for key, calling render() to create it if needed."""
+        with self._lock:
+            image = self._entries.get(key)
+            if image is not None:
+                self._entries.move_to_end(key)
+                return image
+        image = render()
+        with self._lock:
+            self._entries[key] = image
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return image
+
+    def __len__(self):
+        return len(self._entries)
+
+
+thumbnail_cache = ThumbnailCache()
+
+
+def bank_thumbnails(bank, fmt='png', slot=None, cache=thumbnail_cache):
+    """Return a thumbnail of a Bank (one slot, or an 8x8 sprite of all 64), cached by content hash."""
+    rows = slice(None) if slot is None else slice(slot, slot + 1)
+    if slot is not None and not 0 <= slot < NUM_WAVETABLES:
+        raise ValueError(f"Slot index must be between 0 and {NUM_WAVETABLES - 1}, got {slot}")
+    return cache.get((bank.content_hash(), fmt, slot), lambda: render_thumbnails(bank.data[rows], fmt))
@@ -37,31 +37,33 @@ def read_wavetables(filepath, verbose=False):
         print(f"File size: {filesize} bytes")
         print(f"Expected size: {TOTAL_FILE_SIZE} bytes")
     
+    # One read for the whole file instead of a seek+read per wavetable
     with open(filepath, 'rb') as f:
-        # First wavetable is special
-        header = f.read(4)
-        if header == FIRST_HEADER_MARKER:
-            identifier = f.read(IDENTIFIER_SIZE)
-            if verbose:
-                print(f"Found first wavetable at position 0 with identifier {identifier.hex()}")
-            wavetables.append(Wavetable(0, 0, WAVETABLE_SIZE, True, identifier))
-        else:
-            if verbose:
-                print(f"Warning: First wavetable header not found, got {header.hex()}")
+        data = f.read()
+    
+    # First wavetable is special
+    header = data[0:4]
+    if header == FIRST_HEADER_MARKER:
+        identifier = data[4:4 + IDENTIFIER_SIZE]
+        if verbose:
+            print(f"Found first wavetable at position 0 with identifier {identifier.hex()}")
+        wavetables.append(Wavetable(0, 0, WAVETABLE_SIZE, True, identifier))
+    else:
+        if verbose:
+            print(f"Warning: First wavetable header not found, got {header.hex()}")
+    
+    # Read remaining wavetables
+    for i in range(1, NUM_WAVETABLES):
+        position = i * WAVETABLE_SIZE
+        header = data[position:position + 4]
         
-        # Read remaining wavetables
-        for i in range(1, NUM_WAVETABLES):
-            position = i * WAVETABLE_SIZE
-            f.seek(position)
-            header = f.read(4)
-            
-            if header == HEADER_MARKER:
-                identifier = f.read(IDENTIFIER_SIZE)
-                if verbose:
-                    print(f"Found wavetable at position 0x{position:06x} with identifier {identifier.hex()}")
-                wavetables.append(Wavetable(i, position, WAVETABLE_SIZE, False, identifier))
-            elif verbose:
-                print(f"Warning: Expected wavetable at 0x{position:06x}, got {header.hex()}")
+        if header == HEADER_MARKER:
+            identifier = data[position + 4:position + 4 + IDENTIFIER_SIZE]
+            if verbose:
+                print(f"Found wavetable at position 0x{position:06x} with identifier {identifier.hex()}")
+            wavetables.append(Wavetable(i, position, WAVETABLE_SIZE, False, identifier))
+        elif verbose:
+            print(f"Warning: Expected wavetable at 0x{position:06x}, got {header.hex()}")
     
     if verbose:
         print(f"Total wavetables found: {len(wavetables)}")
@@ -87,24 +89,36 @@ def convert_to_wav(raw_data, output_file):
         
         wav_file.writeframes(b''.join(samples))
 
+def read_wavetable(filepath, index):
+    """Read one wavetable with a single positioned read; return (Wavetable, data) or None."""
+    if not 0 <= index < NUM_WAVETABLES:
+        return None
+    position = index * WAVETABLE_SIZE
+    with open(filepath, 'rb') as f:
+        if hasattr(os, 'pread'):
+            data = os.pread(f.fileno(), WAVETABLE_SIZE, position)
+        else:
+            f.seek(position)
+            data = f.read(WAVETABLE_SIZE)
+    
+    expected = FIRST_HEADER_MARKER if index == 0 else HEADER_MARKER
+    if len(data) < WAVETABLE_SIZE or data[0:4] != expected:
+        return None
+    identifier = data[4:4 + IDENTIFIER_SIZE]
+    return Wavetable(index, position, WAVETABLE_SIZE, index == 0, identifier), data
+
 def extract_wavetable(filepath, index, output_dir, as_wav=True):
     """Extract a single wavetable to a file."""
-    wavetables = read_wavetables(filepath)
-    matching_tables = [wt for wt in wavetables if wt.index == index]
+    found = read_wavetable(filepath, index)
     
-    if not matching_tables:
+    if not found:
         print(f"Error: Wavetable index {index} not found")
         return False
     
-    wavetable = matching_tables[0]
+    wavetable, data = found
     output_dir = Path(output_dir)
     output_dir.mkdir(parents=True, exist_ok=True)
     
-    # Read the wavetable data
-    with open(filepath, 'rb') as f:
-        f.seek(wavetable.position)
-        data = f.read(wavetable.size)
-    
     # Save the identifier along with the WAV data
     identifier_file = output_dir / f"wavetable_{index:02d}.id"
     with open(identifier_file, 'wb') as f:
@@ -30,4 +30,37 @@ def temp_output_dir(tmp_path):
 @pytest.fixture
 def sample_waves_dir(test_data_dir):
     """Return the path to the sample waves directory."""
-    return test_data_dir / 'valid' / 'waves' 
\ No newline at end of file
+    return test_data_dir / 'valid' / 'waves' 
+
+@pytest.fixture
+def generated_waves_dir(tmp_path):
+    """Write 64 deterministic single-cycle WAV files and return their directory."""
+    import math
+    import wave
+    from array import array
+
+    waves_dir = tmp_path / 'generated_waves'
+    waves_dir.mkdir()
+    num_samples = 7936
+    for i in range(64):
+        samples = array('h', (
+            int(12000 * math.sin(2 * math.pi * (i + 1) * n / num_samples))
+            for n in range(num_samples)
+        ))
+        with wave.open(str(waves_dir / f'wavetable_{i:02d}.wav'), 'wb') as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(44100)
+            wav.writeframes(samples.tobytes())
+    return waves_dir
+
+
+@pytest.fixture
+def generated_polyend_file(generated_waves_dir, tmp_path):
+    """Return a .polyend file recompiled from generated_waves_dir."""
+    from medusa_core import recompile_wavetable
+
+    output_file = tmp_path / 'generated.polyend'
+    result = recompile_wavetable(str(generated_waves_dir), str(output_file))
+    assert result['success'], result
+    return output_file
@@ -0,0 +1,59 @@
+import numpy as np
+from medusa_bank import Bank
+from medusa_archive import Archive, archive_banks, extract_banks, compress_slot, decompress_slot
+
+def test_slot_codec_round_trip():
+    """Test that delta coding survives int16 wraparound."""
+    samples = np.array([32767, -32768, 0, -1, 32767] * 100, dtype=np.int16)
+    assert (decompress_slot(*compress_slot(samples)) == samples).all()
+
+def test_archive_deduplicates_and_rebuilds(generated_polyend_file, tmp_path):
+    """Test that shared slots are stored once and banks rebuild byte for byte."""
+    edited = Bank.load(generated_polyend_file)
+    edited.data[:4] = 0
+    edited.headers[10, 0x50] = 7  # Non-canonical header byte
+    edited_file = tmp_path / 'edited.polyend'
+    edited.save(edited_file)
+
+    archive_file = str(tmp_path / 'library.db')
+    result = archive_banks(archive_file, [str(generated_polyend_file), str(edited_file)])
+    assert result['success'] is True
+    assert result['unique_slots'] == 65
+    assert result['stored_bytes'] < 2 * 1024 * 1024 / 4
+
+    with Archive(archive_file) as archive:
+        assert archive.names() == ['edited.polyend', generated_polyend_file.name]
+
+    result = extract_banks(archive_file, str(tmp_path / 'out'))
+    assert result['success'] is True
+    assert (tmp_path / 'out' / 'edited.polyend').read_bytes() == edited_file.read_bytes()
+    assert (tmp_path / 'out' / generated_polyend_file.name).read_bytes() == generated_polyend_file.read_bytes()
+
+def test_extract_unknown_bank(tmp_path):
+    """Test that extracting a missing bank reports an error."""
+    result = extract_banks(str(tmp_path / 'library.db'), str(tmp_path / 'out'), ['missing.polyend'])
+    assert result['success'] is False
+
+def test_archive_refuses_name_clashes_and_collects_replaced_slots(generated_polyend_file, tmp_path):
+    """Test that same-named banks don't silently overwrite each other, and replacing one drops its slots."""
+    import shutil
+    for folder in ('a', 'b'):
+        (tmp_path / folder).mkdir()
+    shutil.copy(generated_polyend_file, tmp_path / 'a' / 'bank.polyend')
+    edited = Bank.load(generated_polyend_file)
+    edited.data[:4] = 1
+    edited.save(tmp_path / 'b' / 'bank.polyend')
+    archive_file = str(tmp_path / 'library.db')
+
+    result = archive_banks(archive_file, [str(tmp_path / 'a' / 'bank.polyend'), str(tmp_path / 'b' / 'bank.polyend')])
+    assert result['success'] is False
+    assert 'bank.polyend' in result['error']
+
+    assert archive_banks(archive_file, [str(tmp_path / 'b' / 'bank.polyend')])['success'] is True
+    assert archive_banks(archive_file, [str(tmp_path / 'a' / 'bank.polyend')])['success'] is False
+    result = archive_banks(archive_file, [str(tmp_path / 'a' / 'bank.polyend')], replace=True)
+    assert result['success'] is True
+    assert result['unique_slots'] == len({row.tobytes() for row in Bank.load(generated_polyend_file).data})
+    assert result['num_banks'] == 1
+    extract_banks(archive_file, str(tmp_path / 'out'))
+    assert (tmp_path / 'out' / 'bank.polyend').read_bytes() == generated_polyend_file.read_bytes()
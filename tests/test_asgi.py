@@ -0,0 +1,103 @@
+import io
+import asyncio
+import pytest
+from werkzeug.datastructures import FileStorage, MultiDict
+from werkzeug.test import encode_multipart
+import web_app
+import web_asgi
+
+@pytest.fixture
+def banks(tmp_path, monkeypatch):
+    """Store banks in a temporary folder."""
+    monkeypatch.setattr(web_app, 'BANK_FOLDER', str(tmp_path / 'banks'))
+
+def call(method, path, fields=None, headers=(), chunk_size=65536, disconnect=False):
+    """Drive web_asgi.app with one request; return (status, headers, body)."""
+    headers = list(headers)
+    body = b''
+    if fields is not None:
+        boundary, body = encode_multipart(MultiDict(fields))
+        headers.append(('content-type', f'multipart/form-data; boundary={boundary}'))
+    chunks = [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)] or [b'']
+    messages = [{'type': 'http.request', 'body': chunk, 'more_body': i < len(chunks) - 1}
+                for i, chunk in enumerate(chunks)]
+    sent = []
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        if disconnect:
+            return {'type': 'http.disconnect'}
+        await asyncio.Event().wait()
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {'type': 'http', 'method': method, 'path': path, 'client': ('127.0.0.1', 1234),
+             'headers': [(name.encode(), value.encode()) for name, value in headers]}
+    asyncio.run(web_asgi.app(scope, receive, send))
+    if not sent:
+        return None, {}, b''
+    response_headers = {name.decode(): value.decode() for name, value in sent[0]['headers']}
+    return sent[0]['status'], response_headers, b''.join(message.get('body', b'') for message in sent[1:])
+
+def test_index_renders_templates():
+    """Test that the shared templates render without Flask."""
+    status, headers, body = call('GET', '/')
+    assert status == 200
+    assert b'/create' in body and b'/static/header.png' in body
+
+def test_create_streams_uploads(generated_waves_dir):
+    """Test that /create converts uploads with asyncio subprocesses and streams the bank back."""
+    files = [('files', FileStorage(io.BytesIO(path.read_bytes()), path.name))
+             for path in sorted(generated_waves_dir.glob('*.wav'))]
+    status, headers, body = call('POST', '/create', files + [('output_filename', 'async')])
+    assert status == 200
+    assert headers['content-disposition'].endswith('async.polyend"')
+    assert len(body) == 1024128
+
+def test_decompile_recompile_round_trip(generated_polyend_file):
+    """Test that the ZIP from /decompile recompiles to the original bank."""
+    data = generated_polyend_file.read_bytes()
+    status, _, zipped = call('POST', '/decompile', [('file', FileStorage(io.BytesIO(data), 'bank.polyend'))])
+    assert status == 200
+    status, _, body = call('POST', '/recompile', [('files', FileStorage(io.BytesIO(zipped), 'bank_waves.zip'))])
+    assert status == 200
+    assert body == data
+
+def test_bank_slot_ranges(banks, generated_polyend_file):
+    """Test that uploaded banks serve slot WAVs with ranges and ETags, like the Flask app."""
+    status, _, body = call('POST', '/api/banks', [
+        ('file', FileStorage(io.BytesIO(generated_polyend_file.read_bytes()), 'bank.polyend'))])
+    assert status == 201
+    slot_url = web_asgi.json.loads(body)['slots'][3]
+    status, headers, full = call('GET', slot_url)
+    assert status == 200 and full[:4] == b'RIFF'
+    status, headers, part = call('GET', slot_url, headers=[('range', 'bytes=40-99')])
+    assert status == 206 and part == full[40:100]
+    status, _, _ = call('GET', slot_url, headers=[('if-none-match', headers['etag'])])
+    assert status == 304
+
+def test_truncated_upload_is_rejected():
+    """Test that a body cut off by a disconnect gets no response and leaves no work dir."""
+    import os
+    before = set(os.listdir(web_app.UPLOAD_FOLDER))
+    boundary, body = encode_multipart(MultiDict([('file', FileStorage(io.BytesIO(b'x' * 100000), 'a.polyend'))]))
+    sent = []
+
+    async def run():
+        messages = [{'type': 'http.request', 'body': body[:50000], 'more_body': True}, {'type': 'http.disconnect'}]
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {'type': 'http', 'method': 'POST', 'path': '/decompile', 'client': ('127.0.0.1', 1),
+                 'headers': [(b'content-type', f'multipart/form-data; boundary={boundary}'.encode())]}
+        await web_asgi.app(scope, receive, send)
+
+    asyncio.run(run())
+    assert sent == []
+    assert set(os.listdir(web_app.UPLOAD_FOLDER)) == before
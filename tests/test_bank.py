@@ -0,0 +1,134 @@
+import os
+import shutil
+import numpy as np
+import pytest
+from medusa_bank import Bank, SLOT_SAMPLES, FileHandleCache, read_slot, read_slots, export_strip, import_strip
+from medusa_core import TOTAL_FILE_SIZE
+
+def test_bank_round_trip_is_byte_identical(generated_polyend_file, tmp_path):
+    """Test that loading and saving a bank reproduces the file exactly."""
+    bank = Bank.load(generated_polyend_file)
+    assert bank.data.shape == (64, SLOT_SAMPLES)
+    output_file = tmp_path / 'saved.polyend'
+    bank.save(output_file)
+    assert output_file.stat().st_size == TOTAL_FILE_SIZE
+    assert output_file.read_bytes() == generated_polyend_file.read_bytes()
+
+def test_bank_from_wav_dir_matches_recompile(generated_waves_dir, generated_polyend_file):
+    """Test that a bank built from WAVs packs like recompile_wavetable."""
+    bank = Bank.from_wav_dir(generated_waves_dir)
+    assert bank.to_bytes() == generated_polyend_file.read_bytes()
+
+def test_bank_rejects_truncated_file(tmp_path):
+    """Test that truncated files are reported instead of loaded."""
+    truncated = tmp_path / 'truncated.polyend'
+    truncated.write_bytes(b'\x00' * 1000)
+    with pytest.raises(ValueError):
+        Bank.load(truncated)
+
+def test_normalize_and_gain():
+    """Test that normalize reaches full scale and gain scales every slot."""
+    data = np.zeros((64, SLOT_SAMPLES), dtype=np.int16)
+    data[:, 10] = np.arange(1, 65) * 100
+    bank = Bank(data).normalize()
+    assert (bank.data.max(axis=1) == 32767).all()
+    bank.gain(-6.0206)
+    assert np.abs(bank.data.max(axis=1) - 16384).max() <= 1
+
+def test_transforms_respect_slot_selection():
+    """Test that reverse, DC removal and fades only touch selected slots."""
+    data = np.tile(np.arange(SLOT_SAMPLES, dtype=np.int16) % 1000, (64, 1))
+    bank = Bank(data.copy()).reverse(slots=[1, 3])
+    assert (bank.data[1] == data[1, ::-1]).all()
+    assert (bank.data[0] == data[0]).all()
+
+    bank = Bank(data.copy()).remove_dc(slots=2)
+    assert abs(bank.data[2].mean()) < 1
+    assert (bank.data[3] == data[3]).all()
+
+    bank = Bank(np.full((64, SLOT_SAMPLES), 1000, dtype=np.int16)).fade_in(100).fade_out(100)
+    assert bank.data[5, 0] == 0 and bank.data[5, -1] == 0
+    assert bank.data[5, SLOT_SAMPLES // 2] == 1000
+
+def test_crossfade_loop_joins_tail_to_head():
+    """Test that after a loop crossfade the wrap from the last sample to the first is no bigger than any other step."""
+    t = np.arange(SLOT_SAMPLES)
+    data = (10000 * np.sin(2 * np.pi * 3.5 * t / SLOT_SAMPLES + 0.4)).astype(np.int16)
+    bank = Bank(np.tile(data, (64, 1)))
+    assert abs(int(bank.data[0, 0]) - int(bank.data[0, -1])) > 1000
+    bank.crossfade_loop(256)
+    steps = np.abs(np.diff(bank.data[0].astype(int)))
+    assert abs(int(bank.data[0, 0]) - int(bank.data[0, -1])) <= steps.max()
+    assert (bank.data[0, :-256] == data[:-256]).all()
+
+def test_phase_align_starts_at_rising_zero_crossing():
+    """Test that phase alignment rotates each slot to a rising zero crossing."""
+    t = np.arange(SLOT_SAMPLES)
+    phases = np.linspace(0, 2 * np.pi, 64, endpoint=False)[:, None]
+    data = (10000 * np.sin(2 * np.pi * t / SLOT_SAMPLES + phases + 0.1)).astype(np.int16)
+    bank = Bank(data).phase_align()
+    assert (bank.data[:, 0] >= 0).all()
+    assert (bank.data[:, -1] < 0).all()
+
+@pytest.mark.parametrize('name', ['strip.wav', 'strip.pcm'])
+def test_strip_round_trip(generated_polyend_file, tmp_path, name):
+    """Test that a strip export imports back to the same slots."""
+    strip_file = str(tmp_path / name)
+    assert export_strip(str(generated_polyend_file), strip_file)['success'] is True
+    assert os.path.getsize(strip_file) >= 64 * SLOT_SAMPLES * 2
+    output_file = tmp_path / 'out.polyend'
+    assert import_strip(strip_file, str(output_file))['success'] is True
+    assert output_file.read_bytes() == generated_polyend_file.read_bytes()
+
+def test_strip_import_resamples_frames(tmp_path):
+    """Test that 2048-sample frames are picked evenly and stretched over each slot."""
+    t = np.arange(2048)
+    frames = (1000 * (np.arange(128)[:, None] + 1) * np.sin(2 * np.pi * t / 2048) / 128).astype(np.int16)
+    strip_file = tmp_path / 'serum.pcm'
+    strip_file.write_bytes(frames.tobytes())
+
+    bank = Bank.from_strip(str(strip_file), frame_size=2048)
+    expected = 1000 * np.sin(2 * np.pi * np.arange(SLOT_SAMPLES) / SLOT_SAMPLES)
+    assert np.abs(bank.data[-1] - expected).max() < 10
+    assert np.abs(bank.data).max(axis=1)[0] < np.abs(bank.data).max(axis=1)[-1]
+
+def test_read_slots_matches_bank(generated_polyend_file):
+    """Test that positioned slot reads match a full load, with and without a cache."""
+    bank = Bank.load(generated_polyend_file)
+    cache = FileHandleCache(max_open=1)
+    try:
+        assert (read_slot(str(generated_polyend_file), 5) == bank.data[5]).all()
+        assert (read_slots(str(generated_polyend_file), [63, 0], cache) == bank.data[[63, 0]]).all()
+        assert (read_slot(str(generated_polyend_file), 1, cache) == bank.data[1]).all()
+    finally:
+        cache.close()
+    with pytest.raises(ValueError):
+        read_slot(str(generated_polyend_file), 64)
+
+def test_file_handle_cache_sees_replaced_file(generated_polyend_file, tmp_path):
+    """Test that a cached descriptor is reopened when the file is replaced."""
+    path = str(tmp_path / 'bank.polyend')
+    Bank.load(generated_polyend_file).save(path)
+    cache = FileHandleCache()
+    try:
+        first = read_slot(path, 2, cache)
+        replacement = str(tmp_path / 'replacement.polyend')
+        Bank.load(generated_polyend_file).reverse().save(replacement)
+        os.replace(replacement, path)
+        assert (read_slot(path, 2, cache) == first[::-1]).all()
+    finally:
+        cache.close()
+
+def test_file_handle_cache_keeps_leased_descriptors_open(generated_polyend_file, tmp_path):
+    """Test that a descriptor evicted while leased is only closed when the lease ends."""
+    other = str(tmp_path / 'other.polyend')
+    shutil.copy(generated_polyend_file, other)
+    cache = FileHandleCache(max_open=1)
+    try:
+        with cache.lease(str(generated_polyend_file)) as fd:
+            read_slot(other, 0, cache)  # Evicts the leased descriptor
+            assert len(os.pread(fd, 16, 0)) == 16
+        with pytest.raises(OSError):
+            os.fstat(fd)
+    finally:
+        cache.close()
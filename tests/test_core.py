@@ -1,5 +1,8 @@
 import pytest
-from medusa_core import decompile_wavetable, recompile_wavetable, create_wavetable_bank
+from medusa_core import (
+    decompile_wavetable, recompile_wavetable, create_wavetable_bank, run_ffmpeg, CancelToken, Cancelled,
+    MedusaContext
+)
 from pathlib import Path
 
 def test_decompile_wavetable_valid(valid_polyend_file, temp_output_dir):
@@ -45,4 +48,170 @@ def test_create_wavetable_bank_random(sample_waves_dir, temp_output_dir):
     assert result['success'] is True
     assert result['num_wavetables'] == 64
     assert output_file.exists()
-    assert output_file.stat().st_size > 0 
\ No newline at end of file
+    assert output_file.stat().st_size > 0 
+
+def test_recompile_wavetable_from_zip(generated_waves_dir, generated_polyend_file, tmp_path):
+    """Test that a decompile ZIP is recompiled in place, byte for byte."""
+    import zipfile
+    zip_path = tmp_path / 'waves.zip'
+    with zipfile.ZipFile(zip_path, 'w') as zipf:
+        for wav in sorted(generated_waves_dir.glob('*.wav')):
+            zipf.write(wav, f'waves/{wav.name}')
+    output_file = tmp_path / 'from_zip.polyend'
+    result = recompile_wavetable(str(zip_path), str(output_file))
+    assert result['success'] is True
+    assert output_file.read_bytes() == generated_polyend_file.read_bytes()
+
+def test_create_wavetable_bank_from_tar(generated_waves_dir, tmp_path):
+    """Test that archive members are streamed into the decoder without extracting them."""
+    import shutil
+    archive = shutil.make_archive(str(tmp_path / 'sources'), 'gztar', generated_waves_dir)
+    output_file = tmp_path / 'from_tar.polyend'
+    result = create_wavetable_bank(archive, str(output_file), selection='random', seed=1)
+    assert result['success'] is True, result
+    assert result['num_wavetables'] == 64
+    assert all(path.startswith(archive) for path in result['source_files'])
+    assert output_file.stat().st_size == 1024128
+
+def test_tar_sources_are_read_in_one_pass(generated_waves_dir, generated_polyend_file, tmp_path, monkeypatch):
+    """Test that a compressed tar is opened once to list it and once per pass over its members."""
+    import shutil
+    import tarfile
+    archive = shutil.make_archive(str(tmp_path / 'sources'), 'gztar', generated_waves_dir)
+    opened = []
+    original = tarfile.open
+    monkeypatch.setattr(tarfile, 'open', lambda *args, **kwargs: opened.append(args) or original(*args, **kwargs))
+
+    result = recompile_wavetable(archive, str(tmp_path / 'recompiled.polyend'))
+    assert result['success'] is True, result
+    assert (tmp_path / 'recompiled.polyend').read_bytes() == generated_polyend_file.read_bytes()
+    assert len(opened) == 2
+
+    # Diverse selection makes one pass for the feature windows and one to convert the chosen members
+    opened.clear()
+    result = create_wavetable_bank(archive, str(tmp_path / 'diverse.polyend'), selection='diverse')
+    assert result['success'] is True, result
+    assert len(opened) == 3
+
+def _stalled_input():
+    """Return a readable file object that never delivers data or EOF, and its writer fd."""
+    import os
+    read_fd, write_fd = os.pipe()
+    return os.fdopen(read_fd, 'rb'), write_fd
+
+def test_run_ffmpeg_kills_after_timeout(tmp_path):
+    """Test that an FFmpeg run that never finishes is killed at its timeout."""
+    import os
+    import subprocess
+    import time
+    stream, write_fd = _stalled_input()
+    start = time.monotonic()
+    with pytest.raises(subprocess.TimeoutExpired):
+        run_ffmpeg(['-y', '-i', 'pipe:0', str(tmp_path / 'out.wav')], stdin=stream, timeout=0.5)
+    assert time.monotonic() - start < 5
+    os.close(write_fd)
+    stream.close()
+
+def test_run_ffmpeg_stops_when_cancelled(tmp_path):
+    """Test that a token's deadline kills FFmpeg and raises Cancelled."""
+    import os
+    stream, write_fd = _stalled_input()
+    with pytest.raises(Cancelled, match='Deadline exceeded'):
+        run_ffmpeg(['-y', '-i', 'pipe:0', str(tmp_path / 'out.wav')], stdin=stream, cancel=CancelToken(0.3))
+    os.close(write_fd)
+    stream.close()
+
+def test_cancelled_operations_report_failure(generated_waves_dir, tmp_path):
+    """Test that core operations given a fired token stop and report it."""
+    cancel = CancelToken()
+    cancel.cancel()
+    result = recompile_wavetable(str(generated_waves_dir), str(tmp_path / 'out.polyend'), cancel=cancel)
+    assert result == {'success': False, 'error': 'Cancelled'}
+    result = create_wavetable_bank(str(generated_waves_dir), str(tmp_path / 'out.polyend'), cancel=cancel)
+    assert result == {'success': False, 'error': 'Cancelled'}
+
+def test_concurrent_builds_in_threads(generated_waves_dir, tmp_path):
+    """Test that seeded builds running at once in threads match the same builds run one by one."""
+    import shutil
+    from concurrent.futures import ThreadPoolExecutor
+    library = tmp_path / 'library'
+    shutil.copytree(generated_waves_dir, library / 'a')
+    shutil.copytree(generated_waves_dir, library / 'b')
+
+    def build(seed, name):
+        output_file = tmp_path / name
+        result = create_wavetable_bank(str(library), str(output_file), selection='random', seed=seed,
+                                       context=MedusaContext(temp_root=str(tmp_path / 'work')))
+        assert result['success'], result
+        return output_file.read_bytes()
+
+    expected = [build(seed, f'serial_{seed}.polyend') for seed in range(4)]
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        assert list(pool.map(build, range(4), [f'threaded_{seed}.polyend' for seed in range(4)])) == expected
+    assert len(set(expected)) == 4
+    assert list((tmp_path / 'work').iterdir()) == []
+
+def test_context_seed_and_logger(generated_waves_dir, tmp_path, caplog):
+    """Test that a seeded context makes unseeded builds reproducible and logs warnings to its logger."""
+    import shutil
+    import logging
+    library = tmp_path / 'library'
+    shutil.copytree(generated_waves_dir, library)
+    shutil.copy(library / 'wavetable_00.wav', library / 'wavetable_64.wav')
+
+    def session():
+        context = MedusaContext(seed=7)
+        return [create_wavetable_bank(str(library), str(tmp_path / 'out.polyend'), selection='random',
+                                      context=context)['source_files'] for _ in range(2)]
+
+    first = session()
+    assert first == session()
+    assert first[0] != first[1]
+
+    (library / 'broken.wav').write_bytes(b'not audio')
+    context = MedusaContext(logger=logging.getLogger('medusa.test'))
+    with caplog.at_level(logging.WARNING):
+        create_wavetable_bank(str(library), str(tmp_path / 'out.polyend'), context=context)
+    assert any(record.name == 'medusa.test' and 'broken.wav' in record.getMessage() for record in caplog.records)
+
+def test_decompile_fallback_is_explicit(generated_polyend_file, tmp_path, caplog):
+    """Test that decompile only falls back when the context allows it, and says so."""
+    import shutil
+    import logging
+    input_file = tmp_path / 'readonly' / 'bank.polyend'
+    input_file.parent.mkdir()
+    shutil.copy(generated_polyend_file, input_file)
+    (input_file.parent / 'waves').write_text('a file where the output directory would go')
+
+    result = decompile_wavetable(str(input_file), context=MedusaContext())
+    assert not result['success']
+
+    fallback_dir = tmp_path / 'fallback'
+    with caplog.at_level(logging.WARNING, logger='medusa'):
+        result = decompile_wavetable(str(input_file), context=MedusaContext(fallback_dir=str(fallback_dir)))
+    assert result['success'], result
+    assert result['fallback'] is True
+    assert result['output_dir'] == str(fallback_dir)
+    assert any(str(fallback_dir) in record.getMessage() for record in caplog.records)
+
+    result = decompile_wavetable(str(input_file), str(tmp_path / 'chosen'))
+    assert result['success'] and result['fallback'] is False
+
+@pytest.mark.parametrize('workers', [None, 2])
+def test_create_smooth_order_packs_reordered_slots(generated_waves_dir, generated_polyend_file, tmp_path, workers):
+    """Test that a smooth build writes the plain build's slots in the order it reports."""
+    from medusa_bank import Bank
+    output_file = tmp_path / 'smooth.polyend'
+    result = create_wavetable_bank(str(generated_waves_dir), str(output_file), order='smooth', workers=workers)
+    assert result['success'], result
+    assert sorted(result['order']) == list(range(64))
+    assert (Bank.load(output_file).data == Bank.load(generated_polyend_file).data[result['order']]).all()
+
+def test_create_rejects_unknown_order_before_building(generated_waves_dir, tmp_path):
+    """Test that a bad order or selection fails up front and writes nothing."""
+    output_file = tmp_path / 'out.polyend'
+    result = create_wavetable_bank(str(generated_waves_dir), str(output_file), order='bogus')
+    assert result == {'success': False, 'error': 'Unknown order: bogus'}
+    result = create_wavetable_bank(str(generated_waves_dir), str(output_file), selection='bogus')
+    assert result == {'success': False, 'error': 'Unknown selection mode: bogus'}
+    assert not output_file.exists()
@@ -0,0 +1,53 @@
+import threading
+import time
+import pytest
+import medusa_daemon
+
+@pytest.fixture
+def daemon_socket(tmp_path):
+    """Start a daemon in a background thread and return its socket path."""
+    socket_path = str(tmp_path / 'medusa.sock')
+    thread = threading.Thread(target=medusa_daemon.serve, args=(socket_path,), daemon=True)
+    thread.start()
+    for _ in range(100):
+        try:
+            medusa_daemon.call(socket_path, 'ping')
+            break
+        except medusa_daemon.DaemonUnavailable:
+            time.sleep(0.01)
+    return socket_path
+
+def test_call_without_daemon(tmp_path):
+    """Test that calling a missing daemon raises DaemonUnavailable."""
+    with pytest.raises(medusa_daemon.DaemonUnavailable):
+        medusa_daemon.call(str(tmp_path / 'missing.sock'), 'ping')
+
+def test_daemon_decompile_streams_progress(daemon_socket, generated_polyend_file, temp_output_dir):
+    """Test that the daemon runs decompile and streams progress events."""
+    events = []
+    result = medusa_daemon.call(
+        daemon_socket, 'decompile', str(generated_polyend_file), str(temp_output_dir),
+        progress=lambda current, total: events.append((current, total))
+    )
+    assert result['success'] is True
+    assert result['num_wavetables'] == 64
+    assert events[-1] == (64, 64)
+
+def test_run_falls_back_in_process(tmp_path, generated_waves_dir):
+    """Test that run() executes in-process when no daemon is listening."""
+    output_file = tmp_path / 'fallback.polyend'
+    result = medusa_daemon.run('recompile', str(generated_waves_dir), str(output_file),
+                               socket_path=str(tmp_path / 'missing.sock'))
+    assert result['success'] is True
+    assert output_file.exists()
+
+def test_cli_client_does_not_import_numpy():
+    """Test that starting the CLI, which may only talk to the daemon, leaves NumPy unloaded."""
+    import subprocess
+    import sys
+    result = subprocess.run(
+        [sys.executable, '-c', "import sys, medusa_cli; "
+                               "print([name for name in ('numpy', 'medusa_bank') if name in sys.modules])"],
+        capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == '[]'
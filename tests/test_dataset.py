@@ -0,0 +1,32 @@
+import numpy as np
+from medusa_bank import Bank
+from medusa_dataset import export_dataset, load_dataset, index_path
+
+def test_export_and_load_dataset(generated_polyend_file, tmp_path):
+    """Test that exported banks load back as lazy views with an index."""
+    second = tmp_path / 'banks' / 'second.polyend'
+    second.parent.mkdir()
+    Bank.load(generated_polyend_file).reverse().save(second)
+    output_file = tmp_path / 'library.npy'
+
+    result = export_dataset([str(generated_polyend_file), str(second.parent)], str(output_file))
+    assert result['success'] is True
+    assert result['num_banks'] == 2
+    assert result['index_file'] == index_path(str(output_file))
+
+    dataset = load_dataset(str(output_file))
+    assert len(dataset) == 2
+    assert isinstance(dataset.data, np.memmap)
+    assert (dataset[0] == Bank.load(generated_polyend_file).data).all()
+    assert (dataset.slot(1, 5) == Bank.load(second).data[5]).all()
+    assert dataset.find(str(second)) == 1
+    assert dataset.banks[0]['identifiers'][1] == '124576e3'
+
+def test_export_dataset_rejects_truncated_bank(tmp_path):
+    """Test that a truncated bank fails the export."""
+    bad_file = tmp_path / 'bad.polyend'
+    bad_file.write_bytes(b'\0' * 1000)
+    result = export_dataset([str(bad_file)], str(tmp_path / 'out.npy'))
+    assert result['success'] is False
+    assert 'truncated' in result['error']
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['bad.polyend']
@@ -0,0 +1,99 @@
+import shutil
+import numpy as np
+import medusa_features
+from medusa_features import compute_features, farthest_point_sample, select_diverse, FEATURE_WINDOW
+from medusa_sources import SourceIndex
+
+def test_compute_features_separates_timbres():
+    """Test that features tell a dull and a bright window apart."""
+    t = np.arange(FEATURE_WINDOW)
+    dull = (10000 * np.sin(2 * np.pi * 200 * t / 44100)).astype(np.int16)
+    bright = (10000 * np.sin(2 * np.pi * 8000 * t / 44100)).astype(np.int16)
+    features = compute_features(np.stack([dull, dull, bright]))
+    assert np.allclose(features[0], features[1])
+    assert np.linalg.norm(features[0] - features[2]) > 1
+
+def test_farthest_point_sample_avoids_duplicates():
+    """Test that near-duplicate rows are not both picked before distinct ones."""
+    features = np.array([[0, 0], [0, 0.01], [10, 0], [0, 10], [10, 10]], dtype=np.float32)
+    chosen = farthest_point_sample(features, 4)
+    assert len(set(chosen)) == 4
+    assert not {0, 1} <= set(chosen)
+
+def test_farthest_point_sample_with_few_distinct_rows():
+    """Test that k different rows are chosen when there are fewer than k distinct values."""
+    features = np.repeat(np.arange(10, dtype=np.float32)[:, None], 10, axis=0)
+    chosen = farthest_point_sample(features, 64)
+    assert len(chosen) == 64
+    assert len(set(chosen)) == 64
+    assert len({float(features[i, 0]) for i in chosen}) == 10
+
+def test_select_diverse_caches_features(generated_waves_dir, tmp_path, monkeypatch):
+    """Test diverse selection and that an index skips decoding on repeat runs."""
+    library = tmp_path / 'library'
+    shutil.copytree(generated_waves_dir, library)
+    # Duplicate one file several times; diversity should pick it at most once
+    for i in range(5):
+        shutil.copy(library / 'wavetable_00.wav', library / f'copy_{i}.wav')
+
+    with SourceIndex(str(tmp_path / 'index.db')) as index:
+        paths = [source.path for source in index.scan(str(library))]
+        selected = select_diverse(paths, 8, index=index)
+        assert len(selected) == 8
+        copies = [path for path in selected if 'copy_' in path or path.endswith('wavetable_00.wav')]
+        assert len(copies) <= 1
+
+        decoded = []
+        original = medusa_features._decode_window
+        monkeypatch.setattr(medusa_features, '_decode_window', lambda path: decoded.append(path) or original(path))
+        assert select_diverse(paths, 8, index=index) == selected
+        assert decoded == []
+
+def test_smooth_order_recovers_shuffled_sweep():
+    """Test that a shuffled harmonic sweep is put back in smooth order."""
+    from medusa_synth import render_harmonics, family_harmonics
+    from medusa_features import smooth_order, slot_distances
+    amplitudes, phases = family_harmonics('saw_square', 64)
+    sweep = render_harmonics(amplitudes, phases)
+    shuffle = np.random.default_rng(0).permutation(64)
+    shuffled = sweep[shuffle]
+
+    order = smooth_order(shuffled)
+    distances = slot_distances(shuffled)
+    smooth_length = distances[order[:-1], order[1:]].sum()
+    original_length = distances[np.argsort(shuffle)[:-1], np.argsort(shuffle)[1:]].sum()
+    assert sorted(order.tolist()) == list(range(64))
+    assert smooth_length <= original_length * 1.01
+
+def test_reorder_wavetable(generated_polyend_file, tmp_path):
+    """Test reordering a .polyend file keeps the same slots in a new order."""
+    from medusa_bank import Bank
+    from medusa_features import reorder_wavetable
+    output_file = tmp_path / 'reordered.polyend'
+    result = reorder_wavetable(str(generated_polyend_file), str(output_file))
+    assert result['success'] is True
+    original = Bank.load(generated_polyend_file)
+    reordered = Bank.load(output_file)
+    assert (reordered.data == original.data[result['order']]).all()
+    assert (reordered.headers == original.headers).all()
+
+def test_extract_features_holds_slots_and_honours_cancel(generated_waves_dir):
+    """Test that each window decode holds a conversion slot and a fired token stops extraction."""
+    import contextlib
+    import pytest
+    from medusa_core import CancelToken, Cancelled
+    from medusa_features import extract_features
+    paths = sorted(str(path) for path in generated_waves_dir.glob('*.wav'))[:8]
+    held = []
+
+    @contextlib.contextmanager
+    def slot():
+        held.append(1)
+        yield
+
+    assert len(extract_features(paths, conversion_slot=slot)) == 8
+    assert len(held) == 8
+    cancel = CancelToken()
+    cancel.cancel()
+    with pytest.raises(Cancelled):
+        extract_features(paths, cancel=cancel)
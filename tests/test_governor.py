@@ -0,0 +1,55 @@
+import time
+import threading
+import pytest
+from medusa_governor import Governor, Overloaded
+
+@pytest.fixture
+def state_dir(tmp_path):
+    return str(tmp_path / 'governor')
+
+def test_admit_limits_each_client(state_dir):
+    """Test that one client can't take more than its share of request tickets."""
+    governor = Governor(state_dir, max_conversions=2, max_requests=4, max_per_client=1)
+    with governor.admit('10.0.0.1'):
+        with pytest.raises(Overloaded) as excinfo:
+            with governor.admit('10.0.0.1'):
+                pass
+        assert excinfo.value.retry_after >= 1
+        with governor.admit('10.0.0.2'):
+            pass
+    with governor.admit('10.0.0.1'):
+        pass
+
+def test_admit_is_shared_between_workers(state_dir):
+    """Test that separate governors on one directory, like separate workers, share the request limit."""
+    first = Governor(state_dir, max_conversions=1, max_requests=1, max_per_client=2)
+    second = Governor(state_dir, max_conversions=1, max_requests=1, max_per_client=2)
+    with first.admit('a'):
+        with pytest.raises(Overloaded):
+            with second.admit('b'):
+                pass
+    with second.admit('b'):
+        pass
+
+def test_conversion_slots_bound_concurrency(state_dir):
+    """Test that no more than max_conversions conversions run at once."""
+    governor = Governor(state_dir, max_conversions=2, max_requests=8, max_per_client=8)
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    def convert():
+        with governor.conversion_slot():
+            with lock:
+                running.append(1)
+                peak.append(len(running))
+            time.sleep(0.05)
+            with lock:
+                running.pop()
+
+    threads = [threading.Thread(target=convert) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert max(peak) == 2
@@ -0,0 +1,37 @@
+import io
+import shutil
+import logging
+import pytest
+from werkzeug.datastructures import FileStorage, MultiDict
+from werkzeug.test import encode_multipart
+from medusa_ingest import StreamingIngest
+
+def fake_convert(source, output_wav):
+    if b'corrupt' in open(source, 'rb').read():
+        raise RuntimeError('cannot decode')
+    return shutil.copyfile(source, output_wav)
+
+def test_streaming_ingest_saves_and_converts(tmp_path, caplog):
+    """Test that files are saved once and converted, with fields parsed from the stream."""
+    boundary, body = encode_multipart(MultiDict([
+        ('files', FileStorage(io.BytesIO(b'a' * 200000), 'one.wav')),
+        ('files', FileStorage(io.BytesIO(b'corrupt'), 'two.wav')),
+        ('files', FileStorage(io.BytesIO(b'x'), 'notes.txt')),
+        ('seed', '42'),
+    ]))
+    with StreamingIngest(str(tmp_path), lambda name: name.endswith('.wav'), fake_convert) as upload:
+        upload.read(io.BytesIO(body), boundary)
+        assert upload.fields == {'seed': '42'}
+        assert [uploaded.filename for uploaded in upload.files] == ['one.wav', 'two.wav']
+        converted = upload.files[0].converted()
+        assert open(converted, 'rb').read() == b'a' * 200000
+        with caplog.at_level(logging.WARNING, logger='medusa'):
+            assert upload.files[1].converted() is None
+    assert any('two.wav' in record.getMessage() for record in caplog.records)
+
+def test_streaming_ingest_rejects_truncated_body(tmp_path):
+    """Test that a body cut off mid-file raises instead of hanging."""
+    boundary, body = encode_multipart({'files': FileStorage(io.BytesIO(b'a' * 1000), 'one.wav')})
+    with StreamingIngest(str(tmp_path), lambda name: True, None) as upload:
+        with pytest.raises(ValueError):
+            upload.read(io.BytesIO(body[:500]), boundary)
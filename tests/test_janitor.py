@@ -0,0 +1,58 @@
+import os
+import time
+import pytest
+from medusa_janitor import Janitor
+
+@pytest.fixture
+def janitor(tmp_path):
+    with Janitor(str(tmp_path / 'uploads')) as janitor:
+        yield janitor
+
+def _file(janitor, name, size=1000):
+    path = os.path.join(janitor.root, name)
+    with open(path, 'wb') as f:
+        f.write(b'\0' * size)
+    return path
+
+def test_sweep_deletes_expired_entries(janitor):
+    """Test that entries are deleted once their TTL passes, and not before."""
+    temp_dir = janitor.mkdtemp('create_', ttl=60)
+    kept = janitor.track(_file(janitor, 'bank.polyend'), ttl=600)
+    assert janitor.sweep() == 0
+    assert janitor.sweep(now=time.time() + 120) == 1
+    assert not os.path.exists(temp_dir)
+    assert os.path.exists(kept)
+
+def test_release_deletes_immediately(janitor):
+    """Test that a released work dir is gone at once and forgotten by the index."""
+    temp_dir = janitor.mkdtemp('decompile_')
+    _file(janitor, os.path.join(os.path.basename(temp_dir), 'out.zip'))
+    janitor.release(temp_dir)
+    assert not os.path.exists(temp_dir)
+    assert janitor.sweep(now=time.time() + 10 ** 6) == 0
+
+def test_sweep_evicts_oldest_over_high_water(tmp_path):
+    """Test that the byte cap evicts the oldest evictable entries, never work in progress."""
+    with Janitor(str(tmp_path / 'uploads'), max_bytes=2500, high_water=1.0, low_water=0.8) as janitor:
+        in_progress = janitor.mkdtemp('create_')
+        with open(os.path.join(in_progress, 'big.wav'), 'wb') as f:
+            f.write(b'\0' * 1000)
+        banks = []
+        for i in range(3):
+            banks.append(janitor.track(_file(janitor, f'{i}.polyend'), ttl=600, evictable=True))
+            time.sleep(0.01)
+        assert janitor.sweep() == 2
+        assert [os.path.exists(path) for path in banks] == [False, False, True]
+        assert os.path.exists(in_progress)
+
+def test_adopt_tracks_leftovers(janitor):
+    """Test that untracked leftovers are adopted by prefix and expire from their mtime."""
+    old = janitor.mkdtemp('create_')
+    janitor.release(old)
+    os.mkdir(old)
+    os.utime(old, (time.time() - 7200, time.time() - 7200))
+    os.mkdir(os.path.join(janitor.root, 'banks'))
+    assert janitor.adopt(janitor.root, ('create_',)) == 1
+    assert janitor.sweep() == 1
+    assert not os.path.exists(old)
+    assert os.path.isdir(os.path.join(janitor.root, 'banks'))
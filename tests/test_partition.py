@@ -0,0 +1,104 @@
+import shutil
+import zipfile
+import numpy as np
+import medusa_partition
+from medusa_bank import Bank
+from medusa_partition import partition_folders, balanced_clusters, partition_sources, create_wavetable_banks
+
+def make_library(generated_waves_dir, tmp_path):
+    """Copy the 64 generated waves into two folders of 40 and 30 files (70 in all)."""
+    library = tmp_path / 'library'
+    waves = sorted(generated_waves_dir.glob('*.wav'))
+    for folder, count in (('a', 40), ('b', 30)):
+        (library / folder).mkdir(parents=True)
+        for i in range(count):
+            shutil.copy(waves[i % len(waves)], library / folder / f'{folder}_{i:02d}.wav')
+    return library
+
+def test_partition_folders_keeps_folders_together():
+    """Test that folders fill whole banks and small leftovers share banks unsplit."""
+    groups = [('big', [f'big{i}' for i in range(100)]), ('mid', list('abcdefghij')), ('small', list('xyz'))]
+    banks = partition_folders(groups, size=64)
+    assert [len(bank) for bank in banks] == [64, 36 + 10 + 3]
+    assert banks[1][:36] == [f'big{i}' for i in range(64, 100)]
+    assert banks[1][36:] == list('abcdefghij') + list('xyz')
+    assert sorted(sum(banks, [])) == sorted(sum((items for _, items in groups), []))
+
+def test_balanced_clusters_separates_groups():
+    """Test that clusters are full, cover every row and don't mix distant groups."""
+    rng = np.random.default_rng(0)
+    matrix = np.concatenate([rng.normal(0, 1, (64, 4)), rng.normal(50, 1, (64, 4)), rng.normal(-50, 1, (10, 4))])
+    groups = balanced_clusters(matrix, size=64)
+    assert sorted(len(group) for group in groups) == [10, 64, 64]
+    assert sorted(np.concatenate(groups).tolist()) == list(range(len(matrix)))
+    assert sorted(tuple(sorted({min(int(i) // 64, 2) for i in group})) for group in groups) == [(0,), (1,), (2,)]
+
+def test_partition_sources_modes():
+    """Test sorted and seeded random partitioning."""
+    directories = [('d', [f'f{i:03d}' for i in range(150)][::-1])]
+    sorted_banks = partition_sources(directories, 'sorted')
+    assert [len(bank) for bank in sorted_banks] == [64, 64, 22]
+    assert sorted_banks[0][0] == 'f000'
+    assert partition_sources(directories, 'random', seed=1) == partition_sources(directories, 'random', seed=1)
+    assert partition_sources(directories, 'random', seed=1) != sorted_banks
+
+def test_create_wavetable_banks_decodes_each_source_once(generated_waves_dir, tmp_path, monkeypatch):
+    """Test a multi-bank build: every source decoded once and written to exactly one bank."""
+    library = make_library(generated_waves_dir, tmp_path)
+    decoded = []
+    original = medusa_partition._decode_source
+    monkeypatch.setattr(medusa_partition, '_decode_source',
+                        lambda input_dir, source, *args: decoded.append(source) or original(input_dir, source, *args))
+
+    output_dir = tmp_path / 'banks'
+    result = create_wavetable_banks(str(library), str(output_dir), partition='folder', workers=4)
+    assert result['success'], result
+    assert result['num_banks'] == 2
+    assert sorted(decoded) == sorted(set(decoded)) and len(decoded) == 70
+    # Folder a (40 files) and folder b (30 files) can't share a bank
+    assert [len(bank['source_files']) for bank in result['banks']] == [40, 30]
+
+    bank = Bank.load(result['banks'][1]['output_file'])
+    with open(generated_waves_dir / 'wavetable_05.wav', 'rb') as f:
+        expected = np.frombuffer(f.read()[44:], dtype=np.int16)
+    assert np.array_equal(bank.data[5], expected)
+    assert not bank.data[30:].any()
+
+def test_create_wavetable_banks_cluster_from_zip(generated_waves_dir, tmp_path):
+    """Test clustering sources read straight from an archive, and skipping bad files."""
+    archive = tmp_path / 'waves.zip'
+    with zipfile.ZipFile(archive, 'w') as zf:
+        for path in sorted(generated_waves_dir.glob('*.wav')):
+            zf.write(path, f'waves/{path.name}')
+            zf.write(path, f'copies/{path.name}')
+        zf.writestr('waves/broken.wav', b'not audio')
+
+    result = create_wavetable_banks(str(archive), str(tmp_path / 'banks'), partition='cluster', prefix='pack')
+    assert result['success'], result
+    assert [len(bank['source_files']) for bank in result['banks']] == [64, 64]
+    assert result['skipped'] == [str(archive / 'waves' / 'broken.wav')]
+    assert sorted((tmp_path / 'banks').iterdir()) == [tmp_path / 'banks' / 'pack_000.polyend',
+                                                      tmp_path / 'banks' / 'pack_001.polyend']
+
+def test_create_wavetable_banks_rejects_unknown_mode(generated_waves_dir, tmp_path):
+    """Test that an unknown partition mode is reported as an error."""
+    result = create_wavetable_banks(str(generated_waves_dir), str(tmp_path / 'banks'), partition='bogus')
+    assert not result['success']
+    assert 'Unknown partition mode' in result['error']
+
+def test_smooth_order_keeps_partial_banks_at_the_front(generated_waves_dir, tmp_path):
+    """Test that smoothing a partly filled bank only reorders its filled slots."""
+    library = tmp_path / 'library'
+    library.mkdir()
+    for path in sorted(generated_waves_dir.glob('*.wav'))[:30]:
+        shutil.copy(path, library / path.name)
+
+    result = create_wavetable_banks(str(library), str(tmp_path / 'banks'), order='smooth')
+    assert result['success'], result
+    bank = Bank.load(result['banks'][0]['output_file'])
+    assert all(bank.data[:30].any(axis=1))
+    assert not bank.data[30:].any()
+    # source_files follow the slots they ended up in
+    for slot, source in enumerate(result['banks'][0]['source_files']):
+        with open(source, 'rb') as f:
+            assert np.array_equal(bank.data[slot], np.frombuffer(f.read()[44:], dtype=np.int16))
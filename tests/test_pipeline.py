@@ -0,0 +1,94 @@
+import json
+import numpy as np
+import pytest
+from medusa_bank import Bank, SLOT_SAMPLES
+from medusa_pipeline import Pipeline, PipelineCache, fuse, apply_recipe
+
+@pytest.fixture
+def bank():
+    """Return a bank of sine slots with a DC offset."""
+    t = np.arange(SLOT_SAMPLES)
+    data = 8000 * np.sin(2 * np.pi * np.arange(1, 65)[:, None] * t / SLOT_SAMPLES) + 500
+    return Bank(data.astype(np.int16))
+
+def test_pipeline_matches_eager_transforms(bank):
+    """Test that a fused pipeline gives the same result as eager calls."""
+    pipeline = (Pipeline().then('remove_dc').then('normalize', peak=0.5)
+                .then('crossfade_loop', samples=128).then('reverse', slots=[0, 5]))
+    eager = bank.copy().remove_dc().normalize(0.5).crossfade_loop(128).reverse(slots=[0, 5])
+    result = pipeline.run(bank)
+    assert np.abs(result.data.astype(int) - eager.data).max() <= 1
+    assert (bank.data[:, 0] == bank.copy().data[:, 0]).all()
+
+def test_fuse_combines_steps():
+    """Test that gains merge, fold into normalize and reverses cancel."""
+    steps = (Pipeline().then('gain', db=-3).then('gain', db=-3)
+             .then('reverse', slots=[1]).then('reverse', slots=[1])
+             .then('normalize').then('gain', db=-6.0206)).steps
+    fused = fuse(steps)
+    assert [name for name, _, _ in fused] == ['gain', 'normalize']
+    assert dict(fused[0][2])['db'] == -6
+    assert dict(fused[1][2])['peak'] == pytest.approx(0.5, abs=1e-4)
+
+def test_pipeline_cache_resumes_from_prefix(bank, monkeypatch):
+    """Test that a longer recipe resumes from a cached shorter one."""
+    cache = PipelineCache()
+    prefix = Pipeline().then('remove_dc').then('normalize')
+    prefix.run(bank, cache)
+
+    import medusa_pipeline
+    calls = []
+    transforms = dict(medusa_pipeline.TRANSFORMS)
+    monkeypatch.setattr(medusa_pipeline, 'TRANSFORMS',
+                        {name: (lambda fn, name: lambda buf, **kw: calls.append(name) or fn(buf, **kw))(fn, name)
+                         for name, fn in transforms.items()})
+    prefix.then('reverse').run(bank, cache)
+    assert calls == ['reverse']
+
+def test_pipeline_cache_memoises_every_prefix(bank, monkeypatch):
+    """Test that a recipe branching off partway through another resumes from the shared steps."""
+    cache = PipelineCache()
+    Pipeline().then('remove_dc').then('normalize').then('reverse').run(bank, cache)
+    assert len(cache) == 3
+
+    import medusa_pipeline
+    calls = []
+    transforms = dict(medusa_pipeline.TRANSFORMS)
+    monkeypatch.setattr(medusa_pipeline, 'TRANSFORMS',
+                        {name: (lambda fn, name: lambda buf, **kw: calls.append(name) or fn(buf, **kw))(fn, name)
+                         for name, fn in transforms.items()})
+    result = Pipeline().then('remove_dc').then('normalize').then('fade_in').run(bank, cache)
+    assert calls == ['fade_in']
+    assert np.abs(result.data.astype(int) - bank.copy().remove_dc().normalize().fade_in().data).max() <= 1
+
+def test_recipe_from_json(tmp_path, generated_polyend_file):
+    """Test applying a JSON recipe file to a .polyend file."""
+    recipe = tmp_path / 'recipe.json'
+    recipe.write_text(json.dumps({'steps': [{'op': 'gain', 'db': -6}, {'op': 'reverse', 'slots': [2]}]}))
+    output_file = tmp_path / 'out.polyend'
+    result = apply_recipe(str(recipe), [str(generated_polyend_file)], output_file=str(output_file))
+    assert result['success'] is True
+    original = Bank.load(generated_polyend_file)
+    transformed = Bank.load(output_file)
+    assert np.abs(transformed.data[2] - np.rint(original.data[2, ::-1] * 10 ** (-6 / 20))).max() <= 1
+
+def test_recipe_rejects_unknown_op(tmp_path, generated_polyend_file):
+    """Test that unknown operations are reported as errors."""
+    recipe = tmp_path / 'recipe.json'
+    recipe.write_text(json.dumps([{'op': 'explode'}]))
+    result = apply_recipe(str(recipe), [str(generated_polyend_file)], output_dir=str(tmp_path / 'out'))
+    assert result['success'] is False
+
+def test_recipe_refuses_clashing_output_names(tmp_path, generated_polyend_file):
+    """Test that same-named inputs from different folders are refused rather than overwritten."""
+    import shutil
+    recipe = tmp_path / 'recipe.json'
+    recipe.write_text(json.dumps([{'op': 'reverse'}]))
+    inputs = []
+    for folder in ('a', 'b'):
+        (tmp_path / folder).mkdir()
+        inputs.append(str(shutil.copy(generated_polyend_file, tmp_path / folder / 'bank.polyend')))
+    result = apply_recipe(str(recipe), inputs, output_dir=str(tmp_path / 'out'))
+    assert result == {'success': False,
+                      'error': 'Several input files are named bank.polyend; apply the recipe to them separately'}
+    assert not (tmp_path / 'out').exists()
@@ -0,0 +1,45 @@
+import json
+from medusa_bank import Bank, validate_bank
+from medusa_core import decompile_wavetable
+from medusa_scan import scan_banks
+
+def test_validate_bank_accepts_recompiled_file(generated_polyend_file):
+    """Test that a freshly recompiled bank has no problems."""
+    assert validate_bank(generated_polyend_file.read_bytes()) == []
+
+def test_validate_bank_reports_bad_fields(generated_polyend_file):
+    """Test that bad header fields are reported with the slots they affect."""
+    bank = Bank.load(generated_polyend_file)
+    bank.headers[3, 0] = 0xFF
+    bank.headers[7, 0x46] = 0
+    bank.footer = bank.footer[:-1] + b'\xFF'
+    problems = validate_bank(bank.to_bytes())
+    assert {'check': 'header_marker', 'slots': [3]} in problems
+    assert {'check': 'subheader_index', 'slots': [7]} in problems
+    assert {'check': 'footer'} in problems
+
+def test_validate_bank_reports_truncation(generated_polyend_file):
+    """Test that a truncated file reports its size and complete slots."""
+    problems = validate_bank(generated_polyend_file.read_bytes()[:50000])
+    checks = {problem['check']: problem for problem in problems}
+    assert checks['truncated']['complete_slots'] == 3
+    assert checks['size']['actual'] == 50000
+
+def test_scan_banks_report(generated_polyend_file, tmp_path):
+    """Test scanning a directory writes a JSON report."""
+    (tmp_path / 'bad.polyend').write_bytes(b'\0' * 100)
+    report_file = tmp_path / 'report.json'
+    result = scan_banks([str(tmp_path)], str(report_file))
+    assert result['success'] is True
+    report = json.loads(report_file.read_text())
+    assert report['num_files'] == 2
+    assert report['num_valid'] == 1
+    assert [entry['valid'] for entry in report['files']] == [False, True]
+
+def test_decompile_rejects_truncated_file(generated_polyend_file, tmp_path):
+    """Test that decompile fails instead of writing partial output."""
+    truncated = tmp_path / 'truncated.polyend'
+    truncated.write_bytes(generated_polyend_file.read_bytes()[:500000])
+    result = decompile_wavetable(str(truncated), str(tmp_path / 'waves'))
+    assert result['success'] is False
+    assert 'truncated' in result['error']
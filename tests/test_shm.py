@@ -0,0 +1,70 @@
+import os
+import pytest
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from medusa_bank import Bank, SLOT_SAMPLES, load_audio
+from medusa_core import create_wavetable_bank
+from medusa_shm import SharedSlots, pack_bank, decode_to_slots
+
+def fill_row(name, row, value):
+    with SharedSlots.attach(name) as slots:
+        slots.data[row] = value
+
+def test_workers_write_into_parent_buffer():
+    """Test that rows written by another process are visible to the parent without copying back."""
+    with SharedSlots() as slots:
+        with ProcessPoolExecutor(max_workers=2) as pool:
+            list(pool.map(fill_row, [slots.name] * 3, [0, 5, 63], [1, 2, 3]))
+        assert slots.data[0].tolist() == [1] * SLOT_SAMPLES
+        assert slots.data[5, 0] == 2 and slots.data[63, -1] == 3
+        assert not slots.data[1:5].any()
+
+def test_segment_is_unlinked_on_error():
+    """Test that the parent's segment is deleted when the build fails."""
+    with pytest.raises(RuntimeError):
+        with SharedSlots() as slots:
+            name = slots.name
+            raise RuntimeError("build failed")
+    with pytest.raises(FileNotFoundError):
+        SharedSlots.attach(name)
+
+def test_pack_bank_matches_bank_bytes(tmp_path):
+    """Test that the gathered write produces the same file as Bank.save."""
+    data = np.random.default_rng(0).integers(-32768, 32767, (64, SLOT_SAMPLES), dtype=np.int16)
+    pack_bank(data, str(tmp_path / 'packed.polyend'))
+    assert (tmp_path / 'packed.polyend').read_bytes() == Bank(data).to_bytes()
+
+def test_decode_to_slots_closes_gaps(generated_waves_dir, tmp_path):
+    """Test that failed sources are skipped and later rows move up."""
+    broken = tmp_path / 'broken.wav'
+    broken.write_bytes(b'not audio')
+    waves = sorted(str(path) for path in generated_waves_dir.glob('*.wav'))
+    sources = [waves[0], str(broken), waves[1]]
+    with SharedSlots() as slots:
+        decoded, failed = decode_to_slots(slots, sources, workers=2)
+        assert decoded == [waves[0], waves[1]]
+        assert list(failed) == [str(broken)]
+        assert np.array_equal(slots.data[1], load_audio(waves[1]))
+        assert not slots.data[2:].any()
+
+def test_create_with_workers_matches_sequential(generated_waves_dir, tmp_path):
+    """Test that the shared-memory build writes the same bank as the temp-WAV build."""
+    sequential = create_wavetable_bank(str(generated_waves_dir), str(tmp_path / 'a.polyend'))
+    parallel = create_wavetable_bank(str(generated_waves_dir), str(tmp_path / 'b.polyend'), workers=2)
+    assert sequential['success'], sequential
+    assert parallel['success'], parallel
+    assert (tmp_path / 'a.polyend').read_bytes() == (tmp_path / 'b.polyend').read_bytes()
+    assert parallel['source_files'] == sequential['source_files']
+
+@pytest.mark.skipif(not hasattr(os, 'mkfifo'), reason='needs named pipes')
+def test_decode_to_slots_cancels_without_waiting_for_workers(tmp_path):
+    """Test that cancelling kills a worker stuck in a decode instead of joining it."""
+    import time
+    from medusa_core import CancelToken, Cancelled
+    stalled = tmp_path / 'stalled.wav'
+    os.mkfifo(stalled)  # Opening it for reading blocks until a writer appears, which never happens
+    start = time.monotonic()
+    with SharedSlots() as slots:
+        with pytest.raises(Cancelled):
+            decode_to_slots(slots, [str(stalled)], workers=1, cancel=CancelToken(0.5))
+    assert time.monotonic() - start < 5
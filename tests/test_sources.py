@@ -0,0 +1,114 @@
+import os
+import shutil
+import pytest
+import medusa_sources
+from medusa_sources import (
+    SourceIndex, iter_audio_files, detect_format, select_sources, archive_members, archive_directories,
+    open_archive_member, iter_archive_members
+)
+
+@pytest.fixture
+def source_tree(tmp_path, generated_waves_dir):
+    """Build a nested source tree with mixed-case extensions and hidden files."""
+    root = tmp_path / 'library'
+    (root / 'pads' / 'warm').mkdir(parents=True)
+    (root / 'leads').mkdir()
+    wav = generated_waves_dir / 'wavetable_00.wav'
+    shutil.copy(wav, root / 'a.wav')
+    shutil.copy(wav, root / 'pads' / 'B.WAV')
+    shutil.copy(wav, root / 'pads' / 'warm' / 'c.Wav')
+    shutil.copy(wav, root / 'leads' / '._d.wav')
+    (root / 'leads' / 'notes.txt').write_text('not audio')
+    return root
+
+def test_iter_audio_files_matches_case_insensitively(source_tree):
+    """Test that the walker finds nested files regardless of extension case."""
+    names = sorted(os.path.basename(path) for path in iter_audio_files(str(source_tree)))
+    assert names == ['B.WAV', 'a.wav', 'c.Wav']
+
+def test_detect_format(source_tree):
+    """Test format detection from file contents."""
+    assert detect_format(str(source_tree / 'a.wav')) == 'wav'
+    assert detect_format(str(source_tree / 'leads' / 'notes.txt')) is None
+
+@pytest.mark.parametrize('archive_format', ['zip', 'gztar'])
+def test_archive_members_match_tree_walk(source_tree, tmp_path, archive_format):
+    """Test that archives list the same audio files as the tree walker and stream them unchanged."""
+    archive = shutil.make_archive(str(tmp_path / 'library'), archive_format, source_tree)
+    assert archive_members(archive) == ['a.wav', 'pads/B.WAV', 'pads/warm/c.Wav']
+    assert archive_directories(archive) == [('', ['a.wav']), ('pads', ['pads/B.WAV']),
+                                            ('pads/warm', ['pads/warm/c.Wav'])]
+    with open_archive_member(archive, 'pads/B.WAV') as member:
+        assert member.read() == (source_tree / 'pads' / 'B.WAV').read_bytes()
+    members = {name: member.read() for name, member in iter_archive_members(archive, ['pads/warm/c.Wav', 'a.wav'])}
+    assert members == {'a.wav': (source_tree / 'a.wav').read_bytes(),
+                       'pads/warm/c.Wav': (source_tree / 'pads' / 'warm' / 'c.Wav').read_bytes()}
+
+def test_source_index_records_metadata(source_tree, tmp_path):
+    """Test that the index records size, format and duration."""
+    with SourceIndex(str(tmp_path / 'index.db')) as index:
+        files = index.scan(str(source_tree))
+    assert len(files) == 3
+    for source in files:
+        assert source.format == 'wav'
+        assert source.size == os.path.getsize(source.path)
+        assert source.duration == pytest.approx(7936 / 44100)
+
+def test_source_index_skips_unchanged_directories(source_tree, tmp_path, monkeypatch):
+    """Test that a second scan only lists directories whose mtime changed."""
+    db_path = str(tmp_path / 'index.db')
+    with SourceIndex(db_path) as index:
+        index.scan(str(source_tree))
+
+    shutil.copy(source_tree / 'a.wav', source_tree / 'leads' / 'e.wav')
+    scanned = []
+    original = medusa_sources._scan_directory
+    monkeypatch.setattr(medusa_sources, '_scan_directory',
+                        lambda path, ext: scanned.append(path) or original(path, ext))
+
+    with SourceIndex(db_path) as index:
+        files = index.scan(str(source_tree))
+    assert scanned == [str(source_tree / 'leads')]
+    assert len(files) == 4
+
+def test_source_index_forgets_removed_directories(source_tree, tmp_path):
+    """Test that directories deleted since the last scan drop out of the index."""
+    db_path = str(tmp_path / 'index.db')
+    with SourceIndex(db_path) as index:
+        index.scan(str(source_tree))
+        shutil.rmtree(source_tree / 'pads')
+        files = index.scan(str(source_tree))
+    assert [os.path.basename(source.path) for source in files] == ['a.wav']
+
+def _library(num_dirs, files_per_dir):
+    """Return a synthetic (directory, [paths]) stream without touching disk."""
+    return [
+        (f'/lib/d{d}', [f'/lib/d{d}/f{f:04d}.wav' for f in range(files_per_dir)])
+        for d in range(num_dirs)
+    ]
+
+def test_select_alphabetical_matches_sorted():
+    """Test that alphabetical selection equals sorting the full list."""
+    library = _library(5, 40)
+    all_paths = [path for _, paths in library for path in paths]
+    assert select_sources(reversed(library), 64) == sorted(all_paths)[:64]
+
+def test_select_random_is_reproducible_with_seed():
+    """Test that the same seed gives the same random selection."""
+    first = select_sources(_library(10, 100), 64, 'random', seed=7)
+    second = select_sources(_library(10, 100), 64, 'random', seed=7)
+    assert first == second
+    assert len(set(first)) == 64
+
+def test_select_random_returns_everything_from_small_library():
+    """Test that libraries smaller than a bank are used in full."""
+    selected = select_sources(_library(2, 10), 64, 'random', seed=1)
+    assert sorted(selected) == sorted(path for _, paths in _library(2, 10) for path in paths)
+
+def test_select_folder_balances_folders():
+    """Test that a huge folder does not crowd out small ones."""
+    library = [('/lib/big', [f'/lib/big/{i}.wav' for i in range(5000)])] + _library(7, 20)
+    selected = select_sources(library, 64, 'folder', seed=3)
+    from_big = sum(path.startswith('/lib/big/') for path in selected)
+    assert len(selected) == 64
+    assert from_big < 20
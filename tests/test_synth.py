@@ -0,0 +1,76 @@
+import json
+import numpy as np
+import pytest
+from medusa_bank import Bank, SLOT_SAMPLES
+from medusa_synth import (render_harmonics, family_harmonics, synthesize_wavetable, morph_frames,
+                          morph_wavetable, FAMILIES)
+
+def test_render_single_harmonic_is_a_sine():
+    """Test that one harmonic renders as a sine at the right frequency and phase."""
+    amplitudes = np.zeros((64, 4))
+    amplitudes[:, 2] = 1.0
+    data = render_harmonics(amplitudes, peak=0.5)
+    t = np.arange(SLOT_SAMPLES)
+    expected = 0.5 * 32767 * np.sin(2 * np.pi * 3 * t / SLOT_SAMPLES)
+    assert data.shape == (64, SLOT_SAMPLES)
+    assert np.abs(data[7] - expected).max() <= 1
+
+def test_render_batches_many_banks():
+    """Test that leading batch dimensions are rendered in one call."""
+    amplitudes, phases = family_harmonics('saw_square', 32)
+    data = render_harmonics(np.stack([amplitudes] * 3), phases, cycles=2)
+    assert data.shape == (3, 64, SLOT_SAMPLES)
+    assert (data[0] == data[2]).all()
+
+def test_render_rejects_harmonics_above_nyquist():
+    """Test that specs above Nyquist are rejected."""
+    with pytest.raises(ValueError):
+        render_harmonics(np.ones((64, SLOT_SAMPLES // 2)))
+
+@pytest.mark.parametrize('family', FAMILIES)
+def test_synthesize_family(family, tmp_path):
+    """Test that every family produces a valid, non-silent bank."""
+    output_file = tmp_path / f'{family}.polyend'
+    result = synthesize_wavetable(str(output_file), family=family, n_harmonics=64)
+    assert result['success'] is True
+    bank = Bank.load(output_file)
+    assert (np.abs(bank.data).max(axis=1) > 20000).all()
+    assert not (bank.data[0] == bank.data[63]).all()
+
+def test_synthesize_from_spec(tmp_path):
+    """Test synthesis from a JSON spec shared by all slots."""
+    spec = tmp_path / 'spec.json'
+    spec.write_text(json.dumps({'amplitudes': [1, 0.5, 0.25], 'phases': [0, 1, 2]}))
+    output_file = tmp_path / 'spec.polyend'
+    result = synthesize_wavetable(str(output_file), spec_file=str(spec))
+    assert result['success'] is True
+    assert result['num_harmonics'] == 3
+    bank = Bank.load(output_file)
+    assert (bank.data == bank.data[0]).all()
+
+def test_morph_hits_anchors_and_interpolates():
+    """Test that morph frames start and end on the anchors and blend in between."""
+    t = np.arange(SLOT_SAMPLES)
+    low = (10000 * np.sin(2 * np.pi * t / SLOT_SAMPLES)).astype(np.int16)
+    high = (10000 * np.sin(2 * np.pi * 5 * t / SLOT_SAMPLES)).astype(np.int16)
+    frames = morph_frames(np.stack([low, high]))
+    assert frames.shape == (64, SLOT_SAMPLES)
+    assert np.abs(frames[0].astype(int) - low).max() <= 1
+    assert np.abs(frames[63].astype(int) - high).max() <= 1
+    spectrum = np.abs(np.fft.rfft(frames[32].astype(float)))
+    assert spectrum[1] > 0.3 * spectrum.max() and spectrum[5] > 0.3 * spectrum.max()
+
+def test_morph_wavetable_from_bank_and_files(generated_polyend_file, generated_waves_dir, tmp_path):
+    """Test morphing with anchors taken from a bank or from WAV files."""
+    from_bank = tmp_path / 'from_bank.polyend'
+    result = morph_wavetable(str(from_bank), bank_file=str(generated_polyend_file), slots=[0, 10, 63])
+    assert result['success'] is True
+    assert result['num_anchors'] == 3
+
+    from_files = tmp_path / 'from_files.polyend'
+    files = [str(generated_waves_dir / 'wavetable_00.wav'), str(generated_waves_dir / 'wavetable_63.wav')]
+    result = morph_wavetable(str(from_files), audio_files=files)
+    assert result['success'] is True
+    source = Bank.load(generated_polyend_file)
+    morphed = Bank.load(from_files)
+    assert np.abs(morphed.data[63].astype(int) - source.data[63]).max() <= 1
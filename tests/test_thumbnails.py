@@ -0,0 +1,35 @@
+import struct
+import zlib
+import numpy as np
+from medusa_bank import Bank, SLOT_SAMPLES
+from medusa_thumbnails import envelopes, render_thumbnails, bank_thumbnails, ThumbnailCache
+
+def test_envelopes_track_min_and_max():
+    """Test that each envelope column holds the extremes of its samples."""
+    data = np.zeros((2, SLOT_SAMPLES), dtype=np.int16)
+    data[1, :10] = 16384
+    data[1, -10:] = -16384
+    mins, maxs = envelopes(data, width=4)
+    assert mins.shape == (2, 4)
+    assert maxs[1, 0] == 0.5
+    assert mins[1, -1] == -0.5
+    assert (maxs[0] == 0).all()
+
+def test_png_sprite_dimensions():
+    """Test that a whole bank renders as an 8x8 sprite sheet PNG."""
+    png = render_thumbnails(Bank().data, 'png', width=16, height=8)
+    assert png.startswith(b'\x89PNG\r\n\x1a\n')
+    width, height = struct.unpack('>II', png[16:24])
+    assert (width, height) == (8 * 16, 8 * 8)
+    idat = png.index(b'IDAT')
+    length = struct.unpack('>I', png[idat - 4:idat])[0]
+    assert len(zlib.decompress(png[idat + 4:idat + 4 + length])) == height * (width // 8 + 1)
+
+def test_bank_thumbnails_are_cached():
+    """Test that repeat renders of the same bank come from the cache."""
+    cache = ThumbnailCache(max_entries=1)
+    bank = Bank()
+    first = bank_thumbnails(bank, 'svg', slot=0, cache=cache)
+    assert bank_thumbnails(bank, 'svg', slot=0, cache=cache) is first
+    bank_thumbnails(bank, 'png', cache=cache)
+    assert len(cache) == 1
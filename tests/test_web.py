@@ -0,0 +1,136 @@
+import os
+import io
+import wave
+import pytest
+import web_app
+from medusa_bank import Bank
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """Return a test client storing banks in a temporary folder."""
+    monkeypatch.setattr(web_app, 'BANK_FOLDER', str(tmp_path / 'banks'))
+    web_app.app.config['TESTING'] = True
+    with web_app.app.test_client() as client:
+        yield client
+
+@pytest.fixture
+def bank_id(client, generated_polyend_file):
+    """Upload the generated bank and return its id."""
+    response = client.post('/api/banks', data={
+        'file': (io.BytesIO(generated_polyend_file.read_bytes()), 'bank.polyend')
+    })
+    assert response.status_code == 201
+    return response.get_json()['id']
+
+def test_upload_rejects_truncated_bank(client):
+    """Test that a truncated upload is refused."""
+    response = client.post('/api/banks', data={'file': (io.BytesIO(b'\0' * 1000), 'bad.polyend')})
+    assert response.status_code == 400
+
+def test_slot_wav_matches_bank(client, bank_id, generated_polyend_file):
+    """Test that a served slot is a valid WAV of the slot's samples."""
+    response = client.get(f'/api/banks/{bank_id}/slots/7.wav')
+    assert response.status_code == 200
+    assert response.mimetype == 'audio/wav'
+    with wave.open(io.BytesIO(response.data)) as wav:
+        assert wav.readframes(wav.getnframes()) == Bank.load(generated_polyend_file).data[7].tobytes()
+
+def test_slot_range_and_etag(client, bank_id):
+    """Test that Range requests return the matching bytes and ETags give 304s."""
+    full = client.get(f'/api/banks/{bank_id}/slots/3.wav')
+    partial = client.get(f'/api/banks/{bank_id}/slots/3.wav', headers={'Range': 'bytes=40-99'})
+    assert partial.status_code == 206
+    assert partial.headers['Content-Range'] == f'bytes 40-99/{len(full.data)}'
+    assert partial.data == full.data[40:100]
+
+    cached = client.get(f'/api/banks/{bank_id}/slots/3.wav', headers={'If-None-Match': full.headers['ETag']})
+    assert cached.status_code == 304
+
+    outside = client.get(f'/api/banks/{bank_id}/slots/3.wav', headers={'Range': f'bytes={len(full.data)}-'})
+    assert outside.status_code == 416
+
+def test_unknown_bank_is_404(client):
+    """Test that an unknown bank id is not found."""
+    assert client.get('/api/banks/' + '0' * 64 + '/slots/0.wav').status_code == 404
+    assert client.get('/api/banks/nothex/slots/0.wav').status_code == 404
+
+def test_bank_thumbnails(client, bank_id):
+    """Test that sprite and per-slot thumbnails are served as PNG and SVG."""
+    sprite = client.get(f'/api/banks/{bank_id}/thumbnails.png')
+    assert sprite.status_code == 200
+    assert sprite.mimetype == 'image/png'
+    assert sprite.data.startswith(b'\x89PNG')
+
+    slot = client.get(f'/api/banks/{bank_id}/slots/3.svg')
+    assert slot.status_code == 200
+    assert slot.mimetype == 'image/svg+xml'
+    assert slot.data.count(b'<path') == 1
+
+    cached = client.get(f'/api/banks/{bank_id}/thumbnails.png', headers={'If-None-Match': sprite.headers['ETag']})
+    assert cached.status_code == 304
+
+def test_create_streams_uploads(client, generated_waves_dir):
+    """Test that /create builds a bank from a streamed multipart upload."""
+    files = [(io.BytesIO(path.read_bytes()), path.name) for path in sorted(generated_waves_dir.glob('*.wav'))]
+    response = client.post('/create', data={'files': files, 'output_filename': 'streamed'})
+    assert response.status_code == 200
+    assert response.headers['Content-Disposition'].endswith('streamed.polyend')
+    assert len(response.data) == 1024128
+
+def test_create_diverse_compares_converted_uploads(client, generated_waves_dir, monkeypatch):
+    """Test that diverse selection reads the WAVs the upload converted instead of decoding the uploads again."""
+    import medusa_features
+    decoded = []
+    original = medusa_features._decode_window
+    monkeypatch.setattr(medusa_features, '_decode_window',
+                        lambda path, *args, **kwargs: decoded.append(path) or original(path, *args, **kwargs))
+    files = [(io.BytesIO(path.read_bytes()), path.name) for path in sorted(generated_waves_dir.glob('*.wav'))]
+    response = client.post('/create', data={'files': files, 'selection': 'diverse'})
+    assert response.status_code == 200
+    assert len(response.data) == 1024128
+    assert len(decoded) == 64
+    assert all(os.path.basename(os.path.dirname(path)) == 'converted' for path in decoded)
+
+def test_recompile_accepts_decompile_zip(client, generated_polyend_file):
+    """Test that the ZIP /decompile returns can be uploaded to /recompile unchanged."""
+    decompiled = client.post('/decompile', data={'file': (io.BytesIO(generated_polyend_file.read_bytes()), 'bank.polyend')})
+    assert decompiled.status_code == 200
+    response = client.post('/recompile', data={'files': [(io.BytesIO(decompiled.data), 'bank_waves.zip')]})
+    assert response.status_code == 200
+    assert response.data == generated_polyend_file.read_bytes()
+
+def test_work_dirs_are_deleted_after_response(client, generated_polyend_file):
+    """Test that a request's work directory is removed once its download has been sent."""
+    before = set(os.listdir(web_app.UPLOAD_FOLDER))
+    response = client.post('/decompile', data={'file': (io.BytesIO(generated_polyend_file.read_bytes()), 'bank.polyend')})
+    assert response.status_code == 200
+    assert response.data.startswith(b'PK')
+    response.close()
+    assert set(os.listdir(web_app.UPLOAD_FOLDER)) == before
+
+def test_create_is_turned_away_when_busy(client, tmp_path, monkeypatch):
+    """Test that /create answers 503 with Retry-After instead of queueing past the limit."""
+    from medusa_governor import Governor
+    governor = Governor(str(tmp_path / 'governor'), max_conversions=1, max_requests=1, max_per_client=1)
+    monkeypatch.setattr(web_app, 'governor', governor)
+    with governor.admit('someone else'):
+        response = client.post('/create', data={'files': [(io.BytesIO(b'RIFF'), 'a.wav')]})
+    assert response.status_code == 503
+    assert int(response.headers['Retry-After']) >= 1
+
+@pytest.mark.parametrize('seed', ['--5', '5-', '-', '1.5', '²'])
+def test_create_options_rejects_malformed_seeds(seed):
+    """Test that only optionally signed ASCII integers are accepted as seeds."""
+    with pytest.raises(ValueError, match='Seed must be a whole number'):
+        web_app.create_options({'seed': seed})
+    assert web_app.create_options({'seed': ' -42 '})[1] == -42
+
+def test_upload_folder_is_shared_between_processes():
+    """Test that separate worker processes default to the same upload folder and bank store."""
+    import sys
+    import subprocess
+    env = {key: value for key, value in os.environ.items() if key not in ('UPLOAD_FOLDER', 'BANK_FOLDER')}
+    folders = [subprocess.run([sys.executable, '-c', 'import web_app; print(web_app.BANK_FOLDER)'],
+                              cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))), env=env,
+                              capture_output=True, text=True, check=True).stdout for _ in range(2)]
+    assert folders[0] == folders[1]
@@ -5,13 +5,29 @@ Provides browser-based access to wavetable creation and manipulation tools.
 """
 
 import os
+import re
+import hashlib
 import tempfile
-import shutil
+import socket
+import select
 import zipfile
+import functools
+import threading
 from pathlib import Path
-from flask import Flask, render_template, request, send_file, flash, redirect, url_for, jsonify
+from flask import Flask, render_template, request, send_file, flash, redirect, url_for, jsonify, Response, g
 from werkzeug.utils import secure_filename
-from medusa_core import create_wavetable_bank, decompile_wavetable, recompile_wavetable
+from medusa_core import (
+    decompile_wavetable, recompile_wavetable, build_wavetable_bank, create_wavetable_bank, convert_audio,
+    CancelToken, MedusaContext, NUM_WAVETABLES
+)
+from medusa_sources import SELECTION_MODES, ARCHIVE_EXTENSIONS, select_sources
+from medusa_ingest import StreamingIngest
+from medusa_bank import (
+    Bank, FileHandleCache, validate_bank, wav_header, read_slot_bytes, read_slots, SLOT_SAMPLES, SAMPLE_DTYPE
+)
+from medusa_thumbnails import render_thumbnails, thumbnail_cache
+from medusa_janitor import Janitor
+from medusa_governor import Governor, Overloaded
 from version import __version__, __app_name__
 
 app = Flask(__name__)
@@ -20,35 +36,128 @@ app = Flask(__name__)
 app.secret_key = os.environ.get('SECRET_KEY', 'medusa-wavetable-secret-key-change-in-production')
 
 # Configuration
-UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER', tempfile.mkdtemp(prefix='medusa_web_'))
+# A fixed path, not a per-process temp dir, so every worker on the host (gunicorn
+# --workers, or both apps side by side) sees the same work dirs and bank store
+UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER', os.path.join(tempfile.gettempdir(), 'medusa_web'))
 ALLOWED_EXTENSIONS = {'wav', 'aif', 'aiff', 'mp3', 'ogg', 'polyend'}
 MAX_CONTENT_LENGTH = 100 * 1024 * 1024  # 100MB max upload
 
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+
+# Uploaded banks are stored by content hash so slot URLs never change meaning
+BANK_FOLDER = os.environ.get('BANK_FOLDER', os.path.join(UPLOAD_FOLDER, 'banks'))
+BANK_ID_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+SLOT_WAV_HEADER = wav_header(SLOT_SAMPLES)
+SLOT_WAV_SIZE = len(SLOT_WAV_HEADER) + SLOT_SAMPLES * SAMPLE_DTYPE.itemsize
+slot_file_cache = FileHandleCache()
 app.config['MAX_CONTENT_LENGTH'] = MAX_CONTENT_LENGTH
 
+# Upload cleanup: request work dirs are deleted once their response is sent and
+# expire after TEMP_TTL if a worker dies first; stored banks expire after BANK_TTL,
+# or sooner, oldest first, when the disk passes DISK_HIGH_WATER
+TEMP_PREFIXES = ('create_', 'decompile_', 'recompile_', 'bank_')
+TEMP_TTL = int(os.environ.get('MEDUSA_TEMP_TTL', 3600))
+BANK_TTL = int(os.environ.get('MEDUSA_BANK_TTL', 24 * 3600))
+DISK_HIGH_WATER = float(os.environ.get('MEDUSA_DISK_HIGH_WATER', 0.9))
+DISK_LOW_WATER = float(os.environ.get('MEDUSA_DISK_LOW_WATER', 0.8))
+UPLOAD_MAX_BYTES = int(os.environ['MEDUSA_UPLOAD_MAX_BYTES']) if os.environ.get('MEDUSA_UPLOAD_MAX_BYTES') else None
+janitor = Janitor(UPLOAD_FOLDER, ttl=TEMP_TTL, high_water=DISK_HIGH_WATER, low_water=DISK_LOW_WATER,
+                  max_bytes=UPLOAD_MAX_BYTES, interval=int(os.environ.get('MEDUSA_JANITOR_INTERVAL', 60)))
+# Leftovers from before the index existed (or from an older deployment) expire too
+janitor.adopt(UPLOAD_FOLDER, TEMP_PREFIXES)
+janitor.adopt(BANK_FOLDER, ttl=BANK_TTL, evictable=True)
+
+# Admission control shared by every worker on the host (see medusa_governor)
+MAX_CONVERSIONS = int(os.environ.get('MEDUSA_MAX_CONVERSIONS', os.cpu_count() or 4))
+MAX_REQUESTS = int(os.environ.get('MEDUSA_MAX_REQUESTS', 2 * MAX_CONVERSIONS))
+MAX_REQUESTS_PER_CLIENT = int(os.environ.get('MEDUSA_MAX_REQUESTS_PER_CLIENT', 2))
+TRUST_PROXY = os.environ.get('MEDUSA_TRUST_PROXY', '') not in ('', '0')
+# Work for a request stops when its client disconnects or after REQUEST_TIMEOUT seconds,
+# which is kept under gunicorn's 120 s worker timeout
+REQUEST_TIMEOUT = float(os.environ.get('MEDUSA_REQUEST_TIMEOUT', 100))
+governor = Governor(os.environ.get('MEDUSA_GOVERNOR_DIR', os.path.join(tempfile.gettempdir(), 'medusa_governor')),
+                    MAX_CONVERSIONS, MAX_REQUESTS, MAX_REQUESTS_PER_CLIENT)
+# Core operations log through the app and never fall back to writing in the home directory
+core_context = MedusaContext(logger=app.logger)
+
 def allowed_file(filename):
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+    return ('.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS) or is_archive_file(filename)
 
-def cleanup_temp_files():
-    """Clean up old temporary files"""
-    try:
-        for item in os.listdir(UPLOAD_FOLDER):
-            item_path = os.path.join(UPLOAD_FOLDER, item)
-            if os.path.isfile(item_path):
-                # Delete files older than 1 hour
-                if os.path.getmtime(item_path) < (os.time.time() - 3600):
-                    os.remove(item_path)
-            elif os.path.isdir(item_path):
-                # Delete directories older than 1 hour
-                if os.path.getmtime(item_path) < (os.time.time() - 3600):
-                    shutil.rmtree(item_path)
-    except Exception as e:
-        print(f"Cleanup error: {e}")
+def is_archive_file(filename):
+    return filename.lower().endswith(ARCHIVE_EXTENSIONS)
+
+def convert_upload(path, output_wav, cancel=None):
+    """Convert an uploaded audio file; archives are left for create_wavetable_bank to stream from."""
+    if is_archive_file(path):
+        return None
+    with governor.conversion_slot(cancel):
+        return convert_audio(path, output_wav, cancel)
+
+def _watch_disconnect(sock, token, done):
+    """Cancel token once the client closes its connection, until done is set."""
+    while not done.is_set() and not token.cancelled:
+        try:
+            readable, _, _ = select.select([sock], [], [], 0.5)
+            if readable and not sock.recv(1, socket.MSG_PEEK):
+                token.cancel("Client disconnected")
+                return
+        except (OSError, ValueError):
+            return  # The server closed the socket; the request is over
+        if readable:
+            done.wait(0.5)  # Pipelined data, not a hang-up; don't spin on it
+
+def request_cancel_token():
+    """Return this request's CancelToken, which fires on disconnect, deadline or request end."""
+    if 'cancel' not in g:
+        g.cancel = CancelToken(REQUEST_TIMEOUT)
+        g.cancel_done = threading.Event()
+        sock = request.environ.get('gunicorn.socket') or request.environ.get('werkzeug.socket')
+        if sock is not None:
+            threading.Thread(target=_watch_disconnect, args=(sock, g.cancel, g.cancel_done), daemon=True).start()
+    return g.cancel
+
+@app.teardown_request
+def cancel_abandoned_work(exc):
+    # Conversions nobody waited for (unselected uploads) are killed with the request
+    if 'cancel' in g:
+        g.cancel_done.set()
+        g.cancel.cancel("Request finished")
+
+def client_id():
+    """Identify the client for fairness limits; behind a proxy, set MEDUSA_TRUST_PROXY."""
+    if TRUST_PROXY and request.access_route:
+        return request.access_route[0]
+    return request.remote_addr or ''
+
+def overloaded(e):
+    return Response(f'{e}. Please try again in {e.retry_after} seconds.\n', status=503,
+                    headers={'Retry-After': str(e.retry_after)}, mimetype='text/plain')
+
+def request_temp_dir(prefix):
+    """Create a work directory that is deleted as soon as this request's response has been sent."""
+    temp_dir = janitor.mkdtemp(prefix)
+    g.setdefault('temp_dirs', []).append(temp_dir)
+    return temp_dir
+
+@app.before_request
+def start_janitor():
+    # Cheap when already running; restarts the sweeper in forked workers
+    janitor.start()
+
+@app.after_request
+def release_temp_dirs(response):
+    for temp_dir in g.pop('temp_dirs', []):
+        if response.direct_passthrough:
+            # send_file has already opened the download, and servers hand it to sendfile()
+            # without calling close hooks, so delete now; the open file stays readable
+            # (where the OS refuses, e.g. on Windows, the TTL catches it)
+            janitor.release(temp_dir)
+        else:
+            response.call_on_close(functools.partial(janitor.release, temp_dir))
+    return response
 
 @app.route('/')
 def index():
-    cleanup_temp_files()
     return render_template('index.html', version=__version__, app_name=__app_name__)
 
 @app.route('/create', methods=['GET', 'POST'])
@@ -56,44 +165,83 @@ def create_wavetable():
     if request.method == 'GET':
         return redirect(url_for('index'))
     
-    # Handle file upload
-    if 'files' not in request.files:
-        flash('No files selected')
-        return redirect(request.url)
-    
-    files = request.files.getlist('files')
-    if not files or files[0].filename == '':
+    if request.mimetype != 'multipart/form-data' or 'boundary' not in request.mimetype_params:
         flash('No files selected')
         return redirect(request.url)
     
-    # Get options
-    random_order = request.form.get('random_order') == 'on'
-    output_filename = request.form.get('output_filename', 'wavetables.polyend')
+    # Turn excess load away before reading the upload, rather than queueing it
+    try:
+        with governor.admit(client_id()):
+            return create_from_upload()
+    except Overloaded as e:
+        return overloaded(e)
+
+def create_options(fields):
+    """Return (selection, seed, output_filename) from /create's form fields.
+
+    Raises ValueError with a message for the user if an option is invalid.
+    """
+    random_order = fields.get('random_order') == 'on'
+    selection = fields.get('selection') or ('random' if random_order else 'alphabetical')
+    if selection not in SELECTION_MODES:
+        raise ValueError(f'Unknown selection mode: {selection}')
+    seed = fields.get('seed', '').strip()
+    if seed and not re.fullmatch(r'-?[0-9]+', seed):
+        raise ValueError('Seed must be a whole number')
+    seed = int(seed) if seed else None
+    output_filename = secure_filename(fields.get('output_filename') or 'wavetables.polyend')
     if not output_filename.endswith('.polyend'):
         output_filename += '.polyend'
-    
+    return selection, seed, output_filename
+
+def create_from_upload():
     try:
         # Create temporary directory for this upload
-        temp_dir = tempfile.mkdtemp(dir=UPLOAD_FOLDER, prefix='create_')
-        input_dir = os.path.join(temp_dir, 'input')
-        os.makedirs(input_dir)
-        
-        # Save uploaded files
-        saved_files = []
-        for file in files:
-            if file and allowed_file(file.filename):
-                filename = secure_filename(file.filename)
-                file_path = os.path.join(input_dir, filename)
-                file.save(file_path)
-                saved_files.append(filename)
-        
-        if not saved_files:
-            flash('No valid audio files uploaded')
-            return redirect(request.url)
+        temp_dir = request_temp_dir('create_')
         
-        # Create wavetable bank
-        output_file = os.path.join(temp_dir, output_filename)
-        result = create_wavetable_bank(input_dir, output_file, random_order=random_order)
+        # Read the upload as it arrives; each file starts converting as soon as it is complete
+        cancel = request_cancel_token()
+        with StreamingIngest(temp_dir, allowed_file, convert=functools.partial(convert_upload, cancel=cancel),
+                             context=core_context) as upload:
+            upload.read(request.stream, request.mimetype_params['boundary'])
+            if not upload.files:
+                flash('No valid audio files uploaded')
+                return redirect(request.url)
+            
+            # Get options
+            try:
+                selection, seed, output_filename = create_options(upload.fields)
+            except ValueError as e:
+                flash(str(e))
+                return redirect(request.url)
+            
+            # An uploaded ZIP or tar supplies the sources; its members are streamed into the decoder
+            archives = [uploaded.path for uploaded in upload.files if is_archive_file(uploaded.path)]
+            output_file = os.path.join(temp_dir, output_filename)
+            if archives:
+                upload.close(wait=False)
+                result = create_wavetable_bank(archives[0], output_file, selection=selection, seed=seed,
+                                               conversion_slot=lambda: governor.conversion_slot(cancel),
+                                               cancel=cancel, context=core_context)
+            else:
+                uploads = {uploaded.path: uploaded for uploaded in upload.files}
+                if selection == 'diverse':
+                    # Compare the WAVs already converted rather than decoding every upload again
+                    converted = [wav for wav in (uploaded.converted() for uploaded in uploads.values()) if wav]
+                    wav_files = select_sources([(upload.converted_dir, converted)], NUM_WAVETABLES, selection, seed,
+                                               cancel=cancel)
+                else:
+                    # Pick the sources, then wait only for their conversions
+                    selected = select_sources([(upload.input_dir, list(uploads))], NUM_WAVETABLES, selection, seed)
+                    wav_files = [wav for wav in (uploads[path].converted() for path in selected) if wav]
+                upload.close(wait=False)
+                
+                if not wav_files:
+                    flash('Error creating wavetable: No files were successfully converted')
+                    return redirect(request.url)
+                
+                # Create wavetable bank
+                result = build_wavetable_bank(wav_files, output_file, os.path.join(temp_dir, 'processed'), cancel)
         
         if result['success']:
             return send_file(
@@ -131,7 +279,7 @@ def decompile_wavetable_route():
     
     try:
         # Create temporary directory for this upload
-        temp_dir = tempfile.mkdtemp(dir=UPLOAD_FOLDER, prefix='decompile_')
+        temp_dir = request_temp_dir('decompile_')
         
         # Save uploaded file
         filename = secure_filename(file.filename)
@@ -140,7 +288,7 @@ def decompile_wavetable_route():
         
         # Decompile wavetables
         output_dir = os.path.join(temp_dir, 'waves')
-        result = decompile_wavetable(input_file, output_dir)
+        result = decompile_wavetable(input_file, output_dir, cancel=request_cancel_token(), context=core_context)
         
         if result['success']:
             # Create zip file with all extracted WAV files
@@ -187,26 +335,31 @@ def recompile_wavetable_route():
     
     try:
         # Create temporary directory for this upload
-        temp_dir = tempfile.mkdtemp(dir=UPLOAD_FOLDER, prefix='recompile_')
+        temp_dir = request_temp_dir('recompile_')
         input_dir = os.path.join(temp_dir, 'input')
         os.makedirs(input_dir)
         
-        # Save uploaded WAV files
+        # Save uploaded WAV files, or a ZIP/tar of them such as /decompile returns
         saved_files = []
+        archive_path = None
         for file in files:
             if file and file.filename.lower().endswith('.wav'):
                 filename = secure_filename(file.filename)
                 file_path = os.path.join(input_dir, filename)
                 file.save(file_path)
                 saved_files.append(filename)
+            elif file and is_archive_file(file.filename) and archive_path is None:
+                archive_path = os.path.join(temp_dir, secure_filename(file.filename))
+                file.save(archive_path)
         
-        if not saved_files:
+        if not saved_files and archive_path is None:
             flash('No valid WAV files uploaded')
             return redirect(request.url)
         
-        # Recompile wavetables
+        # Recompile wavetables, reading an archive's members in place
         output_file = os.path.join(temp_dir, output_filename)
-        result = recompile_wavetable(input_dir, output_file)
+        result = recompile_wavetable(input_dir if saved_files else archive_path, output_file,
+                                     cancel=request_cancel_token())
         
         if result['success']:
             return send_file(
@@ -223,6 +376,99 @@ def recompile_wavetable_route():
         flash(f'Error processing files: {str(e)}')
         return redirect(request.url)
 
+def bank_path(bank_id):
+    return os.path.join(BANK_FOLDER, f'{bank_id}.polyend')
+
+def save_bank(data):
+    """Store validated bank bytes under their content hash and return the bank id."""
+    bank_id = hashlib.sha256(data).hexdigest()
+    path = bank_path(bank_id)
+    if not os.path.exists(path):
+        os.makedirs(BANK_FOLDER, exist_ok=True)
+        # Write under a temporary name so readers never see a partial bank
+        fd, temp_path = tempfile.mkstemp(dir=BANK_FOLDER, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    # Uploading a bank again keeps it around for another BANK_TTL
+    janitor.track(path, ttl=BANK_TTL, evictable=True)
+    return bank_id
+
+@app.route('/api/banks', methods=['POST'])
+def api_upload_bank():
+    """Store an uploaded .polyend file and return its id"""
+    file = request.files.get('file')
+    if not file or file.filename == '':
+        return jsonify({'error': 'No file selected'}), 400
+    
+    data = file.read()
+    problems = validate_bank(data)
+    if any(problem['check'] in ('size', 'truncated') for problem in problems):
+        return jsonify({'error': 'Not a valid .polyend file', 'problems': problems}), 400
+    
+    bank_id = save_bank(data)
+    
+    return jsonify({
+        'id': bank_id,
+        'num_wavetables': 64,
+        'slots': [url_for('api_bank_slot', bank_id=bank_id, slot=i) for i in range(64)]
+    }), 201
+
+@app.route('/api/banks/<bank_id>/slots/<int:slot>.wav')
+def api_bank_slot(bank_id, slot):
+    """Serve one slot as a WAV straight from the stored bank, with Range and ETag support"""
+    if not BANK_ID_PATTERN.match(bank_id) or not 0 <= slot < 64 or not os.path.exists(bank_path(bank_id)):
+        return jsonify({'error': 'Not found'}), 404
+    
+    # Banks are content-addressed, so a slot's bytes never change
+    etag = f'{bank_id[:16]}-{slot}'
+    headers = {
+        'ETag': f'"{etag}"',
+        'Accept-Ranges': 'bytes',
+        'Cache-Control': 'public, max-age=31536000, immutable',
+    }
+    if request.if_none_match.contains(etag):
+        return Response(status=304, headers=headers)
+    
+    start, stop, status = 0, SLOT_WAV_SIZE, 200
+    byte_range = request.range
+    if byte_range is not None and (not request.if_range.etag or request.if_range.etag == etag):
+        bounds = byte_range.range_for_length(SLOT_WAV_SIZE)
+        if bounds is None:
+            headers['Content-Range'] = f'bytes */{SLOT_WAV_SIZE}'
+            return Response(status=416, headers=headers)
+        start, stop = bounds
+        status = 206
+        headers['Content-Range'] = f'bytes {start}-{stop - 1}/{SLOT_WAV_SIZE}'
+    
+    # The WAV header is built here; only the requested PCM bytes are read from disk
+    header_size = len(SLOT_WAV_HEADER)
+    body = SLOT_WAV_HEADER[start:stop] + read_slot_bytes(
+        bank_path(bank_id), slot, max(start - header_size, 0), stop - header_size, slot_file_cache)
+    return Response(body, status=status, headers=headers, mimetype='audio/wav')
+
+@app.route('/api/banks/<bank_id>/thumbnails.<any(png, svg):fmt>')
+@app.route('/api/banks/<bank_id>/slots/<int:slot>.<any(png, svg):fmt>')
+def api_bank_thumbnail(bank_id, fmt, slot=None):
+    """Serve a waveform thumbnail of one slot, or an 8x8 sprite sheet of the whole bank"""
+    if not BANK_ID_PATTERN.match(bank_id) or not os.path.exists(bank_path(bank_id)):
+        return jsonify({'error': 'Not found'}), 404
+    if slot is not None and not 0 <= slot < 64:
+        return jsonify({'error': 'Not found'}), 404
+    
+    etag = f'{bank_id[:16]}-{"all" if slot is None else slot}-{fmt}'
+    headers = {'ETag': f'"{etag}"', 'Cache-Control': 'public, max-age=31536000, immutable'}
+    if request.if_none_match.contains(etag):
+        return Response(status=304, headers=headers)
+    
+    def render():
+        if slot is None:
+            return render_thumbnails(Bank.load(bank_path(bank_id)).data, fmt)
+        return render_thumbnails(read_slots(bank_path(bank_id), [slot], slot_file_cache), fmt)
+    
+    image = thumbnail_cache.get((bank_id, fmt, slot), render)
+    return Response(image, headers=headers, mimetype='image/svg+xml' if fmt == 'svg' else 'image/png')
+
 @app.route('/api/status')
 def api_status():
     """API endpoint for status checks"""
@@ -0,0 +1,563 @@
+#!/usr/bin/env python3
+"""
+Async (ASGI) variant of the Medusa Wavetable Utility web interface.
+
+Serves the same routes and templates as web_app.py from a single event loop:
+request bodies are parsed as they arrive, FFmpeg runs as asyncio
+subprocesses, downloads are streamed in chunks, and packing and other
+CPU-bound work runs in a thread pool. A slow client then costs a coroutine
+instead of a whole worker. Folders, cleanup and admission limits are shared
+with web_app.py and configured the same way.
+
+Run with:
+    uvicorn web_asgi:app --host 0.0.0.0 --port 5001
+"""
+
+import os
+import json
+import asyncio
+import zipfile
+import mimetypes
+import functools
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from werkzeug.http import parse_options_header, parse_range_header, parse_etags, parse_if_range_header
+from werkzeug.security import safe_join
+from werkzeug.utils import secure_filename
+
+import web_app
+from web_app import (
+    allowed_file, is_archive_file, create_options, MAX_CONTENT_LENGTH, BANK_ID_PATTERN, SLOT_WAV_HEADER,
+    SLOT_WAV_SIZE, REQUEST_TIMEOUT
+)
+from medusa_core import (
+    decompile_wavetable, recompile_wavetable, build_wavetable_bank, create_wavetable_bank, get_ffmpeg_path,
+    CancelToken, Cancelled, FFMPEG_TIMEOUT, NUM_WAVETABLES
+)
+from medusa_sources import select_sources
+from medusa_ingest import StreamingIngest
+from medusa_bank import Bank, validate_bank, read_slot_bytes, read_slots
+from medusa_governor import Overloaded
+from medusa_thumbnails import render_thumbnails, thumbnail_cache
+from version import __version__, __app_name__
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_FOLDER = os.path.join(BASE_DIR, 'static')
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
+# Threads for blocking work: file I/O, packing, thumbnails
+executor = ThreadPoolExecutor(max_workers=int(os.environ.get('MEDUSA_ASGI_THREADS', 4 * (os.cpu_count() or 1))))
+
+templates = Environment(loader=FileSystemLoader(os.path.join(BASE_DIR, 'templates')), autoescape=select_autoescape())
+ENDPOINTS = {
+    'index': '/',
+    'create_wavetable': '/create',
+    'decompile_wavetable_route': '/decompile',
+    'recompile_wavetable_route': '/recompile',
+    'api_upload_bank': '/api/banks',
+}
+
+
+def url_for(endpoint, **values):
+    """The subset of Flask's url_for the templates use."""
+    if endpoint == 'static':
+        return '/static/' + values['filename']
+    return ENDPOINTS[endpoint]
+
+
+def run_sync(func, *args, **kwargs):
+    """Run a blocking call in the thread pool and return an awaitable of its result."""
+    return asyncio.get_running_loop().run_in_executor(executor, functools.partial(func, *args, **kwargs))
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class Response:
+    """A response with an in-memory body, or a file streamed from path in chunks."""
+
+    def __init__(self, body=b'', status=200, headers=None, content_type='text/html; charset=utf-8', path=None):
+        self.body = body.encode('utf-8') if isinstance(body, str) else body
+        self.status = status
+        self.headers = dict(headers or {})
+        if content_type:
+            self.headers['Content-Type'] = content_type
+        self.path = path
+
+    async def __call__(self, send):
+        if self.path is not None:
+            f = await run_sync(open, self.path, 'rb')
+            try:
+                self.headers['Content-Length'] = str(os.fstat(f.fileno()).st_size)
+                await send({'type': 'http.response.start', 'status': self.status, 'headers': self._raw_headers()})
+                while True:
+                    chunk = await run_sync(f.read, DOWNLOAD_CHUNK_SIZE)
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': bool(chunk)})
+                    if not chunk:
+                        break
+            finally:
+                await run_sync(f.close)
+            return
+        self.headers['Content-Length'] = str(len(self.body))
+        await send({'type': 'http.response.start', 'status': self.status, 'headers': self._raw_headers()})
+        await send({'type': 'http.response.body', 'body': self.body})
+
+    def _raw_headers(self):
+        return [(name.lower().encode('latin-1'), str(value).encode('latin-1')) for name, value in self.headers.items()]
+
+
+def json_response(data, status=200, headers=None):
+    return Response(json.dumps(data), status, headers, 'application/json')
+
+
+def file_response(path, download_name, content_type):
+    return Response(status=200, headers={'Content-Disposition': f'attachment; filename="{download_name}"'},
+                    content_type=content_type, path=path)
+
+
+def index_page(messages=(), status=200):
+    """Render the main page; messages take the place of Flask's flashed messages."""
+    html = templates.get_template('index.html').render(
+        version=__version__, app_name=__app_name__, url_for=url_for, get_flashed_messages=lambda: list(messages))
+    return Response(html, status)
+
+
+class Request:
+    """One HTTP request: headers, the body as it arrives, and a CancelToken for its work.
+
+    The token fires at REQUEST_TIMEOUT or when the client disconnects, and
+    is cancelled once the response has been sent.
+    """
+
+    def __init__(self, scope, receive):
+        self.scope = scope
+        self.receive = receive
+        self.method = scope['method']
+        self.path = scope['path']
+        self.headers = {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope['headers']}
+        self.cancel = CancelToken(REQUEST_TIMEOUT)
+        self.temp_dirs = []
+        self.task = None
+        self.watcher = None
+        self._body_done = False
+
+    def client_id(self):
+        """Identify the client for fairness limits, as web_app.client_id() does."""
+        forwarded = self.headers.get('x-forwarded-for')
+        if web_app.TRUST_PROXY and forwarded:
+            return forwarded.split(',')[0].strip()
+        client = self.scope.get('client')
+        return client[0] if client else ''
+
+    def temp_dir(self, prefix):
+        """Create a work directory that is deleted once the response has been sent."""
+        temp_dir = web_app.janitor.mkdtemp(prefix)
+        self.temp_dirs.append(temp_dir)
+        return temp_dir
+
+    def _disconnected(self):
+        self.cancel.cancel("Client disconnected")
+        if self.task is not None:
+            self.task.cancel()
+
+    async def chunks(self):
+        """Yield the body as it arrives, enforcing MAX_CONTENT_LENGTH."""
+        received = 0
+        while not self._body_done:
+            message = await self.receive()
+            if message['type'] == 'http.disconnect':
+                self.cancel.cancel("Client disconnected")
+                raise Cancelled("Client disconnected")
+            chunk = message.get('body', b'')
+            received += len(chunk)
+            if received > MAX_CONTENT_LENGTH:
+                raise HTTPError(413, 'Upload too large')
+            self._body_done = not message.get('more_body', False)
+            if chunk:
+                yield chunk
+
+    def watch_disconnect(self):
+        """Once the body has been read, stop the request's work as soon as the client hangs up."""
+        async def watch():
+            while (await self.receive())['type'] != 'http.disconnect':
+                pass
+            self._disconnected()
+        self.watcher = asyncio.ensure_future(watch())
+
+
+async def read_upload(request, ingest, on_file=None):
+    """Feed a multipart body into a StreamingIngest as it arrives.
+
+    Parsing and file writes run in the thread pool; on_file(upload, index) is
+    called on the event loop for each file as soon as it is complete.
+    """
+    content_type, options = parse_options_header(request.headers.get('content-type', ''))
+    if content_type != 'multipart/form-data' or 'boundary' not in options:
+        raise HTTPError(400, 'No files selected')
+    ingest.start(options['boundary'])
+    seen = 0
+    done = False
+    try:
+        async for chunk in request.chunks():
+            if not done:
+                done = await run_sync(ingest.feed, chunk)
+            for index in range(seen, len(ingest.files)):
+                if on_file:
+                    on_file(ingest.files[index], index)
+            seen = len(ingest.files)
+        if not done:
+            await run_sync(ingest.feed, None)  # Raises ValueError if the body was cut short
+    finally:
+        ingest.abort()
+    request.watch_disconnect()
+
+
+async def convert_audio_async(audio_file, output_wav, timeout=FFMPEG_TIMEOUT):
+    """Asyncio version of medusa_core.convert_audio, holding one of the host's conversion slots.
+
+    Cancelling the task kills FFmpeg. Raises subprocess.CalledProcessError
+    if FFmpeg fails and asyncio.TimeoutError after timeout seconds.
+    """
+    ffmpeg = await run_sync(get_ffmpeg_path)
+    async with web_app.governor.async_conversion_slot():
+        process = await asyncio.create_subprocess_exec(
+            ffmpeg, '-y', '-i', audio_file, '-ar', '44100', '-ac', '1', '-acodec', 'pcm_s16le', output_wav,
+            stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        try:
+            _, stderr = await asyncio.wait_for(process.communicate(), timeout)
+        finally:
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, ffmpeg, stderr=stderr)
+    return output_wav
+
+
+async def cancel_tasks(tasks):
+    """Cancel tasks and wait for them to finish, so their FFmpeg processes are gone."""
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def index(request):
+    return index_page()
+
+
+async def redirect_home(request):
+    return Response(status=302, headers={'Location': '/'}, content_type=None)
+
+
+async def create_wavetable(request):
+    # Turn excess load away before reading the upload, rather than queueing it
+    try:
+        with web_app.governor.admit(request.client_id()):
+            return await create_from_upload(request)
+    except Overloaded as e:
+        return Response(f'{e}. Please try again in {e.retry_after} seconds.\n', 503,
+                        {'Retry-After': str(e.retry_after)}, 'text/plain; charset=utf-8')
+
+
+async def create_from_upload(request):
+    temp_dir = await run_sync(request.temp_dir, 'create_')
+    ingest = StreamingIngest(temp_dir, allowed_file, convert=None)
+    conversions = {}
+
+    def start_conversion(upload, index):
+        # Archives are read by create_wavetable_bank once the options are known
+        if not is_archive_file(upload.path):
+            output_wav = os.path.join(ingest.converted_dir, f'{index:04d}.wav')
+            conversions[upload.path] = asyncio.ensure_future(convert_audio_async(upload.path, output_wav))
+
+    try:
+        await read_upload(request, ingest, start_conversion)
+        if not ingest.files:
+            return index_page(['No valid audio files uploaded'], 400)
+        try:
+            selection, seed, output_filename = create_options(ingest.fields)
+        except ValueError as e:
+            return index_page([str(e)], 400)
+
+        output_file = os.path.join(temp_dir, output_filename)
+        archives = [upload.path for upload in ingest.files if is_archive_file(upload.path)]
+        if archives:
+            await cancel_tasks(list(conversions.values()))
+            result = await run_sync(create_wavetable_bank, archives[0], output_file, selection=selection, seed=seed,
+                                    conversion_slot=lambda: web_app.governor.conversion_slot(request.cancel),
+                                    cancel=request.cancel, context=web_app.core_context)
+        else:
+            async def converted(paths):
+                wav_files = []
+                for path in paths:
+                    try:
+                        wav_files.append(await conversions[path])
+                    except (subprocess.CalledProcessError, asyncio.TimeoutError) as e:
+                        web_app.core_context.warn(f"Failed to convert {os.path.basename(path)}: {e}")
+                return wav_files
+
+            if selection == 'diverse':
+                # Compare the WAVs already converted rather than decoding every upload again;
+                # reading their windows still runs off the event loop
+                wav_files = await run_sync(select_sources, [(ingest.converted_dir, await converted(conversions))],
+                                           NUM_WAVETABLES, selection, seed, cancel=request.cancel)
+            else:
+                # Pick the sources, then wait only for their conversions
+                selected = await run_sync(select_sources, [(ingest.input_dir, list(conversions))], NUM_WAVETABLES,
+                                          selection, seed)
+                await cancel_tasks([task for path, task in conversions.items() if path not in selected])
+                wav_files = await converted(selected)
+            if not wav_files:
+                return index_page(['Error creating wavetable: No files were successfully converted'], 400)
+            result = await run_sync(build_wavetable_bank, wav_files, output_file,
+                                    os.path.join(temp_dir, 'processed'), request.cancel)
+
+        if result['success']:
+            return file_response(output_file, output_filename, 'application/octet-stream')
+        return index_page([f'Error creating wavetable: {result["error"]}'], 500)
+    finally:
+        await cancel_tasks(list(conversions.values()))
+
+
+async def decompile_wavetable_route(request):
+    temp_dir = await run_sync(request.temp_dir, 'decompile_')
+    ingest = StreamingIngest(temp_dir, lambda name: name.lower().endswith('.polyend'), convert=None)
+    await read_upload(request, ingest)
+    if not ingest.files:
+        return index_page(['Please upload a .polyend file'], 400)
+    upload = ingest.files[0]
+
+    result = await run_sync(decompile_wavetable, upload.path, os.path.join(temp_dir, 'waves'), cancel=request.cancel,
+                            context=web_app.core_context)
+    if not result['success']:
+        return index_page([f'Error decompiling wavetable: {result["error"]}'], 400)
+
+    # Create zip file with all extracted WAV files
+    zip_filename = upload.filename.replace('.polyend', '_waves.zip')
+    zip_path = os.path.join(temp_dir, zip_filename)
+
+    def write_zip():
+        with zipfile.ZipFile(zip_path, 'w') as zipf:
+            for wav_file in result['files']:
+                zipf.write(wav_file, os.path.basename(wav_file))
+
+    await run_sync(write_zip)
+    return file_response(zip_path, zip_filename, 'application/zip')
+
+
+async def recompile_wavetable_route(request):
+    temp_dir = await run_sync(request.temp_dir, 'recompile_')
+    ingest = StreamingIngest(temp_dir, lambda name: name.lower().endswith('.wav') or is_archive_file(name),
+                             convert=None)
+    await read_upload(request, ingest)
+    wav_files = [upload for upload in ingest.files if upload.filename.lower().endswith('.wav')]
+    archives = [upload.path for upload in ingest.files if is_archive_file(upload.filename)]
+    if not wav_files and not archives:
+        return index_page(['No valid WAV files uploaded'], 400)
+
+    output_filename = secure_filename(ingest.fields.get('output_filename') or 'recompiled.polyend')
+    if not output_filename.endswith('.polyend'):
+        output_filename += '.polyend'
+
+    # Recompile wavetables, reading an archive's members in place
+    output_file = os.path.join(temp_dir, output_filename)
+    result = await run_sync(recompile_wavetable, ingest.input_dir if wav_files else archives[0], output_file,
+                            cancel=request.cancel)
+    if result['success']:
+        return file_response(output_file, output_filename, 'application/octet-stream')
+    return index_page([f'Error recompiling wavetables: {result["error"]}'], 400)
+
+
+async def api_upload_bank(request):
+    """Store an uploaded .polyend file and return its id"""
+    temp_dir = await run_sync(request.temp_dir, 'bank_')
+    ingest = StreamingIngest(temp_dir, lambda name: True, convert=None)
+    await read_upload(request, ingest)
+    if not ingest.files:
+        return json_response({'error': 'No file selected'}, 400)
+
+    def store():
+        with open(ingest.files[0].path, 'rb') as f:
+            data = f.read()
+        problems = validate_bank(data)
+        if any(problem['check'] in ('size', 'truncated') for problem in problems):
+            return None, problems
+        return web_app.save_bank(data), problems
+
+    bank_id, problems = await run_sync(store)
+    if bank_id is None:
+        return json_response({'error': 'Not a valid .polyend file', 'problems': problems}, 400)
+    return json_response({
+        'id': bank_id,
+        'num_wavetables': 64,
+        'slots': [f'/api/banks/{bank_id}/slots/{i}.wav' for i in range(64)]
+    }, 201)
+
+
+def _bank_exists(bank_id):
+    return BANK_ID_PATTERN.match(bank_id) and os.path.exists(web_app.bank_path(bank_id))
+
+
+async def api_bank_slot(request, bank_id, slot):
+    if not 0 <= slot < 64 or not await run_sync(_bank_exists, bank_id):
+        return json_response({'error': 'Not found'}, 404)
+
+    # Banks are content-addressed, so a slot's bytes never change
+    etag = f'{bank_id[:16]}-{slot}'
+    headers = {
+        'ETag': f'"{etag}"',
+        'Accept-Ranges': 'bytes',
+        'Cache-Control': 'public, max-age=31536000, immutable',
+    }
+    if parse_etags(request.headers.get('if-none-match')).contains(etag):
+        return Response(status=304, headers=headers, content_type=None)
+
+    start, stop, status = 0, SLOT_WAV_SIZE, 200
+    byte_range = parse_range_header(request.headers.get('range'))
+    if_range = parse_if_range_header(request.headers.get('if-range'))
+    if byte_range is not None and (not if_range.etag or if_range.etag == etag):
+        bounds = byte_range.range_for_length(SLOT_WAV_SIZE)
+        if bounds is None:
+            headers['Content-Range'] = f'bytes */{SLOT_WAV_SIZE}'
+            return Response(status=416, headers=headers, content_type=None)
+        start, stop = bounds
+        status = 206
+        headers['Content-Range'] = f'bytes {start}-{stop - 1}/{SLOT_WAV_SIZE}'
+
+    # The WAV header is built here; only the requested PCM bytes are read from disk
+    header_size = len(SLOT_WAV_HEADER)
+    samples = await run_sync(read_slot_bytes, web_app.bank_path(bank_id), slot, max(start - header_size, 0),
+                             stop - header_size, web_app.slot_file_cache)
+    return Response(SLOT_WAV_HEADER[start:stop] + samples, status, headers, 'audio/wav')
+
+
+async def api_bank_thumbnail(request, bank_id, fmt, slot=None):
+    """Serve a waveform thumbnail of one slot, or an 8x8 sprite sheet of the whole bank"""
+    if (slot is not None and not 0 <= slot < 64) or not await run_sync(_bank_exists, bank_id):
+        return json_response({'error': 'Not found'}, 404)
+
+    etag = f'{bank_id[:16]}-{"all" if slot is None else slot}-{fmt}'
+    headers = {'ETag': f'"{etag}"', 'Cache-Control': 'public, max-age=31536000, immutable'}
+    if parse_etags(request.headers.get('if-none-match')).contains(etag):
+        return Response(status=304, headers=headers, content_type=None)
+
+    def render():
+        path = web_app.bank_path(bank_id)
+        if slot is None:
+            return render_thumbnails(Bank.load(path).data, fmt)
+        return render_thumbnails(read_slots(path, [slot], web_app.slot_file_cache), fmt)
+
+    image = await run_sync(thumbnail_cache.get, (bank_id, fmt, slot), render)
+    return Response(image, 200, headers, 'image/svg+xml' if fmt == 'svg' else 'image/png')
+
+
+async def api_status(request):
+    """API endpoint for status checks"""
+    return json_response({
+        'status': 'running',
+        'version': __version__,
+        'app_name': __app_name__
+    })
+
+
+async def static_file(request, filename):
+    path = safe_join(STATIC_FOLDER, filename)
+    if path is None or not await run_sync(os.path.isfile, path):
+        raise HTTPError(404, 'Not found')
+    return Response(status=200, headers={'Cache-Control': 'public, max-age=3600'},
+                    content_type=mimetypes.guess_type(path)[0] or 'application/octet-stream', path=path)
+
+
+def route(method, path):
+    """Return (handler, params) for a request, or raise HTTPError."""
+    parts = path.strip('/').split('/') if path != '/' else []
+    if method == 'GET' and not parts:
+        return index, {}
+    if parts in (['create'], ['decompile'], ['recompile']):
+        if method == 'GET':
+            return redirect_home, {}
+        if method == 'POST':
+            handlers = {'create': create_wavetable, 'decompile': decompile_wavetable_route,
+                        'recompile': recompile_wavetable_route}
+            return handlers[parts[0]], {}
+    if parts == ['api', 'status'] and method == 'GET':
+        return api_status, {}
+    if parts == ['api', 'banks'] and method == 'POST':
+        return api_upload_bank, {}
+    if method == 'GET' and len(parts) >= 2 and parts[0] == 'static':
+        return static_file, {'filename': '/'.join(parts[1:])}
+    if method == 'GET' and len(parts) >= 4 and parts[:2] == ['api', 'banks']:
+        bank_id = parts[2]
+        name, _, ext = parts[-1].rpartition('.')
+        if len(parts) == 4 and name == 'thumbnails' and ext in ('png', 'svg'):
+            return api_bank_thumbnail, {'bank_id': bank_id, 'fmt': ext}
+        if len(parts) == 5 and parts[3] == 'slots' and name.isdigit():
+            if ext == 'wav':
+                return api_bank_slot, {'bank_id': bank_id, 'slot': int(name)}
+            if ext in ('png', 'svg'):
+                return api_bank_thumbnail, {'bank_id': bank_id, 'fmt': ext, 'slot': int(name)}
+    raise HTTPError(404, 'Not found')
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            web_app.janitor.start()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            executor.shutdown(wait=False, cancel_futures=True)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    """The ASGI application."""
+    if scope['type'] == 'lifespan':
+        return await _lifespan(receive, send)
+    if scope['type'] != 'http':
+        return
+    # Cheap when already running; covers servers started without lifespan events
+    web_app.janitor.start()
+
+    request = Request(scope, receive)
+    try:
+        try:
+            handler, params = route(request.method, request.path)
+            request.task = asyncio.ensure_future(handler(request, **params))
+            response = await asyncio.wait_for(request.task, REQUEST_TIMEOUT)
+        except HTTPError as e:
+            if request.path.startswith('/api/'):
+                response = json_response({'error': str(e)}, e.status)
+            else:
+                response = index_page([str(e)], e.status)
+        except asyncio.CancelledError:
+            if request.cancel.reason != "Client disconnected":
+                raise
+            return  # Nobody left to answer
+        except (Cancelled, asyncio.TimeoutError):
+            if request.cancel.reason == "Client disconnected":
+                return
+            response = index_page(['The request took too long and was stopped'], 503)
+        except ValueError as e:
+            response = index_page([f'Error processing files: {e}'], 400)
+        except Exception as e:
+            response = index_page([f'Error processing files: {e}'], 500)
+        await response(send)
+    finally:
+        if request.watcher is not None:
+            request.watcher.cancel()
+        request.cancel.cancel("Request finished")
+        for temp_dir in request.temp_dirs:
+            await run_sync(web_app.janitor.release, temp_dir)
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    # Use environment variable or default to port 5001 (avoiding macOS AirPlay on 5000)
+    uvicorn.run(app, host='0.0.0.0', port=int(os.environ.get('PORT', 5001)))